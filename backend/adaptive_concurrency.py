@@ -0,0 +1,275 @@
+# backend/adaptive_concurrency.py
+
+import os
+import json
+import time
+import asyncio
+import logging
+from threading import Lock, Condition
+from contextlib import contextmanager, asynccontextmanager
+
+logger = logging.getLogger(__name__)
+
+# Starting, lowest and highest concurrency per external dependency
+DEPENDENCY_DEFAULTS = {
+    'googleapis': {'initial': 4, 'min': 1, 'max': 32},
+    'transcript': {'initial': 2, 'min': 1, 'max': 16},
+    'openai': {'initial': 4, 'min': 1, 'max': int(os.getenv('LLM_MAX_CONCURRENCY', 8))},
+    'supabase': {'initial': 8, 'min': 2, 'max': 64},
+}
+# Per-dependency overrides, e.g. DEPENDENCY_LIMITS='{"openai": {"max": 32}}'
+DEPENDENCY_LIMITS = json.loads(os.getenv('DEPENDENCY_LIMITS', '{}'))
+# Factor the limit is cut by on an overload signal
+AIMD_DECREASE = float(os.getenv('AIMD_DECREASE', 0.5))
+# A call slower than this multiple of the dependency's baseline latency is unhealthy
+AIMD_LATENCY_TOLERANCE = float(os.getenv('AIMD_LATENCY_TOLERANCE', 2.0))
+# Gentler factor the limit is cut by when calls turn slow, before the dependency starts refusing them
+AIMD_LATENCY_DECREASE = float(os.getenv('AIMD_LATENCY_DECREASE', 0.9))
+
+# Weight of each sample in the latency average
+LATENCY_ALPHA = 0.1
+# How fast the baseline creeps up towards slower latencies, so it follows a lasting shift
+BASELINE_DRIFT = 0.001
+
+def on_event_loop():
+    try:
+        asyncio.get_running_loop()
+        return True
+    except RuntimeError:
+        return False
+
+def is_overload(exception):
+    """
+    Whether an exception means the dependency is overloaded: a 429 or 5xx
+    status, a timeout, a refused connection or a provider rate limit.
+    Other errors (bad input, missing data) say nothing about load.
+    """
+    status = getattr(exception, 'status_code', None)
+    if status is None:
+        status = getattr(getattr(exception, 'response', None), 'status_code', None)
+    if isinstance(status, int):
+        return status == 429 or status >= 500
+    if isinstance(exception, (TimeoutError, asyncio.TimeoutError, ConnectionError)):
+        return True
+    name = type(exception).__name__.lower()
+    if any(word in name for word in ('timeout', 'connect', 'toomanyrequests', 'ratelimit')):
+        return True
+    # Postgres statement timeout reported through PostgREST
+    return getattr(exception, 'code', None) == '57014'
+
+class Slot:
+    def __init__(self):
+        self.started = time.monotonic()
+        self.overload = False
+
+    def overloaded(self):
+        """
+        Report an overload answer that did not raise, e.g. a handled 429.
+        """
+        self.overload = True
+
+class AdaptiveLimiter:
+    """
+    Additive-increase, multiplicative-decrease concurrency limit for one
+    external dependency.
+
+    Every call that completes within AIMD_LATENCY_TOLERANCE of the baseline
+    latency while the limit is in use raises the limit by 1 / limit, so by
+    about one per limit's worth of healthy calls. A call slower than that
+    cuts it by AIMD_LATENCY_DECREASE, and a timeout, 429 or 5xx by
+    AIMD_DECREASE, so queueing at the dependency brings the limit down
+    before it starts refusing calls. A cut is skipped when the call started
+    before the previous one: calls admitted under the old limit report the
+    same congestion.
+
+    Blocking callers use slot() and coroutines async_slot(); both share the
+    same limit. slot() refuses to run on an event loop's thread, where
+    waiting for a slot, and the blocking call itself, would stall every
+    coroutine of the loop: run the call with asyncio.to_thread instead.
+    """
+
+    def __init__(self, name, initial, min, max, decrease=AIMD_DECREASE, latency_tolerance=AIMD_LATENCY_TOLERANCE,
+                 latency_decrease=AIMD_LATENCY_DECREASE):
+        self.name = name
+        self.min_limit = min
+        self.max_limit = max
+        self.limit = float(initial)
+        self.decrease = decrease
+        self.latency_tolerance = latency_tolerance
+        self.latency_decrease = latency_decrease
+        self.in_flight = 0
+        self.latency = None
+        self.baseline = None
+        self._last_decrease = 0.0
+        self._lock = Lock()
+        self._condition = Condition(self._lock)
+        self._async_waiters = []
+        self.stats = {'calls': 0, 'overloads': 0, 'decreases': 0, 'slow': 0, 'waits': 0, 'peak_limit': float(initial)}
+
+    def _available(self):
+        return self.in_flight < int(self.limit)
+
+    def _wake(self):
+        # Called with the lock held
+        self._condition.notify_all()
+        waiters, self._async_waiters = self._async_waiters, []
+        for loop, waiter in waiters:
+            loop.call_soon_threadsafe(lambda w=waiter: w.done() or w.set_result(None))
+
+    def acquire(self):
+        with self._condition:
+            if not self._available():
+                self.stats['waits'] += 1
+                self._condition.wait_for(self._available)
+            self.in_flight += 1
+
+    async def acquire_async(self):
+        loop = asyncio.get_running_loop()
+        waited = False
+        while True:
+            with self._lock:
+                if self._available():
+                    self.in_flight += 1
+                    return
+                if not waited:
+                    self.stats['waits'] += 1
+                    waited = True
+                waiter = loop.create_future()
+                self._async_waiters.append((loop, waiter))
+            await waiter
+
+    def release(self, slot, exception=None):
+        latency = time.monotonic() - slot.started
+        with self._lock:
+            self.in_flight -= 1
+            self.stats['calls'] += 1
+            if slot.overload or (exception is not None and is_overload(exception)):
+                self._on_overload(slot)
+            elif exception is None:
+                self._on_success(slot, latency)
+            self._wake()
+
+    def _on_success(self, slot, latency):
+        self.latency = latency if self.latency is None else self.latency + LATENCY_ALPHA * (latency - self.latency)
+        if self.baseline is None or latency < self.baseline:
+            self.baseline = latency
+        else:
+            self.baseline += BASELINE_DRIFT * (latency - self.baseline)
+        if latency > self.latency_tolerance * self.baseline:
+            self.stats['slow'] += 1
+            self._decrease(slot, self.latency_decrease, 'slow')
+            return
+        # Only grow a limit that is actually being reached
+        if self.in_flight + 1 >= int(self.limit):
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self.stats['peak_limit'] = max(self.stats['peak_limit'], self.limit)
+
+    def _on_overload(self, slot):
+        self.stats['overloads'] += 1
+        self._decrease(slot, self.decrease, 'overloaded')
+
+    def _decrease(self, slot, factor, reason):
+        if slot.started < self._last_decrease:
+            return
+        self._last_decrease = time.monotonic()
+        previous = self.limit
+        self.limit = max(self.min_limit, self.limit * factor)
+        self.stats['decreases'] += 1
+        log = logger.warning if reason == 'overloaded' else logger.debug
+        log(f"{self.name} {reason}; concurrency limit {previous:.1f} -> {self.limit:.1f}")
+
+    @contextmanager
+    def slot(self):
+        if on_event_loop():
+            raise RuntimeError(f"Blocking {self.name} call on the event loop; use asyncio.to_thread or the async API")
+        self.acquire()
+        slot = Slot()
+        try:
+            yield slot
+        except BaseException as e:
+            self.release(slot, e)
+            raise
+        self.release(slot)
+
+    @asynccontextmanager
+    async def async_slot(self):
+        await self.acquire_async()
+        slot = Slot()
+        try:
+            yield slot
+        except BaseException as e:
+            self.release(slot, e)
+            raise
+        self.release(slot)
+
+    def metrics(self):
+        with self._lock:
+            return {
+                **self.stats,
+                'limit': round(self.limit, 2),
+                'peak_limit': round(self.stats['peak_limit'], 2),
+                'min_limit': self.min_limit,
+                'max_limit': self.max_limit,
+                'in_flight': self.in_flight,
+                'waiting': len(self._async_waiters),
+                'latency_ms': round(self.latency * 1000, 1) if self.latency is not None else None,
+                'baseline_ms': round(self.baseline * 1000, 1) if self.baseline is not None else None,
+            }
+
+dependency_limiters = {
+    name: AdaptiveLimiter(name, **{**defaults, **DEPENDENCY_LIMITS.get(name, {})})
+    for name, defaults in DEPENDENCY_DEFAULTS.items()
+}
+
+def dependency_limiter(name):
+    return dependency_limiters[name]
+
+def dependency_metrics():
+    return {name: limiter.metrics() for name, limiter in dependency_limiters.items()}
+
+class LimitedQuery:
+    """
+    A Supabase query builder whose execute() runs under the supabase limiter.
+    Coroutines should await execute_async(), which waits for a slot without
+    blocking the loop and runs the request on a thread.
+    """
+
+    def __init__(self, query, limiter):
+        self._query = query
+        self._limiter = limiter
+
+    def execute(self, *args, **kwargs):
+        with self._limiter.slot():
+            return self._query.execute(*args, **kwargs)
+
+    async def execute_async(self, *args, **kwargs):
+        async with self._limiter.async_slot():
+            return await asyncio.to_thread(self._query.execute, *args, **kwargs)
+
+    def __getattr__(self, name):
+        attribute = getattr(self._query, name)
+        if not callable(attribute):
+            # e.g. the `not_` property, itself a builder
+            return LimitedQuery(attribute, self._limiter) if hasattr(attribute, 'execute') else attribute
+
+        def chained(*args, **kwargs):
+            result = attribute(*args, **kwargs)
+            # Builder methods return the next builder; keep it wrapped
+            return LimitedQuery(result, self._limiter) if hasattr(result, 'execute') else result
+        return chained
+
+class LimitedSupabase:
+    """
+    A Supabase client whose table queries share the supabase limiter; all
+    other attributes are the client's own.
+    """
+
+    def __init__(self, client, limiter=None):
+        self._client = client
+        self._limiter = limiter or dependency_limiter('supabase')
+
+    def table(self, name):
+        return LimitedQuery(self._client.table(name), self._limiter)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
@@ -0,0 +1,127 @@
+# backend/checkpoints.py
+
+import json
+import logging
+from datetime import datetime
+
+from supabase import Client
+from utils import chunked, fetch_rows_for_videos, SUPABASE_PAGE_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Per-video pipeline stages, in the order they run
+STAGES = ('metadata', 'interviewees', 'comments', 'transcript', 'tags')
+
+PENDING = 'pending'
+COMPLETED = 'completed'
+FAILED = 'failed'
+
+def parse_processing_status(value):
+    """
+    Parse videos.processing_status into {stage: status}. Unknown or missing
+    values count as pending.
+    """
+    statuses = {stage: PENDING for stage in STAGES}
+    if value:
+        try:
+            stored = json.loads(value)
+        except (TypeError, ValueError):
+            stored = {}
+        if isinstance(stored, dict):
+            statuses.update({stage: stored[stage] for stage in STAGES if stage in stored})
+    return statuses
+
+class CheckpointTracker:
+    """
+    Stage-level checkpoints for the videos of one processing run, persisted as
+    JSON in videos.processing_status with the last failure in videos.error_message.
+    load() blocks and belongs on a worker thread; mark() is awaited on the
+    event loop and needs a LimitedSupabase client for execute_async().
+    """
+
+    def __init__(self, supabase: Client):
+        self.supabase = supabase
+        self.statuses = {}
+
+    def load(self, video_ids):
+        """
+        Load the stored checkpoints of existing videos.
+        """
+        for row in fetch_rows_for_videos(self.supabase, 'videos', 'video_id, processing_status', video_ids):
+            self.statuses[row['video_id']] = parse_processing_status(row.get('processing_status'))
+        return self.statuses
+
+    def status(self, video_id, stage):
+        return self.statuses.get(video_id, {}).get(stage, PENDING)
+
+    def is_completed(self, video_id, stage):
+        return self.status(video_id, stage) == COMPLETED
+
+    def initial_status(self):
+        """
+        processing_status for a video whose metadata was just (re)fetched.
+        """
+        return json.dumps({stage: COMPLETED if stage == 'metadata' else PENDING for stage in STAGES})
+
+    def reset(self, video_ids):
+        for video_id in video_ids:
+            self.statuses[video_id] = parse_processing_status(self.initial_status())
+
+    async def mark(self, video_ids, stage, status, error_message=None):
+        """
+        Record a stage outcome for several videos in one write.
+        """
+        rows = []
+        for video_id in video_ids:
+            statuses = self.statuses.setdefault(video_id, parse_processing_status(None))
+            statuses[stage] = status
+            row = {'video_id': video_id, 'processing_status': json.dumps(statuses)}
+            if status == FAILED:
+                row['error_message'] = error_message
+            elif status == COMPLETED and all(value == COMPLETED for value in statuses.values()):
+                row['error_message'] = None
+            rows.append(row)
+        # A bulk upsert sets every column named by any of its rows, nulling
+        # those a row leaves out; rows that keep their error_message go apart
+        batches = {}
+        for row in rows:
+            batches.setdefault(tuple(row), []).append(row)
+        try:
+            for batch in batches.values():
+                for chunk in chunked(batch, SUPABASE_PAGE_SIZE):
+                    await self.supabase.table('videos').upsert(chunk).execute_async()
+        except Exception as e:
+            logger.error(f"Failed to record {stage}={status} checkpoint for {len(rows)} videos: {str(e)}")
+
+def save_session(supabase: Client, session_id, parameters=None, status=None, channels=None):
+    """
+    Create or update a `sessions` row; only the given fields are written.
+    """
+    row = {'session_id': session_id, 'updated_at': datetime.utcnow().isoformat()}
+    if parameters is not None:
+        row['parameters'] = parameters
+    if status is not None:
+        row['status'] = status
+    if channels is not None:
+        row['channels'] = channels
+    try:
+        supabase.table('sessions').upsert(row).execute()
+    except Exception as e:
+        logger.error(f"Failed to save session {session_id}: {str(e)}")
+
+def load_session(supabase: Client, session_id):
+    rows = supabase.table('sessions').select('*').eq('session_id', session_id).execute().data
+    return rows[0] if rows else None
+
+def claim_session(supabase: Client, session):
+    """
+    Mark a loaded `sessions` row as running, unless another worker has written
+    it since it was loaded. Returns whether this caller got the session.
+    """
+    query = supabase.table('sessions').update({'status': 'running', 'updated_at': datetime.utcnow().isoformat()}) \
+        .eq('session_id', session['session_id'])
+    if session.get('updated_at'):
+        query = query.eq('updated_at', session['updated_at'])
+    else:
+        query = query.is_('updated_at', 'null')
+    return bool(query.execute().data)
@@ -0,0 +1,229 @@
+# backend/comment_analytics.py
+
+import os
+import asyncio
+import logging
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from utils import send_update, fetch_rows_for_videos, fetch_comments_for_videos
+from embeddings import encode
+from tag_consolidation import cluster_embeddings
+
+logger = logging.getLogger(__name__)
+
+COMMENT_TOPIC_DISTANCE = float(os.getenv('COMMENT_TOPIC_DISTANCE', 0.5))
+MAX_COMMENT_TOPICS = int(os.getenv('MAX_COMMENT_TOPICS', 10))
+TOP_COMMENTERS = 10
+
+# Like-count histogram bin edges: 0, 1, 2, 4, ..., 2^20. Fixed edges keep
+# histograms of different videos comparable.
+LIKE_BIN_EDGES = np.concatenate([[0], 2 ** np.arange(21)])
+
+COMMENT_COLUMNS = 'video_id, comment_id, comment_author, comment_likes, comment_published_at, comment_parent_id, comment_text, comment_retrieval_date'
+
+def empty_summary(video_id):
+    return {
+        'video_id': video_id,
+        'comment_count': 0,
+        'reply_count': 0,
+        'like_total': 0,
+        'like_max': 0,
+        'like_histogram': [0] * len(LIKE_BIN_EDGES),
+        'thread_replies': {},
+        'commenter_counts': {},
+        'daily_activity': {},
+        'topics': [],
+        # {comment_id: likes when last counted}; like counts change after a comment is first seen
+        'counted_likes': {},
+        'comments_watermark': None
+    }
+
+def _merge_counts(target, counts):
+    for key, count in counts.items():
+        target[key] = target.get(key, 0) + int(count)
+
+def aggregate_comments(df):
+    """
+    Compute mergeable per-video aggregates for a batch of new comments with
+    grouped pandas/NumPy operations. Returns {video_id: partial aggregates}.
+    """
+    df = df.assign(
+        is_reply=df['comment_parent_id'].fillna('') != '',
+        day=pd.to_datetime(df['comment_published_at'], errors='coerce', utc=True).dt.strftime('%Y-%m-%d')
+    )
+    by_video = df.groupby('video_id')
+    basics = by_video.agg(
+        comment_count=('comment_id', 'size'),
+        reply_count=('is_reply', 'sum')
+    )
+    replies = df[df['is_reply']].groupby(['video_id', 'comment_parent_id']).size()
+    commenters = df.groupby(['video_id', 'comment_author']).size()
+    activity = df.dropna(subset=['day']).groupby(['video_id', 'day']).size()
+
+    aggregates = {}
+    for video_id, row in basics.iterrows():
+        aggregates[video_id] = {
+            'comment_count': int(row['comment_count']),
+            'reply_count': int(row['reply_count']),
+            'thread_replies': replies.get(video_id, pd.Series(dtype=int)).to_dict(),
+            'commenter_counts': commenters.get(video_id, pd.Series(dtype=int)).to_dict(),
+            'daily_activity': activity.get(video_id, pd.Series(dtype=int)).to_dict()
+        }
+    return aggregates
+
+def merge_aggregates(summary, aggregates):
+    summary['comment_count'] += aggregates['comment_count']
+    summary['reply_count'] += aggregates['reply_count']
+    _merge_counts(summary['thread_replies'], aggregates['thread_replies'])
+    _merge_counts(summary['commenter_counts'], aggregates['commenter_counts'])
+    _merge_counts(summary['daily_activity'], aggregates['daily_activity'])
+
+def count_likes(summary):
+    """
+    Recompute the like statistics from the last counted likes of every
+    comment, so a comment whose likes changed is counted at its new value.
+    """
+    likes = np.fromiter(summary['counted_likes'].values(), dtype=np.int64, count=len(summary['counted_likes']))
+    bins = np.searchsorted(LIKE_BIN_EDGES, likes, side='right') - 1
+    summary['like_total'] = int(likes.sum())
+    summary['like_max'] = int(likes.max()) if len(likes) else 0
+    summary['like_histogram'] = np.bincount(bins, minlength=len(LIKE_BIN_EDGES)).tolist()
+
+def like_percentiles(histogram, percentiles=(50, 90, 99)):
+    """
+    Approximate like-count percentiles from the histogram, reporting the lower
+    edge of the bin each percentile falls in.
+    """
+    cumulative = np.cumsum(histogram)
+    if not len(cumulative) or cumulative[-1] == 0:
+        return {f"p{p}": 0 for p in percentiles}
+    positions = np.searchsorted(cumulative, np.array(percentiles) / 100 * cumulative[-1])
+    return {f"p{p}": int(LIKE_BIN_EDGES[i]) for p, i in zip(percentiles, positions)}
+
+def update_topics(topics, texts, embeddings):
+    """
+    Fold newly encoded comments into the running topic clusters. Comments close
+    to an existing topic centroid join it; the rest are clustered among
+    themselves into new topics. Only the largest MAX_COMMENT_TOPICS survive.
+    """
+    unassigned = np.ones(len(texts), dtype=bool)
+    if topics:
+        centroids = np.array([topic['centroid'] for topic in topics], dtype=np.float32)
+        similarities = embeddings @ centroids.T
+        best = similarities.argmax(axis=1)
+        best_similarity = similarities[np.arange(len(texts)), best]
+        for i in np.flatnonzero(best_similarity >= 1 - COMMENT_TOPIC_DISTANCE):
+            topic = topics[best[i]]
+            size = topic['size']
+            centroid = (np.asarray(topic['centroid']) * size + embeddings[i]) / (size + 1)
+            topic['centroid'] = (centroid / np.linalg.norm(centroid)).tolist()
+            topic['size'] = size + 1
+            if best_similarity[i] > topic['representative_similarity']:
+                topic['representative'] = texts[i]
+                topic['representative_similarity'] = float(best_similarity[i])
+            unassigned[i] = False
+
+    new_indices = np.flatnonzero(unassigned)
+    if len(new_indices):
+        labels = cluster_embeddings(embeddings[new_indices], COMMENT_TOPIC_DISTANCE)
+        for label in np.unique(labels):
+            members = new_indices[labels == label]
+            centroid = embeddings[members].mean(axis=0)
+            centroid /= np.linalg.norm(centroid)
+            similarity = embeddings[members] @ centroid
+            topics.append({
+                'size': int(len(members)),
+                'centroid': centroid.tolist(),
+                'representative': texts[members[similarity.argmax()]],
+                'representative_similarity': float(similarity.max())
+            })
+
+    topics.sort(key=lambda topic: topic['size'], reverse=True)
+    return topics[:MAX_COMMENT_TOPICS]
+
+def finalize_summary(summary):
+    """
+    Derive the reported statistics from the merged aggregates.
+    """
+    thread_sizes = np.array(list(summary['thread_replies'].values()) or [0])
+    commenters = sorted(summary['commenter_counts'].items(), key=lambda item: item[1], reverse=True)
+    summary.update({
+        'like_mean': summary['like_total'] / summary['comment_count'] if summary['comment_count'] else 0,
+        'like_percentiles': like_percentiles(summary['like_histogram']),
+        'max_reply_depth': 1 if summary['reply_count'] else 0,
+        'avg_replies_per_thread': float(thread_sizes.mean()),
+        'max_replies_per_thread': int(thread_sizes.max()),
+        'top_commenters': [{'author': author, 'count': count} for author, count in commenters[:TOP_COMMENTERS]],
+        'computed_at': datetime.utcnow().isoformat()
+    })
+    return summary
+
+def summarize_new_comments(summaries, comments):
+    """
+    Merge comments not yet counted into their video summaries, and recount
+    the likes of counted comments whose like count changed. Edited text of a
+    counted comment does not move it between topics. Runs off the event loop
+    because it encodes comment text.
+    """
+    df = pd.DataFrame(comments)
+    df['comment_likes'] = df['comment_likes'].fillna(0).astype(int)
+    previous = [summaries[video_id]['counted_likes'].get(comment_id) for video_id, comment_id in zip(df['video_id'], df['comment_id'])]
+    is_new = np.array([likes is None for likes in previous], dtype=bool)
+    changed = df[np.array([likes is not None and likes != current for likes, current in zip(previous, df['comment_likes'])], dtype=bool)]
+    watermarks = df.groupby('video_id')['comment_retrieval_date'].max()
+    df = df[is_new]
+    if df.empty and changed.empty:
+        return []
+
+    touched = set(changed['video_id'])
+    for video_id, comment_id, likes in zip(changed['video_id'], changed['comment_id'], changed['comment_likes']):
+        summaries[video_id]['counted_likes'][comment_id] = int(likes)
+
+    if not df.empty:
+        # Encode every new comment for every video in one batched call
+        texts = df['comment_text'].fillna('').tolist()
+        embeddings = encode(texts)
+        positions = df.groupby('video_id').indices
+        for video_id, aggregates in aggregate_comments(df).items():
+            summary = summaries[video_id]
+            merge_aggregates(summary, aggregates)
+            members = positions[video_id]
+            summary['topics'] = update_topics(summary['topics'], [texts[i] for i in members], embeddings[members])
+            summary['counted_likes'].update(zip(df['comment_id'].iloc[members], df['comment_likes'].iloc[members].tolist()))
+            touched.add(video_id)
+
+    updated = []
+    for video_id in touched:
+        summary = summaries[video_id]
+        summary['comments_watermark'] = watermarks[video_id]
+        count_likes(summary)
+        updated.append(finalize_summary(summary))
+    return updated
+
+async def update_comment_summaries(session_id, supabase, video_ids):
+    """
+    Incrementally refresh `comment_summaries` for the given videos, reading only
+    comments retrieved after each summary's watermark.
+    """
+    summaries = {video_id: empty_summary(video_id) for video_id in video_ids}
+    for row in await asyncio.to_thread(fetch_rows_for_videos, supabase, 'comment_summaries', '*', video_ids):
+        summaries[row['video_id']].update(row)
+        # NULL for summaries that had no comments when counted_likes was added
+        summaries[row['video_id']]['counted_likes'] = row.get('counted_likes') or {}
+
+    watermarks = [summary['comments_watermark'] for summary in summaries.values()]
+    since = None if None in watermarks else min(watermarks)
+    comments = await asyncio.to_thread(fetch_comments_for_videos, supabase, video_ids, COMMENT_COLUMNS, since=since)
+    if not comments:
+        return []
+
+    updated = await asyncio.to_thread(summarize_new_comments, summaries, comments)
+    if updated:
+        await supabase.table('comment_summaries').upsert(updated).execute_async()
+    success = await send_update(session_id, f"Updated comment analytics for {len(updated)} videos", supabase)
+    if not success:
+        logger.error(f"Failed to send update for comment analytics in session {session_id}")
+    return updated
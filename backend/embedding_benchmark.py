@@ -0,0 +1,141 @@
+# backend/embedding_benchmark.py
+#
+# Compare embedding backends against the PyTorch sentence-transformer:
+#
+#   python embedding_benchmark.py --backends torch,onnx,onnx-int8 --texts-file tags.txt
+#
+# Each backend runs in a fresh process so startup time and peak memory are its
+# own. Reports load time, peak RSS, single-core and all-core throughput, and
+# the cosine similarity of every embedding to the torch one. Exits non-zero
+# when a backend falls below --min-cosine.
+
+import os
+import sys
+import time
+import json
+import random
+import argparse
+import resource
+import multiprocessing
+from queue import Empty
+
+import numpy as np
+
+SAMPLE_WORDS = [
+    'interview', 'technology', 'startups', 'machine learning', 'podcast', 'history', 'economics',
+    'climate change', 'space exploration', 'nutrition', 'fitness', 'investing', 'cryptocurrency',
+    'philosophy', 'music production', 'video games', 'politics', 'psychology', 'cooking', 'travel',
+]
+
+def sample_texts(count, seed=0):
+    rng = random.Random(seed)
+    return [' '.join(rng.sample(SAMPLE_WORDS, rng.randint(1, 3))) for _ in range(count)]
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def run_backend(name, texts, batch_size, threads, output_path):
+    os.environ['EMBEDDING_BACKEND'] = name
+    if threads:
+        os.environ['EMBEDDING_THREADS'] = str(threads)
+    baseline_rss = peak_rss_mb()
+    start = time.perf_counter()
+    import embeddings
+    backend = embeddings.get_embedding_backend()
+    backend.encode(texts[:batch_size], batch_size=batch_size)  # warm-up
+    load_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    vectors = backend.encode(texts, batch_size=batch_size)
+    encode_seconds = time.perf_counter() - start
+    np.save(output_path, vectors)
+    return {
+        'load_seconds': round(load_seconds, 2),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'model_rss_mb': round(peak_rss_mb() - baseline_rss, 1),
+        'texts_per_second': round(len(texts) / encode_seconds, 1),
+    }
+
+def _worker(queue, *args):
+    try:
+        queue.put(run_backend(*args))
+    except Exception as e:
+        queue.put({'error': f"{type(e).__name__}: {e}"})
+
+def measure(name, texts, batch_size, threads, output_path, timeout):
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=_worker, args=(queue, name, texts, batch_size, threads, output_path))
+    process.start()
+    deadline = time.monotonic() + timeout
+    result = None
+    while result is None:
+        try:
+            result = queue.get(timeout=1)
+        except Empty:
+            # A child killed by a crash or the OOM killer never answers
+            if not process.is_alive():
+                result = {'error': f"worker exited with code {process.exitcode} without a result"}
+            elif time.monotonic() > deadline:
+                process.terminate()
+                result = {'error': f"no result within {timeout:.0f}s"}
+    process.join()
+    if process.exitcode != 0 and 'error' not in result:
+        result = {'error': f"worker exited with code {process.exitcode}"}
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark embedding backends and check their parity with torch.')
+    parser.add_argument('--backends', default='torch,onnx,onnx-int8')
+    parser.add_argument('--texts-file', help='one text per line; defaults to synthetic tags')
+    parser.add_argument('--count', type=int, default=5000)
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--min-cosine', type=float, default=0.99)
+    parser.add_argument('--output-dir', default='/tmp')
+    parser.add_argument('--timeout', type=float, default=1800, help='seconds allowed per backend run')
+    args = parser.parse_args()
+
+    if args.texts_file:
+        with open(args.texts_file, 'r') as file:
+            texts = [line.strip() for line in file if line.strip()][:args.count]
+    else:
+        texts = sample_texts(args.count)
+
+    names = [name.strip() for name in args.backends.split(',')]
+    if 'torch' not in names:
+        names.insert(0, 'torch')  # parity reference
+
+    report = {}
+    vectors = {}
+    for name in names:
+        for label, threads in (('1 thread', 1), ('all cores', None)):
+            output_path = os.path.join(args.output_dir, f"embeddings-{name}.npy")
+            result = measure(name, texts, args.batch_size, threads, output_path, args.timeout)
+            if 'error' in result:
+                report[name] = result
+                break
+            report.setdefault(name, {'load_seconds': result['load_seconds'], 'peak_rss_mb': result['peak_rss_mb'],
+                                     'model_rss_mb': result['model_rss_mb']})
+            report[name][f"texts_per_second ({label})"] = result['texts_per_second']
+        if 'error' not in report[name]:
+            vectors[name] = np.load(output_path)
+
+    failed = False
+    reference = vectors.get('torch')
+    for name, matrix in vectors.items():
+        if reference is None or name == 'torch':
+            continue
+        cosines = np.sum(matrix * reference, axis=1)
+        report[name]['cosine_to_torch'] = {'min': round(float(cosines.min()), 5), 'mean': round(float(cosines.mean()), 5)}
+        if cosines.min() < args.min_cosine:
+            failed = True
+            report[name]['parity'] = f"FAIL (min cosine below {args.min_cosine})"
+        else:
+            report[name]['parity'] = 'ok'
+
+    print(json.dumps(report, indent=2))
+    sys.exit(1 if failed or any('error' in result for result in report.values()) else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,226 @@
+# backend/embedding_cache.py
+
+import os
+import json
+import fcntl
+import logging
+from threading import Lock
+from contextlib import contextmanager
+
+import numpy as np
+from embeddings import encode, EMBEDDING_MODEL_ID
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_CACHE_DIR = os.getenv('EMBEDDING_CACHE_DIR', 'embedding_cache')
+# float16 halves the file at a cosine-similarity error of about 1e-3
+EMBEDDING_CACHE_DTYPE = os.getenv('EMBEDDING_CACHE_DTYPE', 'float32')
+# Compact once duplicate rows make up this share of the file
+EMBEDDING_CACHE_COMPACT_RATIO = float(os.getenv('EMBEDDING_CACHE_COMPACT_RATIO', 0.2))
+EMBEDDING_CACHE_COMPACT_MIN_ROWS = 1000
+
+META_FILE = 'meta.json'
+LOCK_FILE = '.lock'
+
+class EmbeddingCache:
+    """
+    Persistent text -> embedding cache shared by every worker process.
+
+    Row i of the memory-mapped matrix `vectors.<generation>.bin` belongs to line
+    i of `keys.<generation>.jsonl`; an in-memory hash index maps each text to its
+    first row. Both files are append-only, with appends serialized by a file
+    lock. Readers pick up other processes' appends by reading the keys file past
+    their last offset. Compaction writes a new generation without duplicate
+    rows and switches meta.json over to it atomically.
+    """
+
+    def __init__(self, directory=EMBEDDING_CACHE_DIR, dtype=EMBEDDING_CACHE_DTYPE, model_name=EMBEDDING_MODEL_ID):
+        self.directory = directory
+        self.dtype = np.dtype(dtype)
+        self.model_name = model_name
+        self.hits = 0
+        self.misses = 0
+        self._lock = Lock()
+        self._meta = None
+        self._reset_state()
+        os.makedirs(directory, exist_ok=True)
+        with self._locked():
+            self._refresh()
+            if self._meta and (self._meta['model'] != model_name or self._meta['dtype'] != self.dtype.name):
+                logger.info(f"Embedding cache was built with {self._meta['model']}/{self._meta['dtype']}; rebuilding")
+                self._compact()
+
+    def __len__(self):
+        return len(self._rows)
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _files(self, generation):
+        return self._path(f"keys.{generation}.jsonl"), self._path(f"vectors.{generation}.bin")
+
+    def _reset_state(self):
+        self._rows = {}
+        self._count = 0
+        self._offset = 0
+        self._generation = None
+        self._vectors = None
+
+    @contextmanager
+    def _locked(self, exclusive=True):
+        # Readers share the file lock; appends and compaction hold it alone
+        with self._lock, open(self._path(LOCK_FILE), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_meta(self):
+        try:
+            with open(self._path(META_FILE), 'r') as file:
+                return json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _write_meta(self, meta):
+        temp_path = self._path(META_FILE + '.tmp')
+        with open(temp_path, 'w') as file:
+            json.dump(meta, file)
+        os.replace(temp_path, self._path(META_FILE))
+        self._meta = meta
+
+    def _refresh(self):
+        """
+        Catch up with rows appended since the last call, by this or another process.
+        """
+        meta = self._read_meta()
+        if meta is None:
+            self._meta = None
+            self._reset_state()
+            return
+        if meta['generation'] != self._generation:
+            self._reset_state()
+            self._generation = meta['generation']
+        self._meta = meta
+
+        keys_path, vectors_path = self._files(self._generation)
+        if not os.path.exists(keys_path):
+            return
+        with open(keys_path, 'rb') as file:
+            file.seek(self._offset)
+            data = file.read()
+        # Only complete lines; a partial one is still being written
+        complete = data[:data.rfind(b'\n') + 1]
+        for line in complete.splitlines():
+            self._rows.setdefault(json.loads(line), self._count)
+            self._count += 1
+        self._offset += len(complete)
+
+        if self._count and (self._vectors is None or len(self._vectors) < self._count):
+            self._vectors = np.memmap(vectors_path, dtype=meta['dtype'], mode='r', shape=(self._count, meta['dim']))
+
+    def _append(self, texts, embeddings):
+        if self._meta is None or self._meta['dim'] is None:
+            self._generation = self._generation or 0
+            self._write_meta({'model': self.model_name, 'dtype': self.dtype.name, 'dim': embeddings.shape[1], 'generation': self._generation})
+        keys_path, vectors_path = self._files(self._generation)
+        row_bytes = self._meta['dim'] * self.dtype.itemsize
+        # Vectors go first; rows left over from an interrupted append are cut off
+        with open(vectors_path, 'ab') as file:
+            file.truncate(self._count * row_bytes)
+            file.write(np.ascontiguousarray(embeddings, dtype=self.dtype).tobytes())
+        with open(keys_path, 'ab') as file:
+            # Likewise a torn last line, which would swallow the first new key
+            file.truncate(self._offset)
+            file.write(''.join(json.dumps(text) + '\n' for text in texts).encode('utf-8'))
+        self._refresh()
+
+    def _compact(self):
+        """
+        Rewrite the live rows, once each and in the configured dtype, as a new generation.
+        """
+        old_generation = self._generation
+        generation = 0 if old_generation is None else old_generation + 1
+        keys_path, vectors_path = self._files(generation)
+        rebuild = self._meta is None or self._meta['model'] != self.model_name
+        texts = [] if rebuild else list(self._rows)
+        with open(vectors_path, 'wb') as file:
+            for start in range(0, len(texts), 4096):
+                rows = [self._rows[text] for text in texts[start:start + 4096]]
+                file.write(np.ascontiguousarray(self._vectors[rows], dtype=self.dtype).tobytes())
+        with open(keys_path, 'w') as file:
+            file.write(''.join(json.dumps(text) + '\n' for text in texts))
+        dim = None if rebuild else self._meta['dim']
+        self._write_meta({'model': self.model_name, 'dtype': self.dtype.name, 'dim': dim, 'generation': generation})
+        self._refresh()
+        if old_generation is not None:
+            # Processes still mapping the old files keep them alive until they refresh
+            for path in self._files(old_generation):
+                if os.path.exists(path):
+                    os.remove(path)
+        logger.info(f"Compacted embedding cache to {len(texts)} rows (generation {generation})")
+
+    def compact(self):
+        with self._locked():
+            self._refresh()
+            self._compact()
+
+    def encode(self, texts):
+        """
+        Embeddings for texts, encoding only the ones never seen before. Same
+        contract as embeddings.encode: L2-normalized float32, one row per text.
+        """
+        texts = list(texts)
+        if not texts:
+            return encode([])
+        unique = list(dict.fromkeys(texts))
+        with self._locked(exclusive=False):
+            self._refresh()
+            missing = [text for text in unique if text not in self._rows]
+        self.hits += len(unique) - len(missing)
+        self.misses += len(missing)
+
+        if missing:
+            embeddings = encode(missing)
+            with self._locked():
+                # Another process may have added some of them meanwhile
+                self._refresh()
+                new = [i for i, text in enumerate(missing) if text not in self._rows]
+                if new:
+                    self._append([missing[i] for i in new], embeddings[new])
+                if self._count >= EMBEDDING_CACHE_COMPACT_MIN_ROWS and self._count - len(self._rows) > EMBEDDING_CACHE_COMPACT_RATIO * self._count:
+                    self._compact()
+
+        with self._lock:
+            rows = [self._rows[text] for text in texts]
+            embeddings = np.asarray(self._vectors[rows], dtype=np.float32)
+        if self.dtype != np.float32:
+            embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings
+
+    def metrics(self):
+        return {
+            'rows': self._count,
+            'unique': len(self._rows),
+            'dtype': self.dtype.name,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+_cache = None
+_cache_lock = Lock()
+
+def get_embedding_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = EmbeddingCache()
+    return _cache
+
+def encode_cached(texts):
+    """
+    embeddings.encode for short, recurring strings such as normalized tags.
+    """
+    return get_embedding_cache().encode(texts)
@@ -0,0 +1,160 @@
+# backend/embeddings.py
+
+import os
+import logging
+from threading import Lock
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SENTENCE_TRANSFORMER_MODEL = os.getenv('SENTENCE_TRANSFORMER_MODEL', 'paraphrase-MiniLM-L6-v2')
+EMBEDDING_BATCH_SIZE = int(os.getenv('EMBEDDING_BATCH_SIZE', 64))
+# "torch" (sentence-transformers), "onnx" or "onnx-int8" (ONNX Runtime, dynamically quantized weights)
+EMBEDDING_BACKEND = os.getenv('EMBEDDING_BACKEND', 'torch')
+EMBEDDING_ONNX_DIR = os.getenv('EMBEDDING_ONNX_DIR', 'onnx_models')
+# Intra-op threads per process; 0 leaves it to the runtime (all cores)
+EMBEDDING_THREADS = int(os.getenv('EMBEDDING_THREADS', 0))
+EMBEDDING_MAX_SEQ_LENGTH = 128
+
+class EmbeddingBackend:
+    """
+    Interface for sentence-embedding engines. Every backend must produce the
+    same vectors as the sentence-transformers model up to numerical error.
+    """
+    name = None
+
+    @property
+    def dimension(self):
+        raise NotImplementedError
+
+    def encode(self, texts, batch_size=EMBEDDING_BATCH_SIZE):
+        """
+        Encode a non-empty list of texts into L2-normalized float32 rows.
+        """
+        raise NotImplementedError
+
+class TorchBackend(EmbeddingBackend):
+    name = 'torch'
+
+    def __init__(self, model_name=SENTENCE_TRANSFORMER_MODEL):
+        from sentence_transformers import SentenceTransformer
+
+        if EMBEDDING_THREADS:
+            import torch
+            torch.set_num_threads(EMBEDDING_THREADS)
+        logger.info(f"Loading sentence-transformer model {model_name}")
+        self._model = SentenceTransformer(model_name)
+
+    @property
+    def dimension(self):
+        return self._model.get_sentence_embedding_dimension()
+
+    def encode(self, texts, batch_size=EMBEDDING_BATCH_SIZE):
+        embeddings = self._model.encode(
+            list(texts),
+            batch_size=batch_size,
+            normalize_embeddings=True,
+            show_progress_bar=False
+        )
+        return np.asarray(embeddings, dtype=np.float32)
+
+class OnnxBackend(EmbeddingBackend):
+    """
+    The same transformer exported to ONNX and run with ONNX Runtime, with the
+    model's mean pooling done in numpy. Needs neither torch nor
+    sentence-transformers at runtime. With quantize=True the weights are
+    dynamically quantized to int8 once and the result cached in EMBEDDING_ONNX_DIR.
+    """
+    name = 'onnx'
+
+    def __init__(self, model_name=SENTENCE_TRANSFORMER_MODEL, quantize=False, model_dir=EMBEDDING_ONNX_DIR):
+        import onnxruntime
+        from tokenizers import Tokenizer
+        from huggingface_hub import hf_hub_download
+
+        repo_id = model_name if '/' in model_name else f"sentence-transformers/{model_name}"
+        model_path = hf_hub_download(repo_id, 'onnx/model.onnx')
+        if quantize:
+            model_path = self._quantized(model_path, os.path.join(model_dir, repo_id.replace('/', '--')))
+        logger.info(f"Loading ONNX embedding model {model_path}")
+
+        self._tokenizer = Tokenizer.from_file(hf_hub_download(repo_id, 'tokenizer.json'))
+        self._tokenizer.enable_truncation(EMBEDDING_MAX_SEQ_LENGTH)
+        self._tokenizer.enable_padding()
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.intra_op_num_threads = EMBEDDING_THREADS
+        self._session = onnxruntime.InferenceSession(model_path, options, providers=['CPUExecutionProvider'])
+        self._inputs = {model_input.name for model_input in self._session.get_inputs()}
+        self._dimension = self._session.get_outputs()[0].shape[-1]
+
+    @staticmethod
+    def _quantized(model_path, directory):
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+
+        quantized_path = os.path.join(directory, 'model_int8.onnx')
+        if not os.path.exists(quantized_path):
+            os.makedirs(directory, exist_ok=True)
+            logger.info(f"Quantizing {model_path} to int8")
+            temp_path = quantized_path + '.tmp'
+            quantize_dynamic(model_path, temp_path, weight_type=QuantType.QInt8)
+            os.replace(temp_path, quantized_path)
+        return quantized_path
+
+    @property
+    def dimension(self):
+        return self._dimension
+
+    def encode(self, texts, batch_size=EMBEDDING_BATCH_SIZE):
+        texts = list(texts)
+        output = np.empty((len(texts), self._dimension), dtype=np.float32)
+        for start in range(0, len(texts), batch_size):
+            encodings = self._tokenizer.encode_batch(texts[start:start + batch_size])
+            feed = {
+                'input_ids': np.array([encoding.ids for encoding in encodings], dtype=np.int64),
+                'attention_mask': np.array([encoding.attention_mask for encoding in encodings], dtype=np.int64),
+                'token_type_ids': np.array([encoding.type_ids for encoding in encodings], dtype=np.int64),
+            }
+            hidden = self._session.run(None, {name: value for name, value in feed.items() if name in self._inputs})[0]
+            # Mean pooling over the real (unpadded) tokens, as the sentence-transformers model does
+            mask = feed['attention_mask'][:, :, None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+            output[start:start + len(encodings)] = pooled / np.linalg.norm(pooled, axis=1, keepdims=True)
+        return output
+
+EMBEDDING_BACKENDS = {
+    'torch': TorchBackend,
+    'onnx': OnnxBackend,
+    'onnx-int8': lambda: OnnxBackend(quantize=True),
+}
+
+# Identifies the vectors a configuration produces, e.g. for keying caches
+EMBEDDING_MODEL_ID = SENTENCE_TRANSFORMER_MODEL if EMBEDDING_BACKEND == 'torch' else f"{SENTENCE_TRANSFORMER_MODEL}:{EMBEDDING_BACKEND}"
+
+_backend = None
+_backend_lock = Lock()
+
+def get_embedding_backend():
+    """
+    Return the process-wide embedding backend, loading it on first use.
+    """
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                if EMBEDDING_BACKEND not in EMBEDDING_BACKENDS:
+                    raise ValueError(f"Unknown EMBEDDING_BACKEND {EMBEDDING_BACKEND!r}; expected one of {', '.join(EMBEDDING_BACKENDS)}")
+                _backend = EMBEDDING_BACKENDS[EMBEDDING_BACKEND]()
+    return _backend
+
+def encode(texts, batch_size=EMBEDDING_BATCH_SIZE):
+    """
+    Encode texts into L2-normalized float32 embeddings, one row per text.
+    Inner products between rows are cosine similarities.
+    """
+    backend = get_embedding_backend()
+    if not texts:
+        return np.zeros((0, backend.dimension), dtype=np.float32)
+    return backend.encode(texts, batch_size=batch_size)
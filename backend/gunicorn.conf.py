@@ -0,0 +1,98 @@
+# backend/gunicorn.conf.py
+#
+# Pre-fork serving: gunicorn -c gunicorn.conf.py main:app
+#
+# The master imports the app, which loads spaCy, and loads the
+# sentence-transformer before forking, so every worker shares the weights
+# copy-on-write instead of holding its own copy. Each worker is a uvicorn
+# event loop running its own requests and background sessions.
+#
+# kill -HUP <master> replaces the workers gracefully: new ones start
+# serving while the old ones stop accepting and finish their in-flight
+# sessions, for up to GRACEFUL_TIMEOUT seconds. The preloaded app is not
+# re-imported on HUP; deploying new code needs a restart, which drains
+# sessions the same way (interrupted ones can be resumed).
+#
+# State that is per worker:
+#   - scheduler, single-flight and the in-memory caches, so a channel
+#     requested in two workers at once is processed twice;
+#   - the read cache: a worker drops entries for its own writes only, and
+#     other workers serve theirs until READ_CACHE_TTL_SECONDS expires;
+#   - profiler captures, which profile and are listed by the worker that
+#     took the admin request; one armed for a session running in another
+#     worker expires after PROFILE_ARM_SECONDS.
+# Shared through files or the database: the embedding cache and tag index
+# (file-locked appends), and whether a session is running (the sessions
+# row's heartbeat), which resume checks before starting it again.
+
+import os
+import gc
+import logging
+
+from memory import cgroup_files, total_ram, MB
+
+logger = logging.getLogger('gunicorn.error')
+
+bind = os.getenv('BIND', '0.0.0.0:8000')
+worker_class = 'uvicorn.workers.UvicornWorker'
+preload_app = True
+# Sessions run inside their request's background tasks, so a graceful stop waits for them
+graceful_timeout = int(os.getenv('GRACEFUL_TIMEOUT', 1800))
+# CPU-bound steps can hold a worker's event loop for a while
+timeout = int(os.getenv('WORKER_TIMEOUT', 120))
+keepalive = 5
+loglevel = os.getenv('LOG_LEVEL', 'info').lower()
+
+# Memory one worker needs beyond the shared models, for sizing against the memory limit
+WORKER_MEMORY_MB = int(os.getenv('WORKER_MEMORY_MB', 600))
+
+def available_cpus():
+    """
+    CPUs this process may use: its affinity mask, further limited by a cgroup CPU quota.
+    """
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count() or 1
+    try:
+        with open('/sys/fs/cgroup/cpu.max', 'r') as file:
+            quota, period = file.read().split()
+        if quota != 'max':
+            cpus = min(cpus, max(1, int(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+def default_workers():
+    """
+    One worker per usable CPU (the work is CPU-heavy, so more would only
+    contend), at most as many as fit in the memory limit.
+    """
+    workers = available_cpus()
+    limit, _ = cgroup_files()
+    limit = limit or total_ram()
+    if limit:
+        workers = min(workers, max(1, limit // (WORKER_MEMORY_MB * MB)))
+    return workers
+
+workers = int(os.getenv('WEB_CONCURRENCY', 0)) or default_workers()
+
+def on_starting(server):
+    import embeddings
+
+    # Initializing ONNX Runtime starts thread pools that do not survive a fork,
+    # so those backends load in each worker instead
+    if embeddings.EMBEDDING_BACKEND == 'torch':
+        embeddings.get_embedding_backend()
+        server.log.info("Preloaded the embedding model in the master")
+    # Keep the garbage collector from writing to, and so un-sharing, the preloaded objects
+    gc.freeze()
+    server.log.info(f"Starting {workers} workers on {available_cpus()} CPUs")
+
+def post_fork(server, worker):
+    import embeddings
+
+    # Split the CPUs between workers rather than each using all of them
+    if not embeddings.EMBEDDING_THREADS:
+        threads = max(1, available_cpus() // workers)
+        embeddings.EMBEDDING_THREADS = threads
+        if embeddings.EMBEDDING_BACKEND == 'torch':
+            import torch
+            torch.set_num_threads(threads)
@@ -0,0 +1,208 @@
+# backend/ingest.py
+#
+# Bulk ingest without the HTTP tier:
+#
+#   python ingest.py channels.txt --concurrency 8 --checkpoint nightly.jsonl
+#   cat video_ids.txt | python ingest.py - --num-videos 20 --tag-mode local
+#
+# Reads one channel or video ID per line (blank lines and # comments are
+# skipped) and runs each through the pipeline as its own bulk-priority
+# session. Outcomes are appended to the checkpoint file. Rerunning with the
+# same checkpoint skips finished IDs and resumes interrupted ones in their
+# original session, so completed stages are not repeated. Progress,
+# throughput and ETA go to stderr.
+
+import os
+import sys
+import json
+import time
+import uuid
+import asyncio
+import logging
+import argparse
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from supabase import create_client
+from tasks import process_videos
+from adaptive_concurrency import LimitedSupabase
+from keyword_tagging import TAG_MODES
+
+logger = logging.getLogger(__name__)
+
+STARTED = 'started'
+DONE = 'done'
+FAILED = 'failed'
+
+class Checkpoint:
+    """
+    Append-only JSON-lines record of each ID's latest state and session.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.states = {}
+        if os.path.exists(path):
+            with open(path, 'r') as file:
+                for line in file:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Torn last line from an interrupted write
+                        continue
+                    self.states[entry['id']] = entry
+        self._file = open(path, 'a')
+
+    def state(self, item_id):
+        return self.states.get(item_id, {}).get('state')
+
+    def session_id(self, item_id):
+        return self.states.get(item_id, {}).get('session_id')
+
+    def record(self, item_id, state, session_id, **extra):
+        entry = {'id': item_id, 'state': state, 'session_id': session_id, 'time': time.time(), **extra}
+        self.states[item_id] = entry
+        self._file.write(json.dumps(entry) + '\n')
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+def format_eta(seconds):
+    # strftime on a timestamp would wrap around after a day
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    days, hours = divmod(hours, 24)
+    clock = f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+    return f"{days}d {clock}" if days else clock
+
+class Progress:
+    def __init__(self, total, interval):
+        self.total = total
+        self.interval = interval
+        self.started = time.monotonic()
+        self.done = 0
+        self.failed = 0
+        self.skipped = 0
+        self.running = 0
+
+    def line(self):
+        elapsed = time.monotonic() - self.started
+        finished = self.done + self.failed
+        rate = finished / elapsed if elapsed else 0.0
+        parts = [f"{finished} finished ({self.failed} failed)", f"{self.running} running", f"{self.skipped} skipped",
+                 f"{rate * 3600:.0f}/h"]
+        if self.total is not None:
+            remaining = self.total - finished - self.skipped
+            eta = remaining / rate if rate else None
+            parts.insert(0, f"{finished + self.skipped}/{self.total}")
+            parts.append(f"ETA {format_eta(eta)}" if eta is not None else "ETA --")
+        return ' | '.join(parts)
+
+    async def report(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            print(self.line(), file=sys.stderr, flush=True)
+
+def read_ids(source):
+    """
+    Yield IDs lazily from a file, or stdin for "-".
+    """
+    file = sys.stdin if source == '-' else open(source, 'r')
+    try:
+        for line in file:
+            item_id = line.split('#', 1)[0].strip()
+            if item_id:
+                yield item_id
+    finally:
+        if file is not sys.stdin:
+            file.close()
+
+def count_ids(source):
+    if source == '-':
+        return None
+    return sum(1 for _ in read_ids(source))
+
+async def ingest(args):
+    supabase = LimitedSupabase(create_client(os.getenv('SUPABASE_URL'), os.getenv('SUPABASE_KEY')))
+    checkpoint = Checkpoint(args.checkpoint)
+    progress = Progress(count_ids(args.source), args.progress_interval)
+    queue = asyncio.Queue(maxsize=args.concurrency * 2)
+
+    async def produce():
+        ids = read_ids(args.source)
+        while True:
+            # Reading stdin blocks, so it happens off the event loop
+            item_id = await asyncio.to_thread(next, ids, None)
+            if item_id is None:
+                break
+            state = checkpoint.state(item_id)
+            if state == DONE or (state == FAILED and not args.retry_failed):
+                progress.skipped += 1
+                continue
+            await queue.put(item_id)
+        for _ in range(args.concurrency):
+            await queue.put(None)
+
+    async def work():
+        while (item_id := await queue.get()) is not None:
+            # An interrupted ID resumes in its original session
+            session_id = checkpoint.session_id(item_id)
+            resume = session_id is not None and checkpoint.state(item_id) == STARTED
+            if not resume:
+                session_id = str(uuid.uuid4())
+                checkpoint.record(item_id, STARTED, session_id)
+            progress.running += 1
+            started = time.monotonic()
+            try:
+                channels = await process_videos(
+                    session_id, supabase, [item_id], args.num_videos, args.num_comments, args.num_tags,
+                    args.clustering_strength, resume=resume, priority='bulk', tag_mode=args.tag_mode
+                )
+            except Exception as e:
+                logger.exception(f"Ingest of {item_id} failed")
+                channels = None
+                error = str(e)
+            else:
+                error = None if channels and item_id in channels else 'not resolved or pipeline failed'
+            progress.running -= 1
+            seconds = round(time.monotonic() - started, 1)
+            if error is None:
+                progress.done += 1
+                checkpoint.record(item_id, DONE, session_id, seconds=seconds, channel_id=channels[item_id]['channel_id'])
+            else:
+                progress.failed += 1
+                checkpoint.record(item_id, FAILED, session_id, seconds=seconds, error=error)
+
+    reporter = asyncio.create_task(progress.report())
+    try:
+        await asyncio.gather(produce(), *(work() for _ in range(args.concurrency)))
+    finally:
+        reporter.cancel()
+        checkpoint.close()
+        print(progress.line(), file=sys.stderr, flush=True)
+    return progress
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the pipeline over many channel or video IDs.')
+    parser.add_argument('source', help='file with one channel or video ID per line, or - for stdin')
+    parser.add_argument('--checkpoint', default='ingest_checkpoint.jsonl')
+    parser.add_argument('--concurrency', type=int, default=4, help='IDs processed at once')
+    parser.add_argument('--num-videos', type=int, default=10)
+    parser.add_argument('--num-comments', type=int, default=50)
+    parser.add_argument('--num-tags', type=int, default=5)
+    parser.add_argument('--clustering-strength', type=float, default=0.3)
+    parser.add_argument('--tag-mode', choices=TAG_MODES, default='llm')
+    parser.add_argument('--retry-failed', action='store_true', help='run IDs that failed in a previous run again')
+    parser.add_argument('--progress-interval', type=float, default=10, help='seconds between progress lines')
+    parser.add_argument('--log-level', default='WARNING')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level.upper(), format='%(asctime)s - %(levelname)s - %(message)s')
+    progress = asyncio.run(ingest(args))
+    sys.exit(1 if progress.failed else 0)
+
+if __name__ == '__main__':
+    main()
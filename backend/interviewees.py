@@ -0,0 +1,169 @@
+# backend/interviewees.py
+
+import os
+import re
+import asyncio
+import logging
+from collections import Counter
+
+from supabase import Client
+from utils import send_update, chunked, fetch_rows_for_videos, SUPABASE_PAGE_SIZE
+from text_processing import nlp
+from llm_gateway import llm_gateway
+from scheduler import scheduler
+
+logger = logging.getLogger(__name__)
+
+# Only the start of a description is searched; the rest is links and sponsors
+INTERVIEWEE_DESCRIPTION_CHARS = 1000
+INTERVIEWEE_BATCH_SIZE = 64
+# A name in at least this share of a channel's videos (and at least HOST_MIN_VIDEOS of them) is the host
+HOST_VIDEO_FRACTION = 0.5
+HOST_MIN_VIDEOS = 3
+# Ask the LLM about videos the NER pass cannot decide on
+INTERVIEWEE_LLM_ESCALATION = os.getenv('INTERVIEWEE_LLM_ESCALATION', 'true').lower() in ('1', 'true', 'yes')
+
+# Phrases that introduce the guest of an interview
+INTERVIEW_CUES = re.compile(r'\b(guest|interview|joined by|conversation with|sits? down with|talks? (to|with)|speaks? with)\b', re.IGNORECASE)
+
+def clean_name(text):
+    name = re.sub(r"['’]s$", '', text.strip()).strip(' .,:;-|"')
+    if len(name) < 2 or any(char.isdigit() for char in name) or not any(char.isalpha() for char in name):
+        return None
+    return name
+
+def unique_names(names):
+    seen = set()
+    unique = []
+    for name in names:
+        if name and name.lower() not in seen:
+            seen.add(name.lower())
+            unique.append(name)
+    return unique
+
+def person_entities(texts):
+    """
+    Names of the PERSON entities in each text, from one batched NER pass.
+    """
+    # Only the NER component is needed; skipping the rest makes the pass much cheaper
+    disabled = [name for name in nlp.pipe_names if name not in ('tok2vec', 'ner')]
+    return [
+        unique_names(clean_name(ent.text) for ent in doc.ents if ent.label_ == 'PERSON')
+        for doc in nlp.pipe(texts, batch_size=INTERVIEWEE_BATCH_SIZE, disable=disabled)
+    ]
+
+def find_hosts(candidates, channel_title):
+    """
+    Names that recur across most of a channel's videos, or that make up the
+    channel's own title, belong to the host rather than to a guest.
+    """
+    counts = Counter(name.lower() for names in candidates for name in set(names))
+    threshold = max(HOST_MIN_VIDEOS, HOST_VIDEO_FRACTION * len(candidates))
+    hosts = {name for name, count in counts.items() if count >= threshold}
+    title_words = set(re.findall(r'\w+', (channel_title or '').lower()))
+    for name in counts:
+        words = set(re.findall(r'\w+', name))
+        if words and words <= title_words:
+            hosts.add(name)
+    return hosts
+
+def extract_interviewees(videos, channel_title=None):
+    """
+    Find interviewees from titles and descriptions with spaCy NER.
+
+    Returns ({video_id: [names]}, [ambiguous videos]). A title naming people
+    settles a video; so does a description naming no one, or naming a single
+    person next to an interview cue. Anything else is ambiguous.
+    """
+    titles = person_entities([video.get('title') or '' for video in videos])
+    heads = [(video.get('description') or '')[:INTERVIEWEE_DESCRIPTION_CHARS] for video in videos]
+    descriptions = person_entities(heads)
+    hosts = find_hosts([t + d for t, d in zip(titles, descriptions)], channel_title)
+
+    interviewees = {}
+    ambiguous = []
+    for video, head, title_names, description_names in zip(videos, heads, titles, descriptions):
+        title_names = [name for name in title_names if name.lower() not in hosts]
+        description_names = [name for name in description_names if name.lower() not in hosts]
+        if title_names:
+            interviewees[video['video_id']] = title_names
+        elif not description_names:
+            interviewees[video['video_id']] = []
+        elif len(description_names) == 1 and INTERVIEW_CUES.search(head):
+            interviewees[video['video_id']] = description_names
+        else:
+            ambiguous.append(video)
+    return interviewees, ambiguous
+
+def estimate_interviewee_tokens(title, description):
+    return (len(title) + len(description)) // 4 + 100
+
+async def identify_interviewees(title, description):
+    """
+    Identify interviewees using OpenAI GPT-3.5 Turbo.
+    """
+    prompt = (
+        f"Based on the following title and description, identify the names of the people being interviewed."
+        f" Do not include the host. Do not include any information other than the interviewees."
+        f" If there are multiple people, their names should be listed and separated by a comma.  For example: 'John Doe, Jane Smith'."
+        f" If nobody is being interviewed, reply with 'None'.\n\n"
+        f"Title: {title}\nDescription: {description}"
+    )
+    content = await llm_gateway.chat(
+        model="gpt-3.5-turbo",
+        messages=[
+            {"role": "system", "content": "You are a helpful assistant."},
+            {"role": "user", "content": prompt}
+        ]
+    )
+    interviewees = content.strip().split(',')
+    interviewees = [person.strip() for person in interviewees if person.strip() and person.strip().lower() != 'none']
+    return interviewees
+
+async def update_interviewees(session_id, supabase: Client, channel_id, videos):
+    """
+    Fill videos.interviewees for a channel's videos: one batched NER pass, LLM
+    calls only for the ambiguous videos, and a single bulk write.
+    Returns ({video_id: [names]}, [IDs of videos whose LLM call failed]); the
+    failed ones are left unwritten.
+    """
+    missing = [video['video_id'] for video in videos if 'title' not in video]
+    if missing:
+        # Videos reused from a previous run carry only their IDs
+        rows = await asyncio.to_thread(fetch_rows_for_videos, supabase, 'videos', 'video_id, title, description', missing)
+        stored = {row['video_id']: row for row in rows}
+        videos = [stored.get(video['video_id'], video) if 'title' not in video else video for video in videos]
+    rows = (await supabase.table('channels').select('channel_name').eq('channel_id', channel_id).execute_async()).data
+    channel_title = rows[0]['channel_name'] if rows else None
+
+    interviewees, ambiguous = await asyncio.to_thread(extract_interviewees, videos, channel_title)
+    logger.info(f"NER settled interviewees for {len(interviewees)} of {len(videos)} videos in channel ID: {channel_id}")
+
+    failed = []
+    if ambiguous and INTERVIEWEE_LLM_ESCALATION:
+        async def escalate(video):
+            title = video.get('title') or ''
+            description = (video.get('description') or '')[:INTERVIEWEE_DESCRIPTION_CHARS]
+            scheduler.charge_llm_tokens(session_id, estimate_interviewee_tokens(title, description))
+            return await identify_interviewees(title, description)
+
+        results = await asyncio.gather(*(escalate(video) for video in ambiguous), return_exceptions=True)
+        for video, result in zip(ambiguous, results):
+            if isinstance(result, Exception):
+                logger.error(f"Failed to identify interviewees for video ID {video['video_id']}: {str(result)}")
+                failed.append(video['video_id'])
+                continue
+            interviewees[video['video_id']] = unique_names(clean_name(name) for name in result)
+
+    updates = [{'video_id': video_id, 'interviewees': ", ".join(names)} for video_id, names in interviewees.items()]
+    for chunk in chunked(updates, SUPABASE_PAGE_SIZE):
+        await supabase.table('videos').upsert(chunk).execute_async()
+
+    success = await send_update(
+        session_id,
+        f"Identified interviewees for {len(updates)} videos in channel ID: {channel_id} ({len(ambiguous)} needed the LLM)",
+        supabase
+    )
+    if not success:
+        logger.error(f"Failed to send update for interviewees of channel {channel_id}")
+    return interviewees, failed
@@ -0,0 +1,77 @@
+# backend/keyword_tagging.py
+
+import os
+import logging
+
+import numpy as np
+from sklearn.feature_extraction.text import CountVectorizer
+
+from embeddings import encode
+
+logger = logging.getLogger(__name__)
+
+# "llm" asks GPT-4 for tags; "local" ranks transcript keyphrases with the embedding model
+TAG_MODES = ('llm', 'local')
+
+KEYWORD_NGRAM_RANGE = (1, 3)
+# Most frequent candidate phrases that are embedded and ranked
+KEYWORD_MAX_CANDIDATES = int(os.getenv('KEYWORD_MAX_CANDIDATES', 300))
+# 0 ranks purely by relevance; higher values favour tags unlike the ones already picked
+KEYWORD_DIVERSITY = float(os.getenv('KEYWORD_DIVERSITY', 0.5))
+# The model reads about 128 tokens, so the document is embedded as evenly spaced chunks
+KEYWORD_CHUNK_WORDS = 100
+KEYWORD_MAX_CHUNKS = 32
+
+def candidate_phrases(text, max_candidates=KEYWORD_MAX_CANDIDATES):
+    """
+    The most frequent 1-3 word phrases of a text that contain no stop words.
+    """
+    vectorizer = CountVectorizer(ngram_range=KEYWORD_NGRAM_RANGE, stop_words='english', token_pattern=r'(?u)\b[a-zA-Z][a-zA-Z]+\b')
+    try:
+        counts = vectorizer.fit_transform([text])
+    except ValueError:
+        # Nothing but stop words
+        return []
+    phrases = vectorizer.get_feature_names_out()
+    frequencies = counts.toarray()[0]
+    order = np.argsort(-frequencies, kind='stable')[:max_candidates]
+    return [phrases[i] for i in order]
+
+def document_embedding(text):
+    """
+    Mean of the embeddings of up to KEYWORD_MAX_CHUNKS evenly spaced chunks.
+    """
+    words = text.split()
+    chunks = [' '.join(words[i:i + KEYWORD_CHUNK_WORDS]) for i in range(0, len(words), KEYWORD_CHUNK_WORDS)]
+    if len(chunks) > KEYWORD_MAX_CHUNKS:
+        chunks = [chunks[i] for i in np.linspace(0, len(chunks) - 1, KEYWORD_MAX_CHUNKS).astype(int)]
+    embedding = encode(chunks).mean(axis=0)
+    return embedding / np.linalg.norm(embedding)
+
+def maximal_marginal_relevance(document, candidates, count, diversity=KEYWORD_DIVERSITY):
+    """
+    Pick `count` candidate rows, each time the one most similar to the document
+    and least similar to those already picked. Returns row indices in pick order.
+    """
+    relevance = candidates @ document
+    selected = [int(np.argmax(relevance))]
+    redundancy = candidates @ candidates[selected[0]]
+    while len(selected) < min(count, len(candidates)):
+        scores = (1 - diversity) * relevance - diversity * redundancy
+        scores[selected] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        redundancy = np.maximum(redundancy, candidates @ candidates[best])
+    return selected
+
+def extract_keyword_tags(transcript_text, num_tags):
+    """
+    Tags for a transcript without an LLM: candidate n-grams ranked by
+    similarity to the whole transcript with an MMR diversity penalty, most
+    relevant first like generate_tags.
+    """
+    phrases = candidate_phrases(transcript_text)
+    if not phrases:
+        return []
+    selected = maximal_marginal_relevance(document_embedding(transcript_text), encode(phrases), num_tags)
+    return [phrases[i] for i in selected]
@@ -0,0 +1,124 @@
+# backend/limiter_simulation.py
+#
+# Drives an AdaptiveLimiter against a local stub dependency whose capacity
+# drops and recovers:
+#
+#   python limiter_simulation.py --capacities 20,4,20 --phase-seconds 5
+#
+# The stub serves up to `capacity` calls at its base latency; beyond that
+# latency grows with the overload, and past twice the capacity it answers
+# 429. Clients call it in a closed loop through the limiter. For each phase
+# it reports the mean limit, throughput and overload rate, and exits
+# non-zero when the limit failed to come down to the degraded capacity or
+# to grow back afterwards.
+
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+
+from adaptive_concurrency import AdaptiveLimiter
+
+class Overloaded(Exception):
+    status_code = 429
+
+class StubDependency:
+    def __init__(self, capacity, base_latency):
+        self.capacity = capacity
+        self.base_latency = base_latency
+        self.in_flight = 0
+
+    async def call(self):
+        self.in_flight += 1
+        try:
+            if self.in_flight > 2 * self.capacity:
+                await asyncio.sleep(self.base_latency / 10)
+                raise Overloaded()
+            excess = max(0, self.in_flight - self.capacity) / self.capacity
+            await asyncio.sleep(self.base_latency * (1 + 4 * excess) * random.uniform(0.9, 1.1))
+        finally:
+            self.in_flight -= 1
+
+class PhaseStats:
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.calls = 0
+        self.overloads = 0
+        self.limits = []
+
+async def simulate(args):
+    capacities = [int(capacity) for capacity in args.capacities.split(',')]
+    limiter = AdaptiveLimiter('stub', initial=args.initial, min=1, max=args.max_limit)
+    stub = StubDependency(capacities[0], args.base_latency_ms / 1000)
+    phases = [PhaseStats(capacity) for capacity in capacities]
+    current = phases[0]
+    stop = False
+
+    async def client():
+        while not stop:
+            phase = current
+            try:
+                async with limiter.async_slot():
+                    await stub.call()
+            except Overloaded:
+                phase.overloads += 1
+            phase.calls += 1
+
+    async def sample():
+        while not stop:
+            current.limits.append(limiter.limit)
+            await asyncio.sleep(0.05)
+
+    tasks = [asyncio.create_task(client()) for _ in range(args.clients)] + [asyncio.create_task(sample())]
+    for phase in phases:
+        current = phase
+        stub.capacity = phase.capacity
+        await asyncio.sleep(args.phase_seconds)
+    stop = True
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return phases, limiter
+
+def evaluate(phases, phase_seconds):
+    """
+    Per-phase report, and the phases where the limit failed to follow the capacity.
+    """
+    report = []
+    failures = []
+    for index, phase in enumerate(phases):
+        # The second half of a phase shows where the limit settled
+        settled = phase.limits[len(phase.limits) // 2:] or [0]
+        result = {
+            'capacity': phase.capacity,
+            'mean_limit': round(sum(phase.limits) / max(1, len(phase.limits)), 1),
+            'settled_limit': round(sum(settled) / len(settled), 1),
+            'calls_per_second': round(phase.calls / phase_seconds, 1),
+            'overload_rate': round(phase.overloads / max(1, phase.calls), 4),
+        }
+        report.append(result)
+        if result['settled_limit'] > 2 * phase.capacity:
+            failures.append(f"phase {index}: limit settled at {result['settled_limit']} above twice the capacity {phase.capacity}")
+        if index and phase.capacity > phases[index - 1].capacity and result['settled_limit'] < phase.capacity / 2:
+            failures.append(f"phase {index}: limit settled at {result['settled_limit']}, not recovering towards {phase.capacity}")
+    return report, failures
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Simulate the AIMD limiter against a degrading stub dependency.')
+    parser.add_argument('--capacities', default='20,4,20', help='stub capacity in each phase')
+    parser.add_argument('--phase-seconds', type=float, default=5)
+    parser.add_argument('--clients', type=int, default=64, help='closed-loop callers')
+    parser.add_argument('--base-latency-ms', type=float, default=50)
+    parser.add_argument('--initial', type=float, default=4)
+    parser.add_argument('--max-limit', type=int, default=64)
+    return parser.parse_args(argv)
+
+def main():
+    args = parse_args()
+    phases, limiter = asyncio.run(simulate(args))
+    report, failures = evaluate(phases, args.phase_seconds)
+    print(json.dumps({'phases': report, 'limiter': limiter.metrics(), 'failures': failures}, indent=2))
+    sys.exit(1 if failures else 0)
+
+if __name__ == '__main__':
+    main()
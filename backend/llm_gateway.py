@@ -0,0 +1,160 @@
+# backend/llm_gateway.py
+
+import os
+import time
+import asyncio
+import logging
+
+import openai
+from openai import AsyncOpenAI
+from tenacity import AsyncRetrying, retry_if_exception, stop_after_attempt, wait_random_exponential
+
+from adaptive_concurrency import dependency_limiter
+
+logger = logging.getLogger(__name__)
+
+OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
+OPENAI_BASE_URL = os.getenv('OPENAI_BASE_URL')
+
+LLM_REQUESTS_PER_MINUTE = int(os.getenv('LLM_REQUESTS_PER_MINUTE', 500))
+LLM_TOKENS_PER_MINUTE = int(os.getenv('LLM_TOKENS_PER_MINUTE', 30000))
+LLM_TIMEOUT_SECONDS = float(os.getenv('LLM_TIMEOUT_SECONDS', 60))
+LLM_MAX_ATTEMPTS = int(os.getenv('LLM_MAX_ATTEMPTS', 5))
+LLM_MAX_OUTPUT_TOKENS = int(os.getenv('LLM_MAX_OUTPUT_TOKENS', 256))
+
+# Point the gateway at llm_mock_server.py instead of OpenAI, e.g. for tests
+LLM_GATEWAY_MOCK = os.getenv('LLM_GATEWAY_MOCK', '').lower() in ('1', 'true', 'yes')
+LLM_MOCK_URL = os.getenv('LLM_MOCK_URL', 'http://127.0.0.1:8001/v1')
+
+def estimate_tokens(text):
+    """
+    Rough token count: about four characters per token.
+    """
+    return len(text) // 4 + 1
+
+class RateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute token buckets. Callers wait until
+    both buckets hold enough capacity instead of tripping the provider's limit.
+    """
+
+    def __init__(self, requests_per_minute, tokens_per_minute):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._requests = float(requests_per_minute)
+        self._tokens = float(tokens_per_minute)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        self._requests = min(self.requests_per_minute, self._requests + elapsed * self.requests_per_minute / 60)
+        self._tokens = min(self.tokens_per_minute, self._tokens + elapsed * self.tokens_per_minute / 60)
+
+    async def acquire(self, tokens):
+        tokens = min(tokens, self.tokens_per_minute)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._requests >= 1 and self._tokens >= tokens:
+                    self._requests -= 1
+                    self._tokens -= tokens
+                    return
+                wait = max(
+                    (1 - self._requests) * 60 / self.requests_per_minute,
+                    (tokens - self._tokens) * 60 / self.tokens_per_minute
+                )
+                await asyncio.sleep(wait)
+
+    def adjust(self, tokens):
+        """
+        Correct the token bucket once the actual usage of a call is known.
+        """
+        self._tokens -= tokens
+
+def _is_retryable(exception):
+    if isinstance(exception, (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError, asyncio.TimeoutError)):
+        return True
+    return isinstance(exception, openai.APIStatusError) and exception.status_code >= 500
+
+_exponential_wait = wait_random_exponential(multiplier=1, max=60)
+
+def _wait(retry_state):
+    # Honour Retry-After on 429s; otherwise back off exponentially with jitter
+    exception = retry_state.outcome.exception()
+    response = getattr(exception, 'response', None)
+    if response is not None:
+        try:
+            return float(response.headers.get('retry-after'))
+        except (TypeError, ValueError):
+            pass
+    return _exponential_wait(retry_state)
+
+class LLMGateway:
+    """
+    Async chat-completion client with an adaptive concurrency limit (capped
+    by LLM_MAX_CONCURRENCY), RPM/TPM limiting, per-call timeouts and retries
+    with backoff on 429/5xx.
+    """
+
+    def __init__(self, requests_per_minute=LLM_REQUESTS_PER_MINUTE, tokens_per_minute=LLM_TOKENS_PER_MINUTE):
+        self._client = None
+        self._concurrency = dependency_limiter('openai')
+        self._limiters = {}
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.stats = {'requests': 0, 'retries': 0, 'errors': 0, 'prompt_tokens': 0, 'completion_tokens': 0, 'in_flight': 0}
+
+    @property
+    def client(self):
+        if self._client is None:
+            if LLM_GATEWAY_MOCK:
+                logger.info(f"LLM gateway using mock server at {LLM_MOCK_URL}")
+                self._client = AsyncOpenAI(api_key='mock', base_url=LLM_MOCK_URL, max_retries=0)
+            else:
+                self._client = AsyncOpenAI(api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL, max_retries=0)
+        return self._client
+
+    def _limiter(self, model):
+        # Provider limits apply per model
+        if model not in self._limiters:
+            self._limiters[model] = RateLimiter(self.requests_per_minute, self.tokens_per_minute)
+        return self._limiters[model]
+
+    async def chat(self, model, messages, max_tokens=LLM_MAX_OUTPUT_TOKENS, timeout=LLM_TIMEOUT_SECONDS):
+        """
+        Return the assistant message content of a chat completion.
+        """
+        estimated = sum(estimate_tokens(message['content']) for message in messages) + max_tokens
+        limiter = self._limiter(model)
+        async for attempt in AsyncRetrying(retry=retry_if_exception(_is_retryable), wait=_wait,
+                                           stop=stop_after_attempt(LLM_MAX_ATTEMPTS), reraise=True):
+            with attempt:
+                if attempt.retry_state.attempt_number > 1:
+                    self.stats['retries'] += 1
+                await limiter.acquire(estimated)
+                async with self._concurrency.async_slot():
+                    self.stats['requests'] += 1
+                    self.stats['in_flight'] += 1
+                    try:
+                        response = await asyncio.wait_for(
+                            self.client.chat.completions.create(model=model, messages=messages, max_tokens=max_tokens, timeout=timeout),
+                            timeout
+                        )
+                    except Exception:
+                        self.stats['errors'] += 1
+                        raise
+                    finally:
+                        self.stats['in_flight'] -= 1
+        if response.usage is not None:
+            self.stats['prompt_tokens'] += response.usage.prompt_tokens
+            self.stats['completion_tokens'] += response.usage.completion_tokens
+            limiter.adjust(response.usage.total_tokens - estimated)
+        return response.choices[0].message.content
+
+    def metrics(self):
+        return {**self.stats, 'mock': LLM_GATEWAY_MOCK}
+
+llm_gateway = LLMGateway()
@@ -0,0 +1,80 @@
+# backend/llm_mock_server.py
+#
+# OpenAI-compatible stand-in for exercising the LLM gateway without spending tokens:
+#
+#   uvicorn llm_mock_server:app --port 8001
+#   LLM_GATEWAY_MOCK=1 uvicorn main:app
+#
+# MOCK_LLM_LATENCY_SECONDS adds a delay to every reply and MOCK_LLM_ERROR_RATE
+# answers that fraction of requests with a 429 so retries and backoff can be observed.
+# MOCK_LLM_FAIL_FIRST answers the first N requests with a 429 instead, for
+# repeatable tests; MOCK_LLM_RETRY_AFTER is the Retry-After those 429s carry.
+
+import os
+import re
+import time
+import uuid
+import random
+import asyncio
+from collections import Counter
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+MOCK_LLM_LATENCY_SECONDS = float(os.getenv('MOCK_LLM_LATENCY_SECONDS', 0.2))
+MOCK_LLM_ERROR_RATE = float(os.getenv('MOCK_LLM_ERROR_RATE', 0))
+MOCK_LLM_FAIL_FIRST = int(os.getenv('MOCK_LLM_FAIL_FIRST', 0))
+MOCK_LLM_RETRY_AFTER = os.getenv('MOCK_LLM_RETRY_AFTER', '1')
+
+STOPWORDS = {
+    'the', 'and', 'for', 'that', 'this', 'with', 'you', 'are', 'was', 'but', 'not', 'have', 'they',
+    'from', 'what', 'your', 'just', 'like', 'about', 'there', 'their', 'would', 'which', 'these',
+    'tags', 'transcript', 'relevant', 'following', 'provide', 'list', 'separated', 'commas',
+}
+
+app = FastAPI()
+stats = {'requests': 0, 'rate_limited': 0}
+
+def _count_tokens(text):
+    return len(text) // 4 + 1
+
+def _reply(prompt):
+    # Deterministic pseudo-tags: the most frequent longer words of the prompt
+    match = re.search(r'Generate (\d+)', prompt)
+    count = int(match.group(1)) if match else 5
+    words = [word for word in re.findall(r'[a-z]{4,}', prompt.lower()) if word not in STOPWORDS]
+    return ', '.join(word for word, _ in Counter(words).most_common(count))
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    stats['requests'] += 1
+    await asyncio.sleep(MOCK_LLM_LATENCY_SECONDS)
+    if stats['requests'] <= MOCK_LLM_FAIL_FIRST or random.random() < MOCK_LLM_ERROR_RATE:
+        stats['rate_limited'] += 1
+        return JSONResponse(
+            status_code=429,
+            headers={'retry-after': MOCK_LLM_RETRY_AFTER},
+            content={'error': {'message': 'Rate limit reached (mock)', 'type': 'requests', 'code': 'rate_limit_exceeded'}}
+        )
+
+    prompt = body['messages'][-1]['content']
+    content = _reply(prompt)
+    prompt_tokens = sum(_count_tokens(message['content']) for message in body['messages'])
+    completion_tokens = _count_tokens(content)
+    return {
+        'id': f"chatcmpl-mock-{uuid.uuid4().hex}",
+        'object': 'chat.completion',
+        'created': int(time.time()),
+        'model': body.get('model', 'mock'),
+        'choices': [{
+            'index': 0,
+            'message': {'role': 'assistant', 'content': content},
+            'finish_reason': 'stop',
+        }],
+        'usage': {
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'total_tokens': prompt_tokens + completion_tokens,
+        },
+    }
@@ -0,0 +1,180 @@
+# backend/load_test.py
+#
+# Load test of the HTTP tier for POST /process:
+#
+#   python load_test.py --stages 1,10,50,100 --duration 10 --slo-p95-ms 100
+#
+# The FastAPI app runs under uvicorn in this process on its own thread and
+# event loop, with Supabase replaced by an in-memory stub whose calls block
+# for --supabase-latency-ms like the real synchronous client, and with the
+# background pipeline replaced by a no-op, so only the submit path is
+# measured. YouTube is never reached on that path. Each stage runs the
+# given number of concurrent clients for --duration seconds and reports
+# p50/p95/p99 latency, throughput and error rate. Exits non-zero when any
+# stage breaks an SLO.
+
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import threading
+
+import numpy as np
+
+class StubResult:
+    def __init__(self, data):
+        self.data = data
+
+class StubQuery:
+    """
+    Chainable stand-in for a postgrest query; execute() blocks like a round trip.
+    """
+
+    def __init__(self, store, table, latency):
+        self._store = store
+        self._table = table
+        self._latency = latency
+        self._rows = None
+
+    def insert(self, rows, **kwargs):
+        self._rows = rows if isinstance(rows, list) else [rows]
+        return self
+
+    upsert = insert
+
+    def _chain(self, *args, **kwargs):
+        return self
+
+    select = update = delete = eq = in_ = gt = order = limit = range = _chain
+
+    def execute(self):
+        time.sleep(self._latency)
+        if self._rows is not None:
+            with self._store['lock']:
+                self._store.setdefault(self._table, 0)
+                self._store[self._table] += len(self._rows)
+            return StubResult(self._rows)
+        return StubResult([])
+
+class StubSupabase:
+    def __init__(self, latency):
+        self.latency = latency
+        self.store = {'lock': threading.Lock()}
+
+    def table(self, name):
+        return StubQuery(self.store, name, self.latency)
+
+def load_app(supabase_latency):
+    import supabase as supabase_module
+
+    stub = StubSupabase(supabase_latency)
+    supabase_module.create_client = lambda url, key: stub
+    os.environ.setdefault('SUPABASE_URL', 'http://supabase.stub')
+    os.environ.setdefault('SUPABASE_KEY', 'stub')
+    import main
+
+    async def run_session(session_id, *args, **kwargs):
+        pass
+
+    main.run_session = run_session
+    return main.app, stub
+
+def start_server(app, port):
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(app, host='127.0.0.1', port=port, log_level='warning', lifespan='off'))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+PAYLOAD = {'video_ids': ['dQw4w9WgXcQ'], 'num_videos': 5, 'num_comments': 20, 'num_tags': 5, 'clustering_strength': 0.3}
+
+async def run_stage(url, clients, duration):
+    import httpx
+
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def client(http):
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                response = await http.post(url, json=PAYLOAD)
+                if response.status_code != 200:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(limits=limits, timeout=30) as http:
+        started = time.perf_counter()
+        await asyncio.gather(*(client(http) for _ in range(clients)))
+        elapsed = time.perf_counter() - started
+
+    milliseconds = np.array(latencies) * 1000
+    return {
+        'clients': clients,
+        'requests': len(latencies),
+        'requests_per_second': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(float(np.percentile(milliseconds, 50)), 1),
+        'p95_ms': round(float(np.percentile(milliseconds, 95)), 1),
+        'p99_ms': round(float(np.percentile(milliseconds, 99)), 1),
+        'error_rate': round(errors / max(1, len(latencies)), 4),
+    }
+
+def check_slos(result, args):
+    violations = []
+    if args.slo_p95_ms is not None and result['p95_ms'] > args.slo_p95_ms:
+        violations.append(f"p95 {result['p95_ms']}ms > {args.slo_p95_ms}ms")
+    if args.slo_p99_ms is not None and result['p99_ms'] > args.slo_p99_ms:
+        violations.append(f"p99 {result['p99_ms']}ms > {args.slo_p99_ms}ms")
+    if result['error_rate'] > args.slo_error_rate:
+        violations.append(f"error rate {result['error_rate']} > {args.slo_error_rate}")
+    return violations
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test POST /process against stubbed backends.')
+    parser.add_argument('--stages', default='1,10,50,100', help='concurrent clients per ramp stage')
+    parser.add_argument('--duration', type=float, default=10, help='seconds per stage')
+    parser.add_argument('--supabase-latency-ms', type=float, default=20)
+    parser.add_argument('--slo-p95-ms', type=float, default=250)
+    parser.add_argument('--slo-p99-ms', type=float, default=500)
+    parser.add_argument('--slo-error-rate', type=float, default=0.001)
+    args = parser.parse_args()
+
+    app, stub = load_app(args.supabase_latency_ms / 1000)
+    port = free_port()
+    server, thread = start_server(app, port)
+    url = f"http://127.0.0.1:{port}/process"
+
+    report = []
+    failed = False
+    try:
+        for clients in (int(stage) for stage in args.stages.split(',')):
+            result = asyncio.run(run_stage(url, clients, args.duration))
+            result['slo_violations'] = check_slos(result, args)
+            failed = failed or bool(result['slo_violations'])
+            report.append(result)
+            print(json.dumps(result), file=sys.stderr)
+    finally:
+        server.should_exit = True
+        thread.join()
+
+    print(json.dumps({'stages': report, 'supabase_writes': {k: v for k, v in stub.store.items() if k != 'lock'}}, indent=2))
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
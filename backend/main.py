@@ -1,16 +1,35 @@
 # backend/main.py
 
 import os
+import hmac
 import uuid
 import json
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, BackgroundTasks, HTTPException
+import asyncio
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, BackgroundTasks, HTTPException, Request, Header, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 from supabase import create_client, Client
 import logging
-from typing import List
-from utils import send_update
+from typing import List, Optional
+from collections import Counter
+from datetime import datetime, timedelta
+from utils import send_update, fetch_rows_for_videos
 from tasks import process_videos
+from checkpoints import load_session, save_session, claim_session
+from scheduler import scheduler, classify_priority
+from memory import memory_governor, MEMORY_RETRY_AFTER_SECONDS
+from pipeline import pipeline_metrics
+from profiling import profiler, PROFILING_ENABLED, ADMIN_TOKEN, PROFILE_MODES
+from youtube_api import key_pool
+from youtube_cache import youtube_cache
+from adaptive_concurrency import LimitedSupabase, dependency_metrics
+from llm_gateway import llm_gateway
+from embedding_cache import get_embedding_cache
+from keyword_tagging import TAG_MODES
+from embeddings import encode
+from tag_index import get_tag_index
+from transcript_store import load_transcript
+from read_cache import cached_response, response_cache, channel_scope, video_scope, CHANNELS_SCOPE
 
 # Load environment variables from .env file
 load_dotenv()
@@ -38,16 +57,57 @@ app.add_middleware(
 # Initialize Supabase client
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+# Table queries share an adaptive concurrency limit
+supabase: Client = LimitedSupabase(create_client(SUPABASE_URL, SUPABASE_KEY))
 
 # Set up logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logging.basicConfig(level=os.getenv('LOG_LEVEL', 'INFO').upper(), format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# A running session refreshes its sessions row this often, so that every
+# worker can tell it is still running; a row not refreshed for three
+# intervals belongs to a session whose worker died
+SESSION_HEARTBEAT_SECONDS = float(os.getenv('SESSION_HEARTBEAT_SECONDS', 30))
+
+# Sessions whose pipeline is running, or about to be resumed, in this process
+active_sessions = set()
+
+async def heartbeat(session_id):
+    while True:
+        await asyncio.sleep(SESSION_HEARTBEAT_SECONDS)
+        await asyncio.to_thread(save_session, supabase, session_id)
+
+async def run_session(session_id, *args, **kwargs):
+    active_sessions.add(session_id)
+    beat = asyncio.create_task(heartbeat(session_id))
+    try:
+        await process_videos(session_id, *args, **kwargs)
+    finally:
+        beat.cancel()
+        active_sessions.discard(session_id)
+
+def running_elsewhere(session):
+    """
+    Whether a session is running in another worker process.
+    """
+    if session.get('status') != 'running' or not session.get('updated_at'):
+        return False
+    updated_at = datetime.fromisoformat(session['updated_at']).replace(tzinfo=None)
+    return datetime.utcnow() - updated_at < timedelta(seconds=3 * SESSION_HEARTBEAT_SECONDS)
+
+def reject_if_memory_exhausted():
+    if memory_governor.should_reject():
+        raise HTTPException(
+            status_code=503,
+            detail="Server is close to its memory limit; retry later",
+            headers={"Retry-After": str(MEMORY_RETRY_AFTER_SECONDS)}
+        )
+
 # Update the initiate_processing function
 @app.post("/process")
 async def initiate_processing(request: dict, background_tasks: BackgroundTasks):
     try:
+        reject_if_memory_exhausted()
         session_id = str(uuid.uuid4())
         logger.info(f"Initiating processing for session {session_id}")
         
@@ -57,33 +117,288 @@ async def initiate_processing(request: dict, background_tasks: BackgroundTasks):
         num_comments = request.get("num_comments", 50)
         num_tags = request.get("num_tags", 5)
         clustering_strength = request.get("clustering_strength", 0.3)
+        tag_mode = request.get("tag_mode", "llm")
+        if tag_mode not in TAG_MODES:
+            raise HTTPException(status_code=400, detail=f"Unknown tag_mode {tag_mode!r}; expected one of {', '.join(TAG_MODES)}")
+        try:
+            priority = classify_priority(request.get("priority"), len(video_ids) * num_videos)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
-        logger.info(f"Processing parameters: video_ids={video_ids}, num_videos={num_videos}, num_comments={num_comments}, num_tags={num_tags}, clustering_strength={clustering_strength}")
+        logger.info(f"Processing parameters: video_ids={video_ids}, num_videos={num_videos}, num_comments={num_comments}, num_tags={num_tags}, clustering_strength={clustering_strength}, priority={priority}, tag_mode={tag_mode}")
 
-        # Send initial update
-        success = await send_update(session_id, "Processing started. Waiting for updates...", supabase)
-        if not success:
-            logger.error(f"Failed to send initial update for session {session_id}")
-            # You might want to handle this failure, perhaps by raising an exception
+        # Send initial update once the response is out; background tasks run in order,
+        # so it still precedes every pipeline update
+        background_tasks.add_task(send_update, session_id, "Processing started. Waiting for updates...", supabase)
 
         # Start background task for processing
         logger.info(f"Starting background task for session {session_id}")
         background_tasks.add_task(
-            process_videos,
+            run_session,
             session_id,
             supabase,
             video_ids,
             num_videos,
             num_comments,
             num_tags,
-            clustering_strength
+            clustering_strength,
+            priority=priority,
+            tag_mode=tag_mode
         )
 
-        return {"session_id": session_id}
+        return {"session_id": session_id, "priority": priority}
+    except HTTPException:
+        raise
     except Exception as e:
         logger.exception(f"Error in initiate_processing: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/sessions/{session_id}/resume")
+async def resume_session(session_id: str, background_tasks: BackgroundTasks):
+    """
+    Resume an interrupted session, re-running only the stages that did not complete.
+    """
+    if session_id in active_sessions:
+        raise HTTPException(status_code=409, detail=f"Session {session_id} is still running")
+    # Claimed before the first await so a second request sees it
+    active_sessions.add(session_id)
+    started = False
+    try:
+        session = await asyncio.to_thread(load_session, supabase, session_id)
+        if session is None:
+            raise HTTPException(status_code=404, detail=f"Session {session_id} not found")
+        if session.get('status') == 'completed':
+            return {"session_id": session_id, "status": "completed"}
+        if running_elsewhere(session):
+            raise HTTPException(status_code=409, detail=f"Session {session_id} is still running")
+        reject_if_memory_exhausted()
+        # Another worker may have passed the same checks meanwhile
+        if not await asyncio.to_thread(claim_session, supabase, session):
+            raise HTTPException(status_code=409, detail=f"Session {session_id} is being resumed by another request")
+
+        parameters = session['parameters']
+        logger.info(f"Resuming session {session_id} with parameters {parameters}")
+        success = await send_update(session_id, "Resume requested. Skipping completed stages...", supabase)
+        if not success:
+            logger.error(f"Failed to send resume update for session {session_id}")
+
+        background_tasks.add_task(
+            run_session,
+            session_id,
+            supabase,
+            parameters['video_ids'],
+            parameters['num_videos'],
+            parameters['num_comments'],
+            parameters['num_tags'],
+            parameters['clustering_strength'],
+            resume=True,
+            priority=parameters.get('priority', 'interactive'),
+            tag_mode=parameters.get('tag_mode', 'llm')
+        )
+        started = True
+        return {"session_id": session_id, "status": "resuming"}
+    finally:
+        if not started:
+            active_sessions.discard(session_id)
+
+@app.get("/scheduler")
+async def scheduler_stats():
+    """
+    Report running and queued work units and LLM token use per session.
+    """
+    return scheduler.stats()
+
+@app.get("/metrics")
+async def metrics():
+    """
+    Operational metrics for external dependencies.
+    """
+    return {"youtube_keys": key_pool.metrics(), "youtube_cache": youtube_cache.metrics(), "dependencies": dependency_metrics(), "llm": llm_gateway.metrics(), "embedding_cache": get_embedding_cache().metrics(), "read_cache": response_cache.metrics(), "memory": memory_governor.metrics(), "pipeline": pipeline_metrics()}
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    # Unless profiling is enabled the admin endpoints do not exist
+    if not PROFILING_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not ADMIN_TOKEN or not hmac.compare_digest(x_admin_token or '', ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+@app.post("/admin/profiles", dependencies=[Depends(require_admin)])
+async def start_profile(request: dict):
+    """
+    Profile the process for `seconds`, or for as long as `session_id` runs.
+    `mode` is "sampling" (all threads, collapsed stacks) or "cprofile" (the
+    event loop thread, pstats).
+    """
+    session_id = request.get("session_id")
+    try:
+        capture = profiler.start(
+            request.get("mode", "sampling"),
+            session_id=session_id,
+            seconds=request.get("seconds"),
+            interval_ms=request.get("interval_ms", 10),
+            running=session_id in active_sessions
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return capture.describe()
+
+@app.get("/admin/profiles", dependencies=[Depends(require_admin)])
+async def list_profiles():
+    return {"modes": PROFILE_MODES, "profiles": [capture.describe(top=0) for capture in profiler.captures.values()]}
+
+@app.get("/admin/profiles/{capture_id}", dependencies=[Depends(require_admin)])
+async def get_profile(capture_id: str, top: int = 20):
+    """
+    A capture's status and, once finished, its hottest functions and artifact path.
+    """
+    capture = profiler.captures.get(capture_id)
+    if capture is None:
+        raise HTTPException(status_code=404, detail=f"Profile {capture_id} not found")
+    return capture.describe(top=top)
+
+@app.post("/admin/profiles/{capture_id}/stop", dependencies=[Depends(require_admin)])
+async def stop_profile(capture_id: str, top: int = 20):
+    if capture_id not in profiler.captures:
+        raise HTTPException(status_code=404, detail=f"Profile {capture_id} not found")
+    return profiler.stop(capture_id).describe(top=top)
+
+@app.get("/tags/search")
+async def search_tags(q: str, k: int = 10):
+    """
+    Find the videos whose tags are semantically closest to a free-text query.
+    """
+    # The first call loads the model and the index, and a search scans the matrix
+    query_embedding = (await asyncio.to_thread(encode, [q]))[0]
+    tag_index = await asyncio.to_thread(get_tag_index)
+    return {"query": q, "results": await asyncio.to_thread(tag_index.find_videos, query_embedding, k)}
+
+@app.get("/channels/{channel_id}/related")
+async def related_channels(channel_id: str, k: int = 5):
+    """
+    Find the channels whose tags are, on average, closest to this channel's tags.
+    """
+    tag_index = await asyncio.to_thread(get_tag_index)
+    results = await asyncio.to_thread(tag_index.related_channels, channel_id, k)
+    if not results:
+        raise HTTPException(status_code=404, detail=f"No indexed tags for channel {channel_id}")
+    return {"channel_id": channel_id, "results": results}
+
+# Read API. Lists are keyset-paginated: pass a page's next_cursor as `after`
+# to get the following page. Responses are cached in-process and carry an
+# ETag; the pipeline invalidates them when it writes the data they show.
+READ_PAGE_MAX = 200
+
+CHANNEL_LIST_COLUMNS = 'channel_id, channel_name, link_to_channel, subscribers, number_of_total_videos, number_of_retrieved_videos, channel_retrieval_date'
+VIDEO_LIST_COLUMNS = 'video_id, title, duration, duration_seconds, view_count, like_count, comment_count, retrieval_date, tags, interviewees, processing_status'
+COMMENT_COLUMNS = 'comment_id, comment_author, comment_likes, comment_published_at, comment_updated_at, comment_parent_id, comment_text'
+
+def keyset_page(query, key, limit, after):
+    limit = max(1, min(limit, READ_PAGE_MAX))
+    if after is not None:
+        query = query.gt(key, after)
+    rows = query.order(key).limit(limit).execute().data
+    return {"items": rows, "next_cursor": rows[-1][key] if len(rows) == limit else None}
+
+def channel_row(channel_id):
+    rows = supabase.table('channels').select('*').eq('channel_id', channel_id).execute().data
+    if not rows:
+        raise HTTPException(status_code=404, detail=f"Channel {channel_id} not found")
+    channel = rows[0]
+    video_ids = channel.get('ids_of_retrieved_videos') or []
+    # Older rows hold the ID list as a JSON-encoded string
+    channel['ids_of_retrieved_videos'] = json.loads(video_ids) if isinstance(video_ids, str) else video_ids
+    return channel
+
+def split_list(value):
+    return [item.strip() for item in (value or '').split(',') if item.strip()]
+
+@app.get("/channels")
+async def list_channels(request: Request, limit: int = 50, after: Optional[str] = None):
+    def build():
+        return keyset_page(supabase.table('channels').select(CHANNEL_LIST_COLUMNS), 'channel_id', limit, after)
+    return await cached_response(request, [CHANNELS_SCOPE], build)
+
+@app.get("/channels/{channel_id}")
+async def get_channel(request: Request, channel_id: str):
+    """
+    A channel with totals, top tags and interviewees over its retrieved videos.
+    """
+    def build():
+        channel = channel_row(channel_id)
+        videos = fetch_rows_for_videos(supabase, 'videos', 'video_id, view_count, like_count, comment_count, tags, interviewees', channel['ids_of_retrieved_videos'])
+        tag_counts = Counter(tag for video in videos for tag in split_list(video.get('tags')))
+        interviewee_counts = Counter(name for video in videos for name in split_list(video.get('interviewees')))
+        channel['aggregates'] = {
+            'videos': len(videos),
+            'views': sum(video.get('view_count') or 0 for video in videos),
+            'likes': sum(video.get('like_count') or 0 for video in videos),
+            'comments': sum(video.get('comment_count') or 0 for video in videos),
+            'top_tags': tag_counts.most_common(20),
+            'interviewees': interviewee_counts.most_common(20),
+        }
+        return channel
+    return await cached_response(request, [channel_scope(channel_id)], build)
+
+@app.get("/channels/{channel_id}/videos")
+async def list_channel_videos(request: Request, channel_id: str, limit: int = 50, after: Optional[str] = None):
+    def build():
+        video_ids = channel_row(channel_id)['ids_of_retrieved_videos']
+        if not video_ids:
+            return {"items": [], "next_cursor": None}
+        query = supabase.table('videos').select(VIDEO_LIST_COLUMNS).in_('video_id', video_ids)
+        return keyset_page(query, 'video_id', limit, after)
+    return await cached_response(request, [channel_scope(channel_id)], build)
+
+@app.get("/videos/{video_id}")
+async def get_video(request: Request, video_id: str):
+    """
+    A video with its precomputed comment analytics.
+    """
+    def build():
+        rows = supabase.table('videos').select('*').eq('video_id', video_id).execute().data
+        if not rows:
+            raise HTTPException(status_code=404, detail=f"Video {video_id} not found")
+        summaries = supabase.table('comment_summaries').select('*').eq('video_id', video_id).execute().data
+        summary = summaries[0] if summaries else None
+        if summary:
+            # Bookkeeping for incremental updates, not analytics
+            summary.pop('counted_likes', None)
+        return {**rows[0], 'comment_summary': summary}
+    return await cached_response(request, [video_scope(video_id)], build)
+
+@app.get("/videos/{video_id}/comments")
+async def list_video_comments(request: Request, video_id: str, limit: int = 100, after: Optional[str] = None):
+    def build():
+        query = supabase.table('comments').select(COMMENT_COLUMNS).eq('video_id', video_id)
+        return keyset_page(query, 'comment_id', limit, after)
+    return await cached_response(request, [video_scope(video_id)], build)
+
+@app.get("/videos/{video_id}/tags")
+async def list_video_tags(request: Request, video_id: str):
+    def build():
+        rows = supabase.table('tags').select('tag, processed_date').eq('video_id', video_id).order('tag').execute().data
+        return {"video_id": video_id, "tags": rows}
+    return await cached_response(request, [video_scope(video_id)], build)
+
+@app.get("/videos/{video_id}/transcript")
+async def get_video_transcript(request: Request, video_id: str, start: Optional[float] = None, end: Optional[float] = None):
+    """
+    Transcript segments overlapping [start, end) seconds; the whole transcript by default.
+    """
+    def build():
+        transcript = load_transcript(supabase, video_id)
+        if transcript is None:
+            raise HTTPException(status_code=404, detail=f"No transcript for video {video_id}")
+        return {
+            "video_id": video_id,
+            "duration": transcript.duration,
+            "n_segments": transcript.n_segments,
+            "segments": transcript.segments(start, end),
+        }
+    return await cached_response(request, [video_scope(video_id)], build)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -0,0 +1,218 @@
+# backend/memory.py
+
+import os
+import time
+import logging
+import resource
+import tracemalloc
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Ceiling in MB; by default the cgroup limit, else the machine's RAM
+MEMORY_LIMIT_MB = int(os.getenv('MEMORY_LIMIT_MB', 0))
+# Above this share of the ceiling no new work units start (running ones finish)
+MEMORY_SOFT_LIMIT = float(os.getenv('MEMORY_SOFT_LIMIT', 0.8))
+# Above this share new /process requests are answered 503
+MEMORY_HARD_LIMIT = float(os.getenv('MEMORY_HARD_LIMIT', 0.9))
+MEMORY_RETRY_AFTER_SECONDS = int(os.getenv('MEMORY_RETRY_AFTER_SECONDS', 30))
+# Python-heap attribution per session; costs some allocation speed
+MEMORY_TRACEMALLOC = os.getenv('MEMORY_TRACEMALLOC', 'false').lower() in ('1', 'true', 'yes')
+
+# Usage is re-read at most this often
+SAMPLE_INTERVAL_SECONDS = 0.5
+MB = 1024 * 1024
+
+OK = 'ok'
+SOFT = 'soft'
+HARD = 'hard'
+
+def _read_int(path):
+    try:
+        with open(path, 'r') as file:
+            value = file.read().strip()
+    except OSError:
+        return None
+    return int(value) if value.isdigit() else None
+
+def cgroup_files():
+    """
+    (limit, usage) files of this process's memory cgroup, v2 or v1.
+    """
+    candidates = [
+        ('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory.current'),
+        ('/sys/fs/cgroup/memory/memory.limit_in_bytes', '/sys/fs/cgroup/memory/memory.usage_in_bytes'),
+    ]
+    for limit_path, usage_path in candidates:
+        limit = _read_int(limit_path)
+        # v1 reports "no limit" as a huge number
+        if limit is not None and limit < 1 << 60:
+            return limit, usage_path
+    return None, None
+
+def cgroup_usage(usage_path):
+    """
+    Cgroup memory use without reclaimable page cache, as `docker stats` reports it.
+    """
+    usage = _read_int(usage_path)
+    if usage is None:
+        return None
+    try:
+        with open(os.path.join(os.path.dirname(usage_path), 'memory.stat'), 'r') as file:
+            for line in file:
+                key, value = line.split()
+                if key in ('inactive_file', 'total_inactive_file'):
+                    return max(0, usage - int(value))
+    except (OSError, ValueError):
+        pass
+    return usage
+
+def total_ram():
+    try:
+        with open('/proc/meminfo', 'r') as file:
+            for line in file:
+                if line.startswith('MemTotal:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+def process_rss():
+    try:
+        with open('/proc/self/statm', 'r') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        # Peak rather than current RSS, but better than nothing
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+class SessionMemory:
+    def __init__(self, session_id, rss):
+        self.session_id = session_id
+        self.started = time.time()
+        self.rss_start = rss
+        self.rss_peak = rss
+        self.attributed = 0
+        self.attributed_peak = 0
+        self.units = 0
+
+class MemoryGovernor:
+    """
+    Tracks memory use against a ceiling and sheds load as it approaches.
+
+    Usage is the cgroup's when it has a limit (what the OOM killer acts on),
+    else this process's RSS. Per session it records process RSS at start and
+    the peak while the session ran. With MEMORY_TRACEMALLOC it also records
+    the Python heap growth across each of the session's work units. That
+    attribution is approximate when units of several sessions overlap.
+    """
+
+    def __init__(self, limit_mb=MEMORY_LIMIT_MB, soft=MEMORY_SOFT_LIMIT, hard=MEMORY_HARD_LIMIT, trace=MEMORY_TRACEMALLOC):
+        cgroup_limit, self._cgroup_usage = cgroup_files()
+        if limit_mb:
+            self.limit = limit_mb * MB
+            self._cgroup_usage = None
+        else:
+            self.limit = cgroup_limit or total_ram()
+        self.soft = soft
+        self.hard = hard
+        self.trace = trace
+        self.sessions = {}
+        self.deferrals = 0
+        self.rejected_requests = 0
+        self._usage = 0
+        self._sampled = 0.0
+        if trace and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def usage(self):
+        now = time.monotonic()
+        if now - self._sampled >= SAMPLE_INTERVAL_SECONDS:
+            self._sampled = now
+            usage = cgroup_usage(self._cgroup_usage) if self._cgroup_usage else None
+            self._usage = usage if usage is not None else process_rss()
+            rss = process_rss()
+            for session in self.sessions.values():
+                session.rss_peak = max(session.rss_peak, rss)
+        return self._usage
+
+    def pressure(self):
+        if not self.limit:
+            return OK
+        ratio = self.usage() / self.limit
+        if ratio >= self.hard:
+            return HARD
+        if ratio >= self.soft:
+            return SOFT
+        return OK
+
+    def should_defer(self):
+        """
+        Whether the scheduler should hold back new work units for now.
+        """
+        if self.pressure() == OK:
+            return False
+        self.deferrals += 1
+        return True
+
+    def should_reject(self):
+        """
+        Whether new sessions should be turned away for now.
+        """
+        if self.pressure() != HARD:
+            return False
+        self.rejected_requests += 1
+        logger.warning(f"Rejecting new session: memory at {self._usage // MB} of {self.limit // MB} MB")
+        return True
+
+    def begin_session(self, session_id):
+        self.sessions.setdefault(session_id, SessionMemory(session_id, process_rss()))
+
+    def end_session(self, session_id):
+        session = self.sessions.pop(session_id, None)
+        if session is not None:
+            logger.info(
+                f"Session {session_id} memory: RSS {session.rss_start // MB} MB at start, peak {session.rss_peak // MB} MB"
+                + (f", heap growth across units {session.attributed // MB} MB" if self.trace else "")
+            )
+
+    @contextmanager
+    def unit(self, session_id):
+        """
+        Account one work unit's Python heap growth to its session.
+        """
+        session = self.sessions.get(session_id)
+        before = tracemalloc.get_traced_memory()[0] if self.trace else 0
+        try:
+            yield
+        finally:
+            if session is not None:
+                session.units += 1
+                if self.trace:
+                    session.attributed += tracemalloc.get_traced_memory()[0] - before
+                    session.attributed_peak = max(session.attributed_peak, session.attributed)
+                self.usage()
+
+    def metrics(self):
+        usage = self.usage()
+        return {
+            'usage_mb': usage // MB,
+            'rss_mb': process_rss() // MB,
+            'limit_mb': self.limit // MB if self.limit else None,
+            'pressure': self.pressure(),
+            'deferrals': self.deferrals,
+            'rejected_requests': self.rejected_requests,
+            'tracemalloc': self.trace,
+            'traced_mb': tracemalloc.get_traced_memory()[0] // MB if self.trace else None,
+            'sessions': {
+                session_id: {
+                    'rss_start_mb': session.rss_start // MB,
+                    'rss_peak_mb': session.rss_peak // MB,
+                    'units': session.units,
+                    'heap_growth_mb': session.attributed // MB if self.trace else None,
+                    'heap_growth_peak_mb': session.attributed_peak // MB if self.trace else None,
+                }
+                for session_id, session in self.sessions.items()
+            }
+        }
+
+memory_governor = MemoryGovernor()
@@ -0,0 +1,247 @@
+# backend/pipeline.py
+
+import os
+import json
+import time
+import asyncio
+import logging
+from threading import Lock
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+EXECUTORS = ('async', 'thread', 'process')
+
+# Per-stage overrides of the declared settings, e.g.
+# PIPELINE_STAGES='{"generate_tags": {"concurrency": 8, "executor": "process"}}'
+PIPELINE_STAGES = json.loads(os.getenv('PIPELINE_STAGES', '{}'))
+
+# End of a stage's input
+DONE = object()
+
+class Stage:
+    """
+    One declared step of a pipeline.
+
+    `fn` takes one item of `input_type` and returns one of `output_type`, or
+    None to drop the item. A `fan_out` stage returns a list of outputs instead,
+    and a `barrier` stage is called once with the list of every item that
+    reached it. `fn` is a coroutine function for the async executor and a
+    plain function for the thread and process executors; the latter needs a
+    picklable module-level function and items.
+
+    `admit(item, run)` may wrap each call, e.g. to queue it with the
+    scheduler; it must return `await run()`. `after(output)` is awaited on the
+    event loop for every item the stage produces, each element of a fan_out
+    or barrier result on its own, for work a thread or process cannot do
+    such as sending updates.
+    """
+
+    def __init__(self, name, fn, input_type, output_type, concurrency=1, executor='async', queue_depth=None,
+                 fan_out=False, barrier=False, admit=None, after=None):
+        settings = {'concurrency': concurrency, 'executor': executor, 'queue_depth': queue_depth, **PIPELINE_STAGES.get(name, {})}
+        self.name = name
+        self.fn = fn
+        self.input_type = input_type
+        self.output_type = output_type
+        self.executor = settings['executor']
+        # A barrier sees all of its input at once, so more workers would not help
+        self.concurrency = 1 if barrier else max(1, int(settings['concurrency']))
+        self.queue_depth = settings['queue_depth'] or 2 * self.concurrency
+        self.fan_out = fan_out
+        self.barrier = barrier
+        self.admit = admit
+        self.after = after
+        if self.executor not in EXECUTORS:
+            raise ValueError(f"Stage {name}: unknown executor {self.executor!r}; expected one of {', '.join(EXECUTORS)}")
+        if asyncio.iscoroutinefunction(fn) != (self.executor == 'async'):
+            raise ValueError(f"Stage {name}: the {self.executor} executor needs a {'coroutine' if self.executor == 'async' else 'plain'} function")
+
+class StageStats:
+    def __init__(self):
+        self.received = 0
+        self.produced = 0
+        self.dropped = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self.queue_peak = 0
+
+    def merge(self, other):
+        self.received += other.received
+        self.produced += other.produced
+        self.dropped += other.dropped
+        self.failed += other.failed
+        self.busy_seconds += other.busy_seconds
+        self.queue_peak = max(self.queue_peak, other.queue_peak)
+
+    def as_dict(self):
+        return {
+            'received': self.received,
+            'produced': self.produced,
+            'dropped': self.dropped,
+            'failed': self.failed,
+            'busy_seconds': round(self.busy_seconds, 3),
+            'queue_peak': self.queue_peak,
+        }
+
+# Executor pools live as long as the process so process workers keep their loaded models;
+# {(executor, stage name): (pool, max workers)}
+_pools = {}
+_pools_lock = Lock()
+_totals = {}
+
+def _pool(stage):
+    key = (stage.executor, stage.name)
+    with _pools_lock:
+        pool, size = _pools.get(key, (None, 0))
+        if size < stage.concurrency:
+            if pool is not None:
+                # Work already submitted to the smaller pool still finishes there
+                pool.shutdown(wait=False)
+            if stage.executor == 'thread':
+                pool = ThreadPoolExecutor(max_workers=stage.concurrency, thread_name_prefix=f"stage-{stage.name}")
+            else:
+                pool = ProcessPoolExecutor(max_workers=stage.concurrency)
+            _pools[key] = (pool, stage.concurrency)
+        return pool
+
+def shutdown_pools():
+    with _pools_lock:
+        for pool, _ in _pools.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+        _pools.clear()
+
+def pipeline_metrics():
+    """
+    Per-stage totals over every pipeline run in this process.
+    """
+    return {name: stats.as_dict() for name, stats in _totals.items()}
+
+class Pipeline:
+    """
+    A chain of stages connected by bounded queues. Each stage runs
+    `concurrency` workers, so items stream through: while one video's tags
+    are generated the next one's transcript is fetched. A full queue holds
+    back the stage feeding it. Only a barrier waits for everything upstream.
+
+    When `fn` or `after` raises for an item, or `fn` returns the wrong type,
+    the item is dropped and `on_error(stage, item, exception)` is awaited;
+    re-raising from there aborts the whole run.
+    """
+
+    def __init__(self, name, stages, on_error=None):
+        if not stages:
+            raise ValueError(f"Pipeline {name} has no stages")
+        for upstream, downstream in zip(stages, stages[1:]):
+            if not issubclass(upstream.output_type, downstream.input_type):
+                raise TypeError(
+                    f"Pipeline {name}: stage {upstream.name} produces {upstream.output_type.__name__} "
+                    f"but {downstream.name} takes {downstream.input_type.__name__}"
+                )
+        self.name = name
+        self.stages = stages
+        self.on_error = on_error
+
+    async def run(self, items):
+        """
+        Feed `items` through every stage and return what the last one produced.
+        """
+        queues = [asyncio.Queue(maxsize=stage.queue_depth) for stage in self.stages]
+        stats = [StageStats() for _ in self.stages]
+        remaining = [stage.concurrency for stage in self.stages]
+        results = []
+
+        async def emit(index, output):
+            if index + 1 == len(self.stages):
+                results.append(output)
+                return
+            queue = queues[index + 1]
+            await queue.put(output)
+            stats[index + 1].queue_peak = max(stats[index + 1].queue_peak, queue.qsize())
+
+        async def close(index):
+            # The last worker of a stage to finish ends the next stage's input
+            remaining[index] -= 1
+            if remaining[index] == 0 and index + 1 < len(self.stages):
+                for _ in range(self.stages[index + 1].concurrency):
+                    await queues[index + 1].put(DONE)
+
+        async def fail(index, item, error):
+            stage = self.stages[index]
+            stats[index].failed += 1
+            logger.error(f"Pipeline {self.name}: stage {stage.name} failed: {str(error)}")
+            if self.on_error is not None:
+                await self.on_error(stage.name, item, error)
+
+        async def call(index, item):
+            stage = self.stages[index]
+
+            async def run():
+                if stage.executor == 'async':
+                    return await stage.fn(item)
+                return await asyncio.get_running_loop().run_in_executor(_pool(stage), stage.fn, item)
+
+            started = time.perf_counter()
+            try:
+                output = await stage.admit(item, run) if stage.admit else await run()
+            except Exception as e:
+                await fail(index, item, e)
+                return
+            finally:
+                stats[index].busy_seconds += time.perf_counter() - started
+
+            outputs = output if stage.fan_out or stage.barrier else [output]
+            outputs = [out for out in (outputs or []) if out is not None]
+            if not outputs:
+                stats[index].dropped += 1
+                return
+            try:
+                for out in outputs:
+                    if not isinstance(out, stage.output_type):
+                        raise TypeError(f"Stage {stage.name} produced {type(out).__name__}, not {stage.output_type.__name__}")
+                if stage.after is not None:
+                    for out in outputs:
+                        await stage.after(out)
+            except Exception as e:
+                await fail(index, item, e)
+                return
+            stats[index].produced += len(outputs)
+            for out in outputs:
+                await emit(index, out)
+
+        async def worker(index):
+            stage = self.stages[index]
+            collected = []
+            while (item := await queues[index].get()) is not DONE:
+                stats[index].received += 1
+                if stage.barrier:
+                    collected.append(item)
+                else:
+                    await call(index, item)
+            if stage.barrier:
+                await call(index, collected)
+            await close(index)
+
+        async def feed():
+            for item in items:
+                if not isinstance(item, self.stages[0].input_type):
+                    raise TypeError(f"Pipeline {self.name} takes {self.stages[0].input_type.__name__}, not {type(item).__name__}")
+                await queues[0].put(item)
+            for _ in range(self.stages[0].concurrency):
+                await queues[0].put(DONE)
+
+        tasks = [asyncio.create_task(feed())]
+        for index, stage in enumerate(self.stages):
+            tasks.extend(asyncio.create_task(worker(index)) for _ in range(stage.concurrency))
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            for stage, stage_stats in zip(self.stages, stats):
+                _totals.setdefault(stage.name, StageStats()).merge(stage_stats)
+            logger.info(f"Pipeline {self.name}: " + ', '.join(
+                f"{stage.name} {stage_stats.produced}/{stage_stats.received} in {stage_stats.busy_seconds:.1f}s"
+                for stage, stage_stats in zip(self.stages, stats)
+            ))
+        return results
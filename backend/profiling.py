@@ -0,0 +1,286 @@
+# backend/profiling.py
+
+import os
+import sys
+import json
+import time
+import uuid
+import pstats
+import cProfile
+import asyncio
+import logging
+import threading
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+# The admin profiling endpoints answer 404 unless this is set
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+# Sent as X-Admin-Token to reach the admin endpoints
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', '')
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+# Sessions profiled as soon as they start, e.g. for runs started by ingest.py
+PROFILE_SESSION_IDS = {session_id.strip() for session_id in os.getenv('PROFILE_SESSION_IDS', '').split(',') if session_id.strip()}
+PROFILE_MODE = os.getenv('PROFILE_MODE', 'sampling')
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv('PROFILE_SAMPLE_INTERVAL_MS', 10))
+# A capture stops after this long even if its session has not finished
+PROFILE_MAX_SECONDS = float(os.getenv('PROFILE_MAX_SECONDS', 600))
+# A capture armed for a session that has not started in this process by then
+# is dropped; with several workers the session may be running in another one
+PROFILE_ARM_SECONDS = float(os.getenv('PROFILE_ARM_SECONDS', 300))
+
+PROFILE_MODES = ('sampling', 'cprofile')
+
+ARMED = 'armed'
+RUNNING = 'running'
+FINISHED = 'finished'
+EXPIRED = 'expired'
+FAILED = 'failed'
+
+# Leaf frames of threads that are waiting rather than working
+IDLE_FRAMES = {
+    ('selectors.py', 'select'),
+    ('threading.py', 'wait'),
+    ('threading.py', '_wait_for_tstate_lock'),
+    ('thread.py', '_worker'),
+    ('queue.py', 'get'),
+}
+
+def _label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+class SamplingProfiler(threading.Thread):
+    """
+    Samples the Python stack of every other thread at a fixed interval from
+    a background thread; nothing is instrumented, so the profiled code runs
+    at full speed. Stacks of idle threads are counted but not kept.
+    """
+
+    def __init__(self, interval):
+        super().__init__(name='sampling-profiler', daemon=True)
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self.idle = 0
+        self._stopped = threading.Event()
+
+    def run(self):
+        me = threading.get_ident()
+        while not self._stopped.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == me:
+                    continue
+                self.samples += 1
+                if (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in IDLE_FRAMES:
+                    self.idle += 1
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.stacks[tuple(reversed(stack))] += 1
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+    def write(self, path):
+        # One "root;caller;callee count" line per stack, as flamegraph.pl and speedscope read
+        with open(path, 'w') as file:
+            for stack, count in self.stacks.most_common():
+                file.write(f"{';'.join(frame.replace(';', ':') for frame in stack)} {count}\n")
+
+    def top(self, n):
+        busy = sum(self.stacks.values())
+        own = Counter()
+        total = Counter()
+        for stack, count in self.stacks.items():
+            own[stack[-1]] += count
+            for frame in set(stack[1:]):
+                total[frame] += count
+        return {
+            'samples': self.samples,
+            'idle_samples': self.idle,
+            'functions': [
+                {
+                    'function': frame,
+                    'self_samples': count,
+                    'self_percent': round(100 * count / busy, 1),
+                    'total_percent': round(100 * total[frame] / busy, 1),
+                }
+                for frame, count in own.most_common(n)
+            ]
+        }
+
+class DeterministicProfiler:
+    """
+    cProfile of the event loop thread, where the pipeline's coroutines run.
+    Work in executor threads is not seen; the sampling profiler covers it.
+    """
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+
+    def start(self):
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+
+    def write(self, path):
+        self.profile.dump_stats(path)
+
+    def top(self, n):
+        stats = pstats.Stats(self.profile)
+        rows = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:n]
+        return {
+            'total_seconds': round(stats.total_tt, 3),
+            'functions': [
+                {
+                    'function': f"{name} ({os.path.basename(filename)}:{line})",
+                    'calls': calls,
+                    'self_seconds': round(own_time, 4),
+                    'cumulative_seconds': round(cumulative_time, 4),
+                }
+                for (filename, line, name), (_, calls, own_time, cumulative_time, _) in rows
+            ]
+        }
+
+class Capture:
+    def __init__(self, mode, session_id, seconds, interval):
+        self.id = uuid.uuid4().hex[:12]
+        self.mode = mode
+        self.session_id = session_id
+        self.seconds = seconds
+        self.interval = interval
+        self.status = ARMED
+        self.started = None
+        self.finished = None
+        self.profiler = None
+        self.artifact = None
+        self.summary = None
+        self.error = None
+        self._timer = None
+
+    def describe(self, top=None):
+        description = {
+            'id': self.id,
+            'mode': self.mode,
+            'session_id': self.session_id,
+            'status': self.status,
+            'started': self.started,
+            'finished': self.finished,
+            'artifact': self.artifact,
+        }
+        if self.error is not None:
+            description['error'] = self.error
+        if self.summary is not None:
+            description['summary'] = self.summary if top is None else {
+                **self.summary, 'functions': self.summary['functions'][:top]
+            }
+        return description
+
+class ProfilerRegistry:
+    """
+    At most one capture at a time, for a time window or for the lifetime of
+    one session (process-wide, so other sessions' work shows up too). While
+    nothing is captured the only cost is the session hooks' set lookup.
+    """
+
+    def __init__(self, directory=PROFILE_DIR, max_seconds=PROFILE_MAX_SECONDS, arm_seconds=PROFILE_ARM_SECONDS):
+        self.directory = directory
+        self.max_seconds = max_seconds
+        self.arm_seconds = arm_seconds
+        self.captures = {}
+        self.current = None
+
+    def start(self, mode='sampling', session_id=None, seconds=None, interval_ms=PROFILE_SAMPLE_INTERVAL_MS, running=False):
+        """
+        Start a capture for `seconds`, or arm one that runs while `session_id`
+        does; pass `running` when that session has already started. Must be
+        called on the event loop.
+        """
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode {mode!r}; expected one of {', '.join(PROFILE_MODES)}")
+        if session_id is None and not seconds:
+            raise ValueError("Give a session_id or a number of seconds")
+        if self.current is not None:
+            raise RuntimeError(f"Capture {self.current.id} is still {self.current.status}")
+        capture = Capture(mode, session_id, min(seconds or self.max_seconds, self.max_seconds), interval_ms / 1000)
+        self.captures[capture.id] = capture
+        self.current = capture
+        if session_id is None or running:
+            self._run(capture)
+        else:
+            capture._timer = asyncio.get_running_loop().call_later(self.arm_seconds, self._expire, capture.id)
+            logger.info(f"Profile {capture.id} armed for session {session_id}")
+        return capture
+
+    def _expire(self, capture_id):
+        capture = self.captures[capture_id]
+        if capture.status == ARMED:
+            logger.info(f"Profile {capture.id} expired: session {capture.session_id} did not start in this process")
+            self.stop(capture_id)
+            capture.status = EXPIRED
+
+    def _run(self, capture):
+        if capture._timer is not None:
+            capture._timer.cancel()
+        capture.status = RUNNING
+        capture.started = time.time()
+        if capture.mode == 'sampling':
+            capture.profiler = SamplingProfiler(capture.interval)
+        else:
+            capture.profiler = DeterministicProfiler()
+        capture.profiler.start()
+        capture._timer = asyncio.get_running_loop().call_later(capture.seconds, self.stop, capture.id)
+        logger.info(f"Profile {capture.id} ({capture.mode}) started")
+
+    def stop(self, capture_id):
+        """
+        Finish a running capture (or drop an armed one), writing its artifact.
+        """
+        capture = self.captures[capture_id]
+        if capture._timer is not None:
+            capture._timer.cancel()
+        status = FINISHED
+        try:
+            if capture.status == RUNNING:
+                capture.profiler.stop()
+                os.makedirs(self.directory, exist_ok=True)
+                extension = 'collapsed' if capture.mode == 'sampling' else 'pstats'
+                capture.artifact = os.path.join(self.directory, f"{capture.id}.{extension}")
+                capture.profiler.write(capture.artifact)
+                capture.summary = capture.profiler.top(100)
+                with open(os.path.join(self.directory, f"{capture.id}.json"), 'w') as file:
+                    json.dump(capture.describe(), file, indent=2, default=str)
+                logger.info(f"Profile {capture.id} written to {capture.artifact}")
+        except Exception as e:
+            # Also reached from a timer and a session's cleanup, so record it rather than raise
+            logger.exception(f"Failed to write profile {capture.id}: {str(e)}")
+            capture.error = str(e)
+            status = FAILED
+        finally:
+            capture.profiler = None
+            capture.status = status
+            capture.finished = time.time()
+            if self.current is capture:
+                self.current = None
+        return capture
+
+    def session_started(self, session_id):
+        current = self.current
+        if current is not None and current.status == ARMED and current.session_id == session_id:
+            self._run(current)
+        elif current is None and session_id in PROFILE_SESSION_IDS:
+            self.start(PROFILE_MODE, session_id=session_id)
+            self._run(self.current)
+
+    def session_finished(self, session_id):
+        current = self.current
+        if current is not None and current.status == RUNNING and current.session_id == session_id:
+            self.stop(current.id)
+
+profiler = ProfilerRegistry()
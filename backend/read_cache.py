@@ -0,0 +1,175 @@
+# backend/read_cache.py
+
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+from threading import Lock
+from collections import OrderedDict
+
+from fastapi import Request, Response
+
+logger = logging.getLogger(__name__)
+
+READ_CACHE_TTL_SECONDS = float(os.getenv('READ_CACHE_TTL_SECONDS', 60))
+READ_CACHE_MAX_ENTRIES = int(os.getenv('READ_CACHE_MAX_ENTRIES', 5000))
+
+def channel_scope(channel_id):
+    return f"channel:{channel_id}"
+
+def video_scope(video_id):
+    return f"video:{video_id}"
+
+CHANNELS_SCOPE = 'channels'
+
+class CacheEntry:
+    def __init__(self, body, etag, expires, scopes):
+        self.body = body
+        self.etag = etag
+        self.expires = expires
+        self.scopes = scopes
+
+class Build:
+    def __init__(self, scopes):
+        self.scopes = scopes
+        self.stale = False
+
+class ResponseCache:
+    """
+    In-process LRU cache of serialized read responses with a TTL. Every entry
+    is filed under the scopes (all channels, one channel, one video) whose
+    data it shows, and the pipeline drops a scope's entries when it writes to
+    it. The TTL bounds staleness for writes made by other processes.
+    """
+
+    def __init__(self, ttl=READ_CACHE_TTL_SECONDS, max_entries=READ_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._scopes = {}
+        self._building = set()
+        self._lock = Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'not_modified': 0, 'invalidations': 0}
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.expires < time.monotonic():
+                self.stats['misses'] += 1
+                return None
+            self.stats['hits'] += 1
+            self._entries.move_to_end(key)
+            return entry
+
+    def record(self, stat):
+        with self._lock:
+            self.stats[stat] += 1
+
+    def begin(self, scopes):
+        """
+        Register a response about to be built; pass the result to put().
+        """
+        build = Build(scopes)
+        with self._lock:
+            self._building.add(build)
+        return build
+
+    def cancel(self, build):
+        with self._lock:
+            self._building.discard(build)
+
+    def put(self, key, body, build):
+        """
+        Cache a built response, unless one of its scopes was invalidated while
+        it was being built.
+        """
+        etag = f'W/"{hashlib.sha1(body).hexdigest()}"'
+        entry = CacheEntry(body, etag, time.monotonic() + self.ttl, build.scopes)
+        with self._lock:
+            self._building.discard(build)
+            if build.stale:
+                return entry
+            self._discard(key)
+            self._entries[key] = entry
+            for scope in build.scopes:
+                self._scopes.setdefault(scope, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._discard(next(iter(self._entries)))
+        return entry
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            for scope in entry.scopes:
+                keys = self._scopes.get(scope)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self._scopes[scope]
+
+    def invalidate(self, *scopes):
+        """
+        Drop every entry filed under any of the scopes.
+        """
+        with self._lock:
+            for scope in scopes:
+                for key in list(self._scopes.get(scope, ())):
+                    self._discard(key)
+            for build in self._building:
+                if not build.stale and any(scope in build.scopes for scope in scopes):
+                    build.stale = True
+            self.stats['invalidations'] += 1
+
+    def metrics(self):
+        with self._lock:
+            return {**self.stats, 'entries': len(self._entries)}
+
+response_cache = ResponseCache()
+
+def _opaque_tag(tag):
+    tag = tag.strip()
+    return tag[2:] if tag.startswith('W/') else tag
+
+def etag_matches(if_none_match, etag):
+    """
+    Whether an If-None-Match header covers the ETag: `*`, or any listed
+    validator that equals it under the weak comparison (W/ ignored).
+    """
+    if not if_none_match:
+        return False
+    return any(tag.strip() == '*' or _opaque_tag(tag) == _opaque_tag(etag) for tag in if_none_match.split(','))
+
+def invalidate_reads(channel_id=None, video_ids=(), channels=False):
+    """
+    Called by the pipeline after writing data that read endpoints serve.
+    """
+    scopes = [video_scope(video_id) for video_id in video_ids]
+    if channel_id is not None:
+        scopes.append(channel_scope(channel_id))
+    if channels:
+        scopes.append(CHANNELS_SCOPE)
+    response_cache.invalidate(*scopes)
+
+async def cached_response(request: Request, scopes, build):
+    """
+    Serve `build()` (a blocking function returning JSON-serializable data) from
+    the cache, answering 304 when If-None-Match carries the current ETag.
+    """
+    key = f"{request.url.path}?{'&'.join(sorted(f'{k}={v}' for k, v in request.query_params.multi_items()))}"
+    entry = response_cache.get(key)
+    if entry is None:
+        pending = response_cache.begin(scopes)
+        try:
+            data = await asyncio.to_thread(build)
+        except BaseException:
+            response_cache.cancel(pending)
+            raise
+        entry = response_cache.put(key, json.dumps(data, default=str).encode('utf-8'), pending)
+
+    headers = {'ETag': entry.etag, 'Cache-Control': 'no-cache'}
+    if etag_matches(request.headers.get('if-none-match'), entry.etag):
+        response_cache.record('not_modified')
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type='application/json', headers=headers)
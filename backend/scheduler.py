@@ -0,0 +1,179 @@
+# backend/scheduler.py
+
+import os
+import heapq
+import asyncio
+import logging
+import itertools
+
+from memory import memory_governor
+
+logger = logging.getLogger(__name__)
+
+# Work units (one video's transcript fetch or tag generation) running at once across all sessions
+SCHEDULER_WORKERS = int(os.getenv('SCHEDULER_WORKERS', 4))
+# Work units one session may run at once; each unit makes its external calls one at a time
+SESSION_MAX_CONCURRENT_UNITS = int(os.getenv('SESSION_MAX_CONCURRENT_UNITS', 2))
+# LLM tokens one session may spend in total
+SESSION_LLM_TOKEN_BUDGET = int(os.getenv('SESSION_LLM_TOKEN_BUDGET', 2000000))
+# Sessions requesting more videos than this default to the bulk class
+BULK_VIDEO_THRESHOLD = int(os.getenv('BULK_VIDEO_THRESHOLD', 50))
+
+PRIORITY_WEIGHTS = {
+    'interactive': 4.0,
+    'bulk': 1.0,
+}
+
+class BudgetExceeded(Exception):
+    pass
+
+def classify_priority(priority, total_videos):
+    """
+    Validate a requested priority class, defaulting by job size when none is given.
+    """
+    if priority is None:
+        return 'bulk' if total_videos > BULK_VIDEO_THRESHOLD else 'interactive'
+    if priority not in PRIORITY_WEIGHTS:
+        raise ValueError(f"Unknown priority {priority!r}; expected one of {', '.join(PRIORITY_WEIGHTS)}")
+    return priority
+
+class SessionState:
+    def __init__(self, session_id, priority, max_concurrent_units, llm_token_budget):
+        self.session_id = session_id
+        self.priority = priority
+        self.weight = PRIORITY_WEIGHTS[priority]
+        self.max_concurrent_units = max_concurrent_units
+        self.llm_token_budget = llm_token_budget
+        self.llm_tokens_used = 0
+        self.running = 0
+        self.last_finish = 0.0
+        self.completed = 0
+        # Queued units, costliest first
+        self.queue = []
+
+class FairScheduler:
+    """
+    Start-time fair queueing of per-video work units across sessions.
+
+    A session's next unit gets a virtual start tag max(V, the session's last
+    finish tag) and finish tag start + cost / weight. Free workers go to the
+    session under its concurrency cap whose next unit has the smallest start
+    tag. A 500-video bulk session therefore cannot starve a 5-video
+    interactive one, and interactive sessions get PRIORITY_WEIGHTS-times the
+    share. Within a session the costliest queued unit goes first (longest
+    processing time first), so a long video does not start last and hold
+    up the session's end. Under memory pressure queued units wait instead
+    of starting.
+    """
+
+    def __init__(self, workers=SCHEDULER_WORKERS):
+        self.workers = workers
+        self._sessions = {}
+        self._sequence = itertools.count()
+        self._virtual_time = 0.0
+        self._running = 0
+
+    def register(self, session_id, priority='interactive', max_concurrent_units=SESSION_MAX_CONCURRENT_UNITS,
+                 llm_token_budget=SESSION_LLM_TOKEN_BUDGET):
+        if session_id not in self._sessions:
+            self._sessions[session_id] = SessionState(session_id, priority, max_concurrent_units, llm_token_budget)
+            logger.info(f"Registered session {session_id} with the scheduler as {priority}")
+        return self._sessions[session_id]
+
+    def unregister(self, session_id):
+        self._sessions.pop(session_id, None)
+
+    def charge_llm_tokens(self, session_id, tokens):
+        """
+        Reserve LLM tokens against a session's budget, raising BudgetExceeded
+        when the call would go over it.
+        """
+        session = self._sessions.get(session_id)
+        if session is None:
+            return
+        if session.llm_tokens_used + tokens > session.llm_token_budget:
+            raise BudgetExceeded(
+                f"Session {session_id} LLM token budget exhausted "
+                f"({session.llm_tokens_used} of {session.llm_token_budget} used, {tokens} requested)"
+            )
+        session.llm_tokens_used += tokens
+
+    async def run(self, session_id, fn, *args, cost=1.0, **kwargs):
+        """
+        Queue `await fn(*args, **kwargs)` as a work unit of the given cost and
+        return its result once it has been scheduled and has run.
+        """
+        session = self._sessions.get(session_id) or self.register(session_id)
+        grant = asyncio.get_running_loop().create_future()
+        heapq.heappush(session.queue, (-cost, next(self._sequence), grant))
+        self._dispatch()
+
+        try:
+            await grant
+        except asyncio.CancelledError:
+            # A unit cancelled after being granted still holds its slot
+            if grant.done() and not grant.cancelled():
+                self._release(session)
+            raise
+        try:
+            with memory_governor.unit(session_id):
+                return await fn(*args, **kwargs)
+        finally:
+            session.completed += 1
+            self._release(session)
+
+    def _release(self, session):
+        self._running -= 1
+        session.running -= 1
+        self._dispatch()
+
+    def _next_session(self):
+        """
+        The session under its concurrency cap with queued units whose next
+        unit would get the smallest start tag, with that tag.
+        """
+        best, best_start = None, None
+        for session in self._sessions.values():
+            # Units whose caller was cancelled while queued
+            while session.queue and session.queue[0][2].done():
+                heapq.heappop(session.queue)
+            if not session.queue or session.running >= session.max_concurrent_units:
+                continue
+            start = max(self._virtual_time, session.last_finish)
+            if best is None or start < best_start:
+                best, best_start = session, start
+        return best, best_start
+
+    def _dispatch(self):
+        while self._running < self.workers:
+            # Near the memory ceiling only one unit runs at a time until usage drops
+            if self._running and memory_governor.should_defer():
+                break
+            session, start = self._next_session()
+            if session is None:
+                break
+            negative_cost, _, grant = heapq.heappop(session.queue)
+            self._virtual_time = start
+            session.last_finish = start + -negative_cost / session.weight
+            self._running += 1
+            session.running += 1
+            grant.set_result(None)
+
+    def stats(self):
+        return {
+            'workers': self.workers,
+            'running': self._running,
+            'sessions': {
+                session_id: {
+                    'priority': session.priority,
+                    'running': session.running,
+                    'queued': sum(1 for _, _, grant in session.queue if not grant.done()),
+                    'completed': session.completed,
+                    'llm_tokens_used': session.llm_tokens_used,
+                    'llm_token_budget': session.llm_token_budget,
+                }
+                for session_id, session in self._sessions.items()
+            }
+        }
+
+scheduler = FairScheduler()
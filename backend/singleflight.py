@@ -0,0 +1,58 @@
+# backend/singleflight.py
+
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key into one execution. Callers that
+    arrive while a call is in flight await its result (or exception) instead of
+    running it again. Nothing is cached once the call finishes.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._calls = {}
+
+    def owner(self, key):
+        """
+        Return the owner that started the in-flight call for key, or None.
+        """
+        call = self._calls.get(key)
+        return call[1] if call else None
+
+    async def wait(self, key):
+        """
+        Await the in-flight call for key.
+        """
+        future, _ = self._calls[key]
+        return await asyncio.shield(future)
+
+    async def do(self, key, fn, *args, owner=None, **kwargs):
+        """
+        Run `await fn(*args, **kwargs)` unless a call for key is already in
+        flight, in which case share its outcome.
+        """
+        if key in self._calls:
+            logger.info(f"Joining in-flight {self.name} call for {key}")
+            return await self.wait(key)
+
+        future = asyncio.get_running_loop().create_future()
+        # Mark the outcome as retrieved even when nobody joined the call
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._calls[key] = (future, owner)
+        try:
+            result = await fn(*args, **kwargs)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._calls[key]
@@ -0,0 +1,165 @@
+# backend/tag_consolidation.py
+
+import os
+import asyncio
+import logging
+from collections import Counter
+from datetime import datetime
+
+import numpy as np
+from sklearn.cluster import AgglomerativeClustering, MiniBatchKMeans
+from sklearn.metrics.pairwise import cosine_similarity
+
+from utils import send_update, fetch_tags_for_videos, replace_video_tags
+from embedding_cache import encode_cached
+from tag_index import get_tag_index
+from text_processing import detect_names
+
+logger = logging.getLogger(__name__)
+
+# Largest matrix clustered in one AgglomerativeClustering call; its pairwise
+# distance matrix grows with the square of this
+CONSOLIDATION_EXACT_MAX = int(os.getenv('CONSOLIDATION_EXACT_MAX', 2000))
+
+def cluster_embeddings(embeddings, clustering_strength):
+    """
+    Label rows with average-linkage cosine clusters cut at clustering_strength.
+    Above CONSOLIDATION_EXACT_MAX rows the matrix is first partitioned with
+    mini-batch k-means and each partition is clustered on its own.
+    """
+    n_rows = len(embeddings)
+    if n_rows == 1:
+        return np.zeros(1, dtype=int)
+    if n_rows <= CONSOLIDATION_EXACT_MAX:
+        clustering = AgglomerativeClustering(n_clusters=None, distance_threshold=clustering_strength, metric='cosine', linkage='average')
+        return clustering.fit_predict(embeddings)
+
+    n_partitions = int(np.ceil(2 * n_rows / CONSOLIDATION_EXACT_MAX))
+    partitions = MiniBatchKMeans(n_clusters=n_partitions, batch_size=4096, n_init=3, random_state=0).fit_predict(embeddings)
+    groups = [np.flatnonzero(partitions == p) for p in range(n_partitions)]
+    if max(len(group) for group in groups) == n_rows:
+        # k-means could not split the matrix; fall back to arbitrary slices
+        groups = np.array_split(np.arange(n_rows), n_partitions)
+
+    labels = np.empty(n_rows, dtype=int)
+    next_label = 0
+    for group in groups:
+        if len(group) == 0:
+            continue
+        group_labels = cluster_embeddings(embeddings[group], clustering_strength)
+        labels[group] = group_labels + next_label
+        next_label += int(group_labels.max()) + 1
+    return labels
+
+def cluster_tags(tags, embeddings, clustering_strength, weights=None):
+    """
+    Cluster tags by cosine distance and map each tag to its cluster's representative.
+    """
+    if len(tags) == 1:
+        return {tags[0]: tags[0]}
+
+    labels = cluster_embeddings(embeddings, clustering_strength)
+
+    # Group tag positions by cluster label
+    cluster_to_indices = {}
+    for index, label in enumerate(labels):
+        cluster_to_indices.setdefault(label, []).append(index)
+
+    tag_mapping = {}
+    for indices in cluster_to_indices.values():
+        cluster = [tags[i] for i in indices]
+        cluster_weights = None if weights is None else weights[indices]
+        representative_tag = find_representative_tag(cluster, embeddings[indices], cluster_weights)
+        for tag in cluster:
+            tag_mapping[tag] = representative_tag
+    return tag_mapping
+
+def find_representative_tag(cluster, embeddings, weights=None):
+    """
+    Find the most representative tag in a cluster based on average similarity,
+    optionally weighting each tag by how often it occurs.
+    """
+    if len(cluster) == 1:
+        return cluster[0]
+
+    # Calculate similarity within the cluster
+    similarity_matrix = cosine_similarity(embeddings)
+
+    # Find the tag with the highest average similarity to all other tags in the cluster
+    if weights is None:
+        avg_similarity = similarity_matrix.mean(axis=1)
+    else:
+        avg_similarity = similarity_matrix @ weights / weights.sum()
+    most_representative_index = avg_similarity.argmax()
+    return cluster[most_representative_index]
+
+def fetch_video_tags(supabase, video_ids):
+    """
+    Fetch the stored tags of many videos as {video_id: set of tags}.
+    """
+    video_tags = {video_id: set() for video_id in video_ids}
+    for row in fetch_tags_for_videos(supabase, video_ids):
+        video_tags[row['video_id']].add(row['tag'])
+    return video_tags
+
+def build_channel_tag_mapping(video_tags, clustering_strength):
+    """
+    Embed every distinct tag of a channel in one batch and cluster them once.
+    Returns the tag mapping and {tag: embedding} for the distinct tags.
+    """
+    counts = Counter(tag for tags in video_tags.values() for tag in tags)
+    unique_tags = sorted(counts)
+    if not unique_tags:
+        return {}, {}
+    embeddings = encode_cached(unique_tags)
+    position = {tag: i for i, tag in enumerate(unique_tags)}
+
+    names, non_names = detect_names(unique_tags)
+    tag_mapping = {name: name for name in names}  # Map names to themselves
+    if non_names:
+        indices = [position[tag] for tag in non_names]
+        weights = np.array([counts[tag] for tag in non_names], dtype=np.float32)
+        tag_mapping.update(cluster_tags(non_names, embeddings[indices], clustering_strength, weights))
+    return tag_mapping, {tag: embeddings[position[tag]] for tag in unique_tags}
+
+def store_consolidated_tags(supabase, channel_id, consolidated, embeddings):
+    """
+    Rewrite `tags`, `videos.tags` and the tag index entries of the videos in
+    {video_id: tags}. Blocking; run it on a worker thread.
+    """
+    replace_video_tags(supabase, consolidated, datetime.utcnow().isoformat())
+    supabase.table('videos').upsert([
+        {'video_id': video_id, 'tags': ", ".join(tags)} for video_id, tags in consolidated.items()
+    ]).execute()
+
+    tag_index = get_tag_index()
+    for video_id, tags in consolidated.items():
+        try:
+            tag_index.add(video_id, channel_id, tags, np.stack([embeddings[tag] for tag in tags]))
+        except Exception as e:
+            logger.error(f"Failed to update tag index for video ID {video_id}: {str(e)}")
+
+async def consolidate_channel_tags(session_id, supabase, channel_id, video_ids, clustering_strength):
+    """
+    Cluster every tag across a channel's videos in a single pass so the same
+    concept gets the same tag on every video, then rewrite `tags` and
+    `videos.tags` in bulk for the videos whose tags changed.
+    """
+    logger.info(f"Consolidating tags across {len(video_ids)} videos for channel ID: {channel_id}")
+    video_tags = await asyncio.to_thread(fetch_video_tags, supabase, video_ids)
+    tag_mapping, embeddings = await asyncio.to_thread(build_channel_tag_mapping, video_tags, clustering_strength)
+
+    consolidated = {
+        video_id: sorted(set(tag_mapping[tag] for tag in tags))
+        for video_id, tags in video_tags.items() if tags
+    }
+    changed = [video_id for video_id, tags in consolidated.items() if tags != sorted(video_tags[video_id])]
+
+    if changed:
+        await asyncio.to_thread(store_consolidated_tags, supabase, channel_id, {video_id: consolidated[video_id] for video_id in changed}, embeddings)
+
+    merged = len(embeddings) - len(set(tag_mapping.values()))
+    success = await send_update(session_id, f"Consolidated tags for channel ID: {channel_id} ({merged} duplicate tags merged across {len(changed)} videos)", supabase)
+    if not success:
+        logger.error(f"Failed to send update for channel {channel_id}")
+    return consolidated
@@ -0,0 +1,343 @@
+# backend/tag_index.py
+
+import os
+import json
+import fcntl
+import logging
+from threading import Lock
+from contextlib import contextmanager
+
+import numpy as np
+from sklearn.cluster import MiniBatchKMeans
+
+logger = logging.getLogger(__name__)
+
+TAG_INDEX_DIR = os.getenv('TAG_INDEX_DIR', 'tag_index')
+IVF_MIN_SIZE = int(os.getenv('TAG_INDEX_IVF_MIN_SIZE', 20000))
+IVF_NPROBE = int(os.getenv('TAG_INDEX_NPROBE', 8))
+
+META_FILE = 'meta.json'
+EMBEDDINGS_FILE = 'embeddings.f32'
+ENTRIES_FILE = 'entries.jsonl'
+IVF_FILE = 'ivf.npz'
+LOCK_FILE = '.lock'
+
+class TagIndex:
+    """
+    Append-only store of tag embeddings with an inverted-file (IVF) index for
+    approximate nearest-neighbour search across every processed video.
+
+    Rows are L2-normalized float32 vectors kept in a raw file that is memory-mapped
+    read-only, so the inner product of two rows is their cosine similarity. Rows
+    appended after the IVF was last built are always scanned exactly, and below
+    IVF_MIN_SIZE rows the whole matrix is scanned exactly.
+
+    The files are shared by every worker process. Appends and IVF rebuilds
+    hold a file lock, and each process catches up with the others' rows by
+    reading the entries file past its last offset, as EmbeddingCache does:
+    before an append, and before a search when the files have changed.
+
+    add() runs on the persist threads while searches run elsewhere. The tag
+    lists only ever grow, and the matrix, deletion mask and IVF are published
+    together as one tuple that is replaced, never modified, so a search works
+    on a consistent view without waiting for an add or an IVF rebuild.
+    """
+
+    def __init__(self, index_dir=TAG_INDEX_DIR):
+        self.index_dir = index_dir
+        self.dim = None
+        self.tags = []
+        self.video_ids = []
+        self.channel_ids = []
+        self._matrix = None
+        self._deleted = np.zeros(0, dtype=bool)
+        self._video_rows = {}
+        # (centroids, inverted lists, rows clustered), or None below IVF_MIN_SIZE
+        self._ivf = None
+        self._ivf_mtime = None
+        self._offset = 0
+        self._channel_centroids = None
+        self._view = (None, self._deleted, None)
+        self._lock = Lock()
+        os.makedirs(index_dir, exist_ok=True)
+        with self._locked(exclusive=False):
+            self._refresh()
+        if self.tags:
+            logger.info(f"Loaded tag index with {len(self.tags)} rows from {self.index_dir}")
+
+    def __len__(self):
+        return len(self.tags)
+
+    def _path(self, name):
+        return os.path.join(self.index_dir, name)
+
+    @contextmanager
+    def _locked(self, exclusive=True):
+        # Readers share the file lock; appends and IVF rebuilds hold it alone
+        with self._lock, open(self._path(LOCK_FILE), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _changed(self):
+        try:
+            if os.path.getsize(self._path(ENTRIES_FILE)) != self._offset:
+                return True
+            return os.stat(self._path(IVF_FILE)).st_mtime_ns != self._ivf_mtime
+        except FileNotFoundError:
+            return False
+
+    def _refresh(self):
+        """
+        Catch up with entries and IVF rebuilds written since the last call, by
+        this or another process. Called with the file lock held.
+        """
+        if self.dim is None:
+            try:
+                with open(self._path(META_FILE), 'r') as file:
+                    self.dim = json.load(file)['dim']
+            except FileNotFoundError:
+                return
+        try:
+            with open(self._path(ENTRIES_FILE), 'rb') as file:
+                file.seek(self._offset)
+                data = file.read()
+        except FileNotFoundError:
+            data = b''
+        # Only complete lines; a torn last line is from an interrupted write
+        complete = data[:data.rfind(b'\n') + 1]
+        first_row = len(self.tags)
+        hidden = []
+        for line in complete.splitlines():
+            entry = json.loads(line)
+            if 'deleted_video_id' in entry:
+                # A deletion marker hides the rows its video had before the marker
+                hidden.extend(self._video_rows.pop(entry['deleted_video_id'], []))
+                continue
+            self._append_entry(entry['tag'], entry['video_id'], entry.get('channel_id'))
+        self._offset += len(complete)
+
+        if complete:
+            # Embeddings are written before entries, so the matrix may hold extra rows
+            stored_rows = os.path.getsize(self._path(EMBEDDINGS_FILE)) // (4 * self.dim)
+            if stored_rows < len(self.tags) and self._matrix is None:
+                logger.warning(f"Tag index has {len(self.tags)} entries but only {stored_rows} embeddings; truncating")
+                del self.tags[stored_rows:], self.video_ids[stored_rows:], self.channel_ids[stored_rows:]
+                self._video_rows = {video_id: [row for row in rows if row < stored_rows] for video_id, rows in self._video_rows.items()}
+            deleted = np.concatenate([self._deleted, np.zeros(len(self.tags) - first_row, dtype=bool)])
+            deleted[hidden] = True
+            self._deleted = deleted
+            self._remap()
+
+        try:
+            ivf_mtime = os.stat(self._path(IVF_FILE)).st_mtime_ns
+        except FileNotFoundError:
+            ivf_mtime = None
+        if ivf_mtime is not None and ivf_mtime != self._ivf_mtime:
+            ivf = np.load(self._path(IVF_FILE))
+            if int(ivf['rows']) <= len(self.tags):
+                self._set_ivf(ivf['centroids'], ivf['assignments'])
+            self._ivf_mtime = ivf_mtime
+        self._publish()
+
+    def _catch_up(self):
+        """
+        Refresh before a search if another process has written since. A search
+        never waits for this process's own append or IVF rebuild: the view it
+        already has is consistent.
+        """
+        if not self._changed() or not self._lock.acquire(blocking=False):
+            return
+        try:
+            with open(self._path(LOCK_FILE), 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_SH)
+                try:
+                    self._refresh()
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+        finally:
+            self._lock.release()
+
+    def _append_entry(self, tag, video_id, channel_id):
+        self._video_rows.setdefault(video_id, []).append(len(self.tags))
+        self.tags.append(tag)
+        self.video_ids.append(video_id)
+        self.channel_ids.append(channel_id)
+
+    def _remap(self):
+        if self.tags:
+            self._matrix = np.memmap(self._path(EMBEDDINGS_FILE), dtype=np.float32, mode='r', shape=(len(self.tags), self.dim))
+        else:
+            self._matrix = np.zeros((0, self.dim or 0), dtype=np.float32)
+
+    def _publish(self):
+        # Rows below the matrix's length are complete in every list
+        self._view = (self._matrix, self._deleted, self._ivf)
+
+    def _set_ivf(self, centroids, assignments):
+        order = np.argsort(assignments, kind='stable')
+        bounds = np.searchsorted(assignments[order], np.arange(len(centroids) + 1))
+        self._ivf = (centroids, [order[bounds[i]:bounds[i + 1]] for i in range(len(centroids))], len(assignments))
+
+    def _rebuild_ivf(self):
+        """
+        Re-cluster every row into sqrt(n) inverted lists.
+        """
+        n_rows = len(self.tags)
+        n_lists = max(1, int(np.sqrt(n_rows)))
+        kmeans = MiniBatchKMeans(n_clusters=n_lists, batch_size=4096, n_init=3, random_state=0)
+        assignments = kmeans.fit_predict(self._matrix)
+        centroids = kmeans.cluster_centers_.astype(np.float32)
+        centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+        # Written aside and renamed so other processes never load half a file
+        temp_path = self._path(IVF_FILE + '.tmp')
+        with open(temp_path, 'wb') as file:
+            np.savez(file, centroids=centroids, assignments=assignments, rows=n_rows)
+        os.replace(temp_path, self._path(IVF_FILE))
+        self._ivf_mtime = os.stat(self._path(IVF_FILE)).st_mtime_ns
+        self._set_ivf(centroids, assignments)
+        self._publish()
+        logger.info(f"Rebuilt tag index IVF with {n_lists} lists over {n_rows} rows")
+
+    def add(self, video_id, channel_id, tags, embeddings):
+        """
+        Persist the final tags of a video, replacing any rows it had before.
+        """
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        with self._locked():
+            # Rows other processes appended come first, and may include this video's
+            self._refresh()
+            if self.dim is None:
+                self.dim = int(embeddings.shape[1])
+                with open(self._path(META_FILE), 'w') as file:
+                    json.dump({'dim': self.dim}, file)
+
+            lines = []
+            if video_id in self._video_rows:
+                lines.append(json.dumps({'deleted_video_id': video_id}))
+            lines.extend(json.dumps({'tag': tag, 'video_id': video_id, 'channel_id': channel_id}) for tag in tags)
+
+            with open(self._path(EMBEDDINGS_FILE), 'ab') as file:
+                # Vectors go first; rows left over from an interrupted append are cut off
+                file.truncate(len(self.tags) * 4 * self.dim)
+                file.write(embeddings.tobytes())
+            with open(self._path(ENTRIES_FILE), 'ab') as file:
+                # Likewise a torn last line, which would swallow the first new entry
+                file.truncate(self._offset)
+                file.write(('\n'.join(lines) + '\n').encode('utf-8'))
+            self._refresh()
+
+            ivf_rows = self._ivf[2] if self._ivf is not None else 0
+            if len(self.tags) >= IVF_MIN_SIZE and len(self.tags) - ivf_rows >= max(ivf_rows, IVF_MIN_SIZE):
+                self._rebuild_ivf()
+
+    def embedding(self, row):
+        return np.array(self._matrix[row])
+
+    def _candidate_rows(self, query, n_rows, ivf):
+        if ivf is None:
+            return None
+        centroids, lists, ivf_rows = ivf
+        n_probe = min(IVF_NPROBE, len(centroids))
+        probes = np.argpartition(-(centroids @ query), n_probe - 1)[:n_probe]
+        return np.concatenate([lists[p] for p in probes] + [np.arange(ivf_rows, n_rows)])
+
+    def search(self, query_embedding, k=10):
+        """
+        Return up to k (row, score) pairs for the live rows most similar to the query.
+        """
+        self._catch_up()
+        matrix, deleted, ivf = self._view
+        if matrix is None or not len(matrix) or k <= 0:
+            return []
+        query = np.asarray(query_embedding, dtype=np.float32).reshape(-1)
+        rows = self._candidate_rows(query, len(matrix), ivf)
+        if rows is None:
+            scores = matrix @ query
+            live = ~deleted
+        else:
+            scores = matrix[rows] @ query
+            live = ~deleted[rows]
+        scores = np.where(live, scores, -np.inf)
+        k = min(k, int(live.sum()))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        if rows is not None:
+            return [(int(rows[i]), float(scores[i])) for i in top]
+        return [(int(i), float(scores[i])) for i in top]
+
+    def find_videos(self, query_embedding, k=10):
+        """
+        Find the k videos whose tags are most similar to the query, best match first.
+        """
+        results = {}
+        for row, score in self.search(query_embedding, k * 5):
+            video_id = self.video_ids[row]
+            if video_id not in results:
+                results[video_id] = {
+                    'video_id': video_id,
+                    'channel_id': self.channel_ids[row],
+                    'tag': self.tags[row],
+                    'score': score
+                }
+                if len(results) == k:
+                    break
+        return list(results.values())
+
+    def related_channels(self, channel_id, k=5):
+        """
+        Rank other channels by the cosine similarity of their mean tag embedding.
+        """
+        self._catch_up()
+        matrix, deleted, _ = self._view
+        if matrix is None or not len(matrix):
+            return []
+        # Every add maps a new matrix, so the centroids are kept per matrix
+        cached = self._channel_centroids
+        if cached is None or cached[0] is not matrix:
+            channel_ids = self.channel_ids[:len(matrix)]
+            live = np.flatnonzero(~deleted & np.array([c is not None for c in channel_ids], dtype=bool))
+            channels, inverse = np.unique(np.array(channel_ids, dtype=object)[live].astype(str), return_inverse=True)
+            sums = np.zeros((len(channels), matrix.shape[1]), dtype=np.float32)
+            np.add.at(sums, inverse, matrix[live])
+            sums /= np.maximum(np.linalg.norm(sums, axis=1, keepdims=True), 1e-12)
+            cached = self._channel_centroids = (matrix, list(channels), sums)
+        _, channels, centroids = cached
+        if channel_id not in channels:
+            return []
+        scores = centroids @ centroids[channels.index(channel_id)]
+        order = [i for i in np.argsort(-scores) if channels[i] != channel_id][:k]
+        return [{'channel_id': channels[i], 'score': float(scores[i])} for i in order]
+
+    def map_to_vocabulary(self, tags, embeddings, min_similarity):
+        """
+        Map tags onto the closest tag already in the global vocabulary.
+        Returns {tag: (vocabulary_tag, vocabulary_embedding)} for tags with a
+        match of at least min_similarity; unmatched tags are left out.
+        """
+        mapping = {}
+        for tag, embedding in zip(tags, embeddings):
+            matches = self.search(embedding, k=1)
+            if matches and matches[0][1] >= min_similarity:
+                row = matches[0][0]
+                # The row is covered by the matrix the search used, and by every later one
+                mapping[tag] = (self.tags[row], self.embedding(row))
+        return mapping
+
+_tag_index = None
+_tag_index_lock = Lock()
+
+def get_tag_index():
+    """
+    Return the process-wide tag index, loading it from TAG_INDEX_DIR on first use.
+    """
+    global _tag_index
+    if _tag_index is None:
+        with _tag_index_lock:
+            if _tag_index is None:
+                _tag_index = TagIndex()
+    return _tag_index
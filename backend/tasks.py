@@ -5,45 +5,61 @@ import re
 import sys
 import json
 import time
+import asyncio
 import requests
 import pandas as pd
+import numpy as np
 from datetime import datetime
 from threading import Lock
-from sentence_transformers import SentenceTransformer
-from sklearn.cluster import AgglomerativeClustering
-from sklearn.metrics.pairwise import cosine_similarity
 from collections import Counter
-import spacy
-import openai
 import logging
 import traceback
 
 from supabase import Client
-from utils import send_update
+from utils import send_update, attach_session, detach_session, replace_video_tags, fetch_rows_for_videos
+from embedding_cache import encode_cached
+from tag_index import get_tag_index
+from text_processing import normalize_tag, detect_names
+from tag_consolidation import cluster_tags, consolidate_channel_tags
+from comment_analytics import update_comment_summaries
+from interviewees import update_interviewees
+from keyword_tagging import extract_keyword_tags
+from transcript_store import CompactTranscript, TRANSCRIPT_FORMAT, load_transcript
+from transcription import get_transcription_backend, transcribe_video
+from checkpoints import CheckpointTracker, COMPLETED, FAILED, save_session, load_session
+from singleflight import SingleFlight
+from scheduler import scheduler
+from memory import memory_governor
+from profiling import profiler
+from youtube_api import youtube_get, parse_duration
+from adaptive_concurrency import dependency_limiter
+from read_cache import invalidate_reads
+from llm_gateway import llm_gateway
+from pipeline import Stage, Pipeline
 
 from youtube_transcript_api import YouTubeTranscriptApi  # New import
+from youtube_transcript_api import NoTranscriptFound, TranscriptsDisabled
 
-# Initialize SpaCy model
-nlp = spacy.load("en_core_web_sm")
-
-# Set up logging
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
-# Load environment variables
-OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
-YOUTUBE_API_KEY = os.getenv('YOUTUBE_API_KEY')
-SENTENCE_TRANSFORMER_MODEL = os.getenv('SENTENCE_TRANSFORMER_MODEL', 'paraphrase-MiniLM-L6-v2')
-
-# Set up OpenAI API key
-openai.api_key = OPENAI_API_KEY
-
 # Lock for status updates
 status_lock = Lock()
 
 # Default configuration values
 NUM_TAGS_DEFAULT = 5
-MAX_CONCURRENT_REQUESTS = 10  # Adjust based on server capacity
+
+# Work is ordered and costed by video length; unknown lengths count as a typical video
+DEFAULT_VIDEO_SECONDS = 600
+# Converts a transcript's word count to spoken seconds
+TRANSCRIPT_WORDS_PER_MINUTE = 150
+
+# Inputs may name a channel directly instead of one of its videos
+CHANNEL_ID_PATTERN = re.compile(r'UC[0-9A-Za-z_-]{22}')
+
+# Identical work requested by concurrent sessions runs once
+channel_flights = SingleFlight('channel')
+transcript_flights = SingleFlight('transcript')
+tag_flights = SingleFlight('tag generation')
 
 def load_transcription_ids():
     """
@@ -66,35 +82,61 @@ def save_transcription_ids(transcription_ids):
     with open(transcription_ids_filename, 'w') as file:
         json.dump(transcription_ids, file, indent=4)
 
+def fetch_captions(video_id):
+    with dependency_limiter('transcript').slot():
+        return YouTubeTranscriptApi.get_transcript(video_id)
+
 async def get_transcript(video_id, session_id, supabase):
+    source = 'youtube_transcript_api'
     try:
-        # Fetch the transcript
-        transcript_data = YouTubeTranscriptApi.get_transcript(video_id)
+        # Fetch the transcript, falling back to local speech-to-text when there are no captions
+        try:
+            transcript_data = await asyncio.to_thread(fetch_captions, video_id)
+        except (NoTranscriptFound, TranscriptsDisabled) as e:
+            # Other failures (rate limits, network errors, unavailable videos) are not fixed by transcribing
+            # The first call loads the speech-to-text model
+            backend = await asyncio.to_thread(get_transcription_backend)
+            if backend is None:
+                raise
+            source = backend.name
+            logger.warning(f"No captions for video {video_id} ({str(e)}); transcribing locally with {source}")
+            success = await send_update(session_id, f"No captions for video {video_id}. Transcribing audio locally...", supabase)
+            if not success:
+                logger.error(f"Failed to send update for video {video_id}")
+            await supabase.table('transcripts').upsert({
+                'video_id': video_id,
+                'retrieval_date': datetime.now().isoformat(),
+                'status': 'in_progress',
+                'source': source
+            }).execute_async()
+            transcript_data = await transcribe_video(video_id, session_id, supabase, backend)
         
-        # Prepare the data for storage
-        transcript_json = json.dumps(transcript_data)
+        # Prepare the data for storage in the compact format
+        transcript = CompactTranscript.from_segments(transcript_data)
         retrieval_date = datetime.now().isoformat()
-        source = 'youtube_transcript_api'
         status = 'completed'
 
         # Store in the database
         data = {
             'video_id': video_id,
-            'transcript': transcript_json,
+            'transcript': None,
+            'transcript_format': TRANSCRIPT_FORMAT,
+            'transcript_blob': transcript.to_column(),
             'retrieval_date': retrieval_date,
             'status': status,
             'source': source
         }
         
         # Assuming you have a 'transcripts' table in Supabase
-        result = supabase.table('transcripts').insert(data).execute()
+        result = await supabase.table('transcripts').upsert(data).execute_async()
+        invalidate_reads(video_ids=[video_id])
 
         # Send update
         success = await send_update(session_id, f"Transcript for video {video_id} retrieved and stored.", supabase)
         if not success:
             logger.error(f"Failed to send update for video {video_id}")
 
-        return transcript_data
+        return transcript
 
     except Exception as e:
         error_message = f"Error retrieving transcript for video {video_id}: {str(e)}"
@@ -108,205 +150,602 @@ async def get_transcript(video_id, session_id, supabase):
             'video_id': video_id,
             'retrieval_date': datetime.now().isoformat(),
             'status': 'failed',
-            'source': 'youtube_transcript_api'
+            'source': source
         }
-        supabase.table('transcripts').insert(error_data).execute()
+        await supabase.table('transcripts').upsert(error_data).execute_async()
         
         raise
 
-def generate_tags(transcript_text, num_tags=NUM_TAGS_DEFAULT):
+async def generate_tags(transcript_text, num_tags=NUM_TAGS_DEFAULT):
     """
     Generate tags using OpenAI GPT-4.
     """
     prompt = f"Generate {num_tags} relevant tags for the following transcript. The tags are used to describe the content of the transcript.  Provide the tags as a list separated by commas with no numbers.  For example: 'tag1, tag2, tag3, tag4'.  They should be in order of most relevant to least relevant:\\n\\n{transcript_text}"
-    response = openai.ChatCompletion.create(
+    content = await llm_gateway.chat(
         model="gpt-4",
         messages=[
             {"role": "system", "content": "You are a helpful assistant."},
             {"role": "user", "content": prompt}
         ]
     )
-    tags = response['choices'][0]['message']['content'].strip().split(',')
+    tags = content.strip().split(',')
     tags = [tag.strip() for tag in tags if tag.strip()]
     return tags
 
-def identify_interviewees(title, description):
+def estimate_tag_tokens(transcript_text, num_tags=NUM_TAGS_DEFAULT):
     """
-    Identify interviewees using OpenAI GPT-3.5 Turbo.
+    Rough token count of a generate_tags call: ~4 characters per token plus the
+    prompt and the reply.
     """
-    prompt = (
-        f"Based on the following title and description, identify the names of the people being interviewed."
-        f" Do not include the host. Do not include any information other than the interviewees."
-        f" If there are multiple people, their names should be listed and separated by a comma.  For example: 'John Doe, Jane Smith'\\n\\n"
-        f"Title: {title}\\nDescription: {description}"
-    )
-    response = openai.ChatCompletion.create(
-        model="gpt-3.5-turbo",
-        messages=[
-            {"role": "system", "content": "You are a helpful assistant."},
-            {"role": "user", "content": prompt}
-        ]
-    )
-    interviewees = response['choices'][0]['message']['content'].strip().split(',')
-    interviewees = [person.strip() for person in interviewees if person.strip()]
-    return interviewees
+    return len(transcript_text) // 4 + 100 + 10 * num_tags
 
-def normalize_tag(tag):
+class ChannelJob:
     """
-    Normalize a tag string.
+    A channel entering the pipeline; `videos` is None until its metadata is fetched.
     """
-    tag = tag.strip().lower()
-    tag = re.sub(r'[^a-z0-9\\s]', '', tag)  # Remove special characters
-    tag = re.sub(r'\\s+', ' ', tag)  # Replace multiple spaces with single space
-    return tag
 
-def detect_names(tags):
+    def __init__(self, channel_id, snippet, videos):
+        self.channel_id = channel_id
+        self.snippet = snippet
+        self.videos = videos
+
+class VideoItem:
+    def __init__(self, video):
+        self.video = video
+        self.video_id = video['video_id']
+        self.duration_seconds = video.get('duration_seconds') or DEFAULT_VIDEO_SECONDS
+
+class TranscribedVideo:
+    def __init__(self, video_id, transcript_text, num_tags):
+        self.video_id = video_id
+        self.transcript_text = transcript_text
+        self.num_tags = num_tags
+        # Tag generation cost follows the transcript rather than the nominal duration
+        self.spoken_seconds = len(transcript_text.split()) * 60 / TRANSCRIPT_WORDS_PER_MINUTE
+
+class GeneratedTags:
+    def __init__(self, video_id, tags):
+        self.video_id = video_id
+        self.tags = tags
+
+class TaggedVideo:
+    def __init__(self, video_id, tags, embeddings):
+        self.video_id = video_id
+        self.tags = tags
+        self.embeddings = embeddings
+
+def work_cost(seconds):
     """
-    Detect names in the tags and separate them from other tags.
+    Scheduler cost of a work unit on `seconds` of video: its length in minutes.
     """
-    names = []
-    non_names = []
-    for tag in tags:
-        doc = nlp(tag)
-        if any(ent.label_ == "PERSON" for ent in doc.ents):
-            names.append(tag)
-        else:
-            non_names.append(tag)
-    return names, non_names
+    return max(seconds, 60) / 60
+
+def format_seconds(seconds):
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m {seconds % 60:02d}s"
+    return f"{seconds}s"
 
-async def handle_transcription_status(video_id, existing_transcript, session_id, supabase):
+def keyword_tags(item: TranscribedVideo) -> GeneratedTags:
     """
-    Handle existing transcription status.
+    The generate_tags stage in local mode. Module-level so that it can run
+    in a process pool.
     """
-    status = existing_transcript.get('status')
-    if status == 'completed':
-        success = await send_update(session_id, f"Existing transcription for video ID: {video_id} found and completed.", supabase)
-        if not success:
-            logger.error(f"Failed to send update for video {video_id}")
-        return existing_transcript['transcript']
-    elif status == 'in_progress':
-        success = await send_update(session_id, f"Existing transcription for video ID: {video_id} is in progress.", supabase)
-        if not success:
-            logger.error(f"Failed to send update for video {video_id}")
-        # Implement further logic if needed
-        return None
-    elif status == 'failed':
-        success = await send_update(session_id, f"Previous transcription failed for video ID: {video_id}. Requesting new transcription...", supabase)
+    tags = extract_keyword_tags(item.transcript_text, item.num_tags)
+    return GeneratedTags(item.video_id, [normalize_tag(tag) for tag in tags])
+
+def consolidate_tags(normalized_tags, clustering_strength, cluster=True):
+    """
+    Map a video's normalized tags onto the global tag vocabulary, clustering the
+    tags that have no close match unless a channel-level pass will do it later.
+    Returns the sorted final tags and a matrix with one embedding row per final tag.
+    """
+    unique_tags = sorted(set(normalized_tags))
+    if not unique_tags:
+        return [], encode_cached([])
+    embeddings = dict(zip(unique_tags, encode_cached(unique_tags)))
+
+    # Detect and separate names from other tags
+    names, non_names = detect_names(unique_tags)
+    logger.debug(f"Detected names: {names}")
+    logger.debug(f"Non-name tags to be embedded: {non_names}")
+
+    tag_mapping = {name: name for name in names}  # Map names to themselves
+    final_embeddings = {name: embeddings[name] for name in names}
+
+    # Snap tags onto tags already seen on other videos before clustering the rest
+    vocabulary_matches = get_tag_index().map_to_vocabulary(
+        non_names, [embeddings[tag] for tag in non_names], 1 - clustering_strength
+    )
+    for tag, (vocabulary_tag, vocabulary_embedding) in vocabulary_matches.items():
+        tag_mapping[tag] = vocabulary_tag
+        final_embeddings[vocabulary_tag] = vocabulary_embedding
+
+    unmatched = [tag for tag in non_names if tag not in vocabulary_matches]
+    if not cluster:
+        for tag in unmatched:
+            tag_mapping[tag] = tag
+            final_embeddings[tag] = embeddings[tag]
+    elif unmatched:
+        unmatched_embeddings = np.stack([embeddings[tag] for tag in unmatched])
+        for tag, representative_tag in cluster_tags(unmatched, unmatched_embeddings, clustering_strength).items():
+            tag_mapping[tag] = representative_tag
+            final_embeddings[representative_tag] = embeddings[representative_tag]
+
+    final_tags = sorted(set(tag_mapping[tag] for tag in normalized_tags))
+    return final_tags, np.stack([final_embeddings[tag] for tag in final_tags])
+
+def is_channel_id(value):
+    return CHANNEL_ID_PATTERN.fullmatch(value) is not None
+
+async def resolve_channel(video_id, session_id, supabase: Client):
+    """
+    Look up the snippet of a video, which names its channel. Returns None when
+    the video is unknown. A channel ID resolves to an equivalent snippet of
+    the channel itself.
+    """
+    if is_channel_id(video_id):
+        data = await asyncio.to_thread(youtube_get, 'channels', {'part': 'snippet', 'id': video_id})
+        if not data.get('items'):
+            logger.warning(f"No data found for channel ID: {video_id}")
+            success = await send_update(session_id, f"No data found for channel ID: {video_id}", supabase)
+            if not success:
+                logger.error(f"Failed to send update for channel {video_id}")
+            return None
+        channel = data['items'][0]
+        return {'channelId': channel['id'], 'channelTitle': channel['snippet']['title'], 'description': channel['snippet'].get('description', '')}
+
+    # Step 1: Get channel ID from YouTube API
+    logger.debug("Fetching video info from YouTube API")
+    params = {
+        'part': 'snippet',
+        'id': video_id
+    }
+    data = await asyncio.to_thread(youtube_get, 'videos', params)
+
+    if not data['items']:
+        logger.warning(f"No data found for video ID: {video_id}")
+        success = await send_update(session_id, f"No data found for video ID: {video_id}", supabase)
         if not success:
             logger.error(f"Failed to send update for video {video_id}")
-        audio_url = await get_audio_url(f"https://www.youtube.com/watch?v={video_id}", session_id, supabase)
-        return await get_transcription(audio_url, video_id, session_id, supabase)
-    else:
         return None
+    return data['items'][0]['snippet']
 
-async def process_video(video, supabase: Client, transcription_ids, session_id, clustering_strength):
-    try:
-        video_id = video['video_id']
-        logger.info(f"Processing video ID: {video_id}")
+async def fetch_channel_metadata(snippet, session_id, supabase: Client, num_videos, checkpoints):
+    """
+    Fetch the top videos and statistics of the channel named in a video
+    snippet and save them. Returns the list of saved videos.
+    """
+    channel_id = snippet['channelId']
+    channel_title = snippet['channelTitle']
+    channel_url = f"https://www.youtube.com/channel/{channel_id}"
+    channel_description = snippet.get('description', '')
+    logger.info(f"Found channel: {channel_title} (ID: {channel_id})")
+
+    # Step 2: Fetch top videos for the channel
+    logger.debug("Fetching top videos for the channel")
+    search_params = {
+        'part': 'id',
+        'channelId': channel_id,
+        'maxResults': num_videos,
+        'order': 'viewCount',
+        'type': 'video'
+    }
+    search_data = await asyncio.to_thread(youtube_get, 'search', search_params)
+    top_video_ids = [item['id']['videoId'] for item in search_data['items']]
+
+    # Step 3: Fetch detailed information for these videos
+    logger.debug("Fetching detailed information for these videos")
+    videos_params = {
+        'part': 'snippet,statistics,contentDetails',
+        'id': ','.join(top_video_ids)
+    }
+    videos_data = await asyncio.to_thread(youtube_get, 'videos', videos_params)
+    
+    videos = []
+    for item in videos_data['items']:
+        snippet = item['snippet']
+        statistics = item.get('statistics', {})
+        content_details = item.get('contentDetails', {})
+        videos.append({
+            'video_id': item['id'],
+            'title': snippet['title'],
+            'description': snippet.get('description', ''),
+            'duration': content_details.get('duration', 'N/A'),
+            'duration_seconds': parse_duration(content_details.get('duration')),
+            'view_count': int(statistics.get('viewCount', 0)),
+            'like_count': int(statistics.get('likeCount', 0)),
+            'comment_count': int(statistics.get('commentCount', 0)),
+            'retrieval_date': datetime.utcnow().isoformat(),
+            # Freshly fetched metadata restarts every later stage
+            'processing_status': checkpoints.initial_status(),
+            'error_message': None
+        })
+
+    # Fetch channel statistics
+    logger.debug("Fetching channel statistics")
+    channel_stats_params = {
+        'part': 'statistics',
+        'id': channel_id
+    }
+    channel_stats_data = await asyncio.to_thread(youtube_get, 'channels', channel_stats_params)
+    
+    channel_stats = channel_stats_data['items'][0]['statistics']
+    total_videos = int(channel_stats.get('videoCount', 0))
+    subscribers = int(channel_stats.get('subscriberCount', 0))
+
+    # Update the channel information
+    logger.debug("Updating the channel information")
+    await supabase.table('channels').upsert({
+        'channel_id': channel_id,
+        'channel_name': channel_title,
+        'link_to_channel': f"https://www.youtube.com/channel/{channel_id}",
+        'about': snippet.get('description', ''),
+        'number_of_total_videos': total_videos,
+        'number_of_retrieved_videos': len(videos),
+        'ids_of_retrieved_videos': json.dumps(top_video_ids),
+        'subscribers': subscribers,
+        'channel_retrieval_date': datetime.utcnow().isoformat()
+    }).execute_async()
+
+    success = await send_update(session_id, f"Updated channel info for {channel_title}", supabase)
+    if not success:
+        logger.error(f"Failed to send update for channel {channel_title}")
+
+    await supabase.table('videos').upsert(videos).execute_async()
+    checkpoints.reset([video['video_id'] for video in videos])
+    invalidate_reads(channel_id, [video['video_id'] for video in videos], channels=True)
+    success = await send_update(session_id, f"Saved channel and videos for channel ID: {channel_id}", supabase)
+    if not success:
+        logger.error(f"Failed to send update for channel {channel_id}")
+
+    return videos
+
+def fetch_video_comments(video_id, num_comments):
+    """
+    Fetch up to num_comments top-level comments and replies for a video.
+    """
+    comments_params = {
+        'part': 'snippet,replies',
+        'videoId': video_id,
+        'maxResults': num_comments,
+        'order': 'relevance'
+    }
+    comments_data = youtube_get('commentThreads', comments_params)
+    
+    comments = []
+    for item in comments_data['items']:
+        comment = item['snippet']['topLevelComment']['snippet']
+        comments.append({
+            'video_id': video_id,
+            'comment_id': item['id'],
+            'comment_author': comment.get('authorDisplayName', ''),
+            'comment_likes': int(comment.get('likeCount', 0)),
+            'comment_published_at': comment.get('publishedAt', ''),
+            'comment_updated_at': comment.get('updatedAt', ''),
+            'comment_parent_id': '',  # Top-level comment, no parent
+            'comment_text': comment.get('textOriginal', ''),
+            'comment_retrieval_date': datetime.utcnow().isoformat()
+        })
         
-        # Fetch or retrieve transcript
-        transcript_data = await get_transcript(video_id, session_id, supabase)
-
-        if transcript_data:
-            # Convert transcript data to plain text
-            transcript_text = ' '.join([entry['text'] for entry in transcript_data])
-            
-            # Generate tags using OpenAI
-            logger.info(f"Generating tags for video ID: {video_id}")
-            tags = generate_tags(transcript_text, num_tags=NUM_TAGS_DEFAULT)
-            normalized_tags = [normalize_tag(tag) for tag in tags]
-            
-            # Detect and separate names from other tags
-            names, non_names = detect_names(normalized_tags)
-            logger.debug(f"Detected names: {names}")
-            logger.debug(f"Non-name tags to be embedded: {non_names}")
-
-            if non_names:
-                # Use sentence-transformers to embed the non-name tags
-                model = SentenceTransformer(SENTENCE_TRANSFORMER_MODEL)
-                non_name_embeddings = model.encode(non_names)
-
-                # Use Agglomerative Clustering with user-defined clustering strength
-                clustering = AgglomerativeClustering(n_clusters=None, distance_threshold=clustering_strength, affinity='cosine', linkage='average')
-                labels = clustering.fit_predict(non_name_embeddings)
-
-                # Create a dictionary to map cluster labels to representative tags
-                cluster_to_tag = {}
-                for tag, label in zip(non_names, labels):
-                    if label not in cluster_to_tag:
-                        cluster_to_tag[label] = [tag]
-                    else:
-                        cluster_to_tag[label].append(tag)
-
-                # Find the most representative tag in each cluster
-                consolidated_tags = set()
-                tag_mapping = {name: name for name in names}  # Map names to themselves
-
-                for label, tags in cluster_to_tag.items():
-                    representative_tag = find_representative_tag(tags, model)
-                    for tag in tags:
-                        tag_mapping[tag] = representative_tag
-                    consolidated_tags.add(representative_tag)
-                consolidated_tags.update(names)
-
-                # Map each tag to its cluster representative
-                final_tags = [tag_mapping[tag] for tag in normalized_tags]
-                final_tags = sorted(set(final_tags))
-            else:
-                final_tags = sorted(set(normalized_tags))
-
-            # Store tags in Supabase
-            logger.info(f"Storing tags in Supabase for video ID: {video_id}")
-            for tag in final_tags:
-                supabase.table('tags').insert({
+        # Process reply comments
+        if 'replies' in item:
+            for reply in item['replies']['comments']:
+                reply_snippet = reply['snippet']
+                comments.append({
                     'video_id': video_id,
-                    'tag': tag,
-                    'processed_date': datetime.utcnow().isoformat()
-                }).execute()
-            logger.info(f"Stored {len(final_tags)} tags in Supabase for video ID: {video_id}")
-
-            # Update tags in videos table
-            logger.info(f"Updating tags in videos table for video ID: {video_id}")
-            supabase.table('videos').update({
-                'tags': ", ".join(final_tags),
-            }).eq('video_id', video_id).execute()
-            logger.info(f"Updated tags in videos table for video ID: {video_id}")
-
-            success = await send_update(session_id, f"Generated and stored {len(final_tags)} tags for video ID: {video_id}", supabase)
-            if not success:
-                logger.error(f"Failed to send update for video {video_id}")
+                    'comment_id': reply['id'],
+                    'comment_author': reply_snippet.get('authorDisplayName', ''),
+                    'comment_likes': int(reply_snippet.get('likeCount', 0)),
+                    'comment_published_at': reply_snippet.get('publishedAt', ''),
+                    'comment_updated_at': reply_snippet.get('updatedAt', ''),
+                    'comment_parent_id': item['id'],  # Parent comment ID
+                    'comment_text': reply_snippet.get('textOriginal', ''),
+                    'comment_retrieval_date': datetime.utcnow().isoformat()
+                })
+
+        # Break the loop if we've reached the desired number of comments
+        if len(comments) >= num_comments:
+            break
+    
+    # Truncate comments list if it exceeds num_comments
+    return comments[:num_comments]
+
+# Checkpoint stage recorded as failed when a pipeline stage fails for a video
+CHECKPOINT_STAGES = {
+    'fetch_transcript': 'transcript',
+    'generate_tags': 'tags',
+    'consolidate_tags': 'tags',
+    'persist': 'tags',
+}
+
+class ChannelRun:
+    """
+    One channel's pass through the stage pipeline:
+
+        fetch_metadata -> fetch_comments -> fetch_transcript -> generate_tags
+            -> consolidate_tags -> persist -> finalize_channel
+
+    fetch_metadata fans the channel out into its videos, longest first,
+    which then stream through the per-video stages independently, so one
+    video's tags are generated while the next one's transcript is fetched.
+    Transcripts and tag generation are fairly scheduled work units costed
+    by video length, and the scheduler starts a session's costliest queued
+    unit first. finalize_channel is a
+    barrier for the channel-wide comment analytics and tag clustering.
+    Interviewees are identified alongside the per-video stages.
+    """
 
-    except Exception as e:
-        error_message = f"Error processing video ID {video_id}: {str(e)}"
-        logger.error(error_message)
-        success = await send_update(session_id, error_message, supabase)
+    def __init__(self, session_id, supabase: Client, channel_id, channel_key, channels, checkpoints, options):
+        self.session_id = session_id
+        self.supabase = supabase
+        self.channel_id = channel_id
+        self.channel_key = channel_key
+        self.channels = channels
+        self.checkpoints = checkpoints
+        self.options = options
+        self.video_ids = []
+        self.interviewees = None
+        # Video seconds still to transcribe and tag, and those done, for the ETA
+        self.remaining_seconds = {}
+        self.done_seconds = 0
+        self.started = None
+
+    def pipeline(self):
+        session_id = self.session_id
+        tag_mode = self.options['tag_mode']
+
+        async def scheduled(item, run):
+            return await scheduler.run(session_id, run, cost=work_cost(item.duration_seconds))
+
+        async def scheduled_once(item, run):
+            # Concurrent sessions tagging the same video share one generation
+            key = (item.video_id, item.num_tags, tag_mode)
+            return await tag_flights.do(key, scheduler.run, session_id, run, cost=work_cost(item.spoken_seconds), owner=session_id)
+
+        if tag_mode == 'local':
+            # Keyphrase ranking is CPU-bound; PIPELINE_STAGES can move it to a process pool
+            generate = Stage('generate_tags', keyword_tags, TranscribedVideo, GeneratedTags, concurrency=2, executor='thread', admit=scheduled_once)
+        else:
+            generate = Stage('generate_tags', self.llm_tags, TranscribedVideo, GeneratedTags, concurrency=4, admit=scheduled_once)
+
+        return Pipeline(f"channel {self.channel_id}", [
+            Stage('fetch_metadata', self.fetch_metadata, ChannelJob, VideoItem, fan_out=True),
+            Stage('fetch_comments', self.fetch_comments, VideoItem, VideoItem, concurrency=2),
+            Stage('fetch_transcript', self.fetch_transcript, VideoItem, TranscribedVideo, concurrency=4, admit=scheduled),
+            generate,
+            # The embedding model and tag index are shared, so one video at a time off the event loop
+            Stage('consolidate_tags', self.consolidate_video_tags, GeneratedTags, TaggedVideo, executor='thread'),
+            Stage('persist', self.persist, TaggedVideo, TaggedVideo, concurrency=2, executor='thread', after=self.persisted),
+            Stage('finalize_channel', self.finalize_channel, TaggedVideo, TaggedVideo, barrier=True),
+        ], on_error=self.stage_failed)
+
+    async def send(self, message):
+        success = await send_update(self.session_id, message, self.supabase)
         if not success:
-            logger.error(f"Failed to send error update for video {video_id}")
-
-# Helper function to find representative tag
-def find_representative_tag(cluster, model):
+            logger.error(f"Failed to send update for session {self.session_id}: {message}")
+
+    def finished(self, video_id):
+        """
+        Count a video as done for the ETA, however its stages ended.
+        """
+        seconds = self.remaining_seconds.pop(video_id, None)
+        if seconds is not None:
+            self.done_seconds += seconds
+
+    def progress(self):
+        """
+        Videos done and a duration-weighted ETA: remaining video seconds at the
+        rate video seconds have been processed so far.
+        """
+        total = len(self.video_ids)
+        done = total - len(self.remaining_seconds)
+        note = f"{done} of {total} videos"
+        elapsed = time.monotonic() - self.started
+        if self.remaining_seconds and self.done_seconds and elapsed:
+            eta = sum(self.remaining_seconds.values()) * elapsed / self.done_seconds
+            note += f", about {format_seconds(eta)} left"
+        return note
+
+    async def stage_failed(self, stage, item, error):
+        if stage not in CHECKPOINT_STAGES:
+            # Without metadata there is nothing to process; the caller reports it
+            if stage == 'fetch_metadata':
+                raise error
+            await self.send(f"Error in stage {stage} for channel ID {self.channel_id}: {str(error)}")
+            return
+        error_message = f"Error processing video ID {item.video_id}: {str(error)}"
+        await self.checkpoints.mark([item.video_id], CHECKPOINT_STAGES[stage], FAILED, error_message)
+        self.finished(item.video_id)
+        await self.send(f"{error_message} ({self.progress()})")
+
+    async def fetch_metadata(self, job: ChannelJob):
+        # Steps 2-4: Channel and video metadata, unless a previous run stored it
+        videos = job.videos
+        if videos is None:
+            videos = await fetch_channel_metadata(job.snippet, self.session_id, self.supabase, self.options['num_videos'], self.checkpoints)
+            self.channels[self.channel_key] = {'channel_id': self.channel_id, 'video_ids': [video['video_id'] for video in videos]}
+            await asyncio.to_thread(save_session, self.supabase, self.session_id, channels=self.channels)
+        self.video_ids = [video['video_id'] for video in videos]
+        if any(video.get('duration_seconds') is None for video in videos):
+            # Resumed runs only kept the IDs
+            rows = await asyncio.to_thread(fetch_rows_for_videos, self.supabase, 'videos', 'video_id, duration_seconds', self.video_ids)
+            durations = {row['video_id']: row['duration_seconds'] for row in rows}
+            videos = [{**video, 'duration_seconds': durations.get(video['video_id'])} for video in videos]
+
+        # Step 4b: Interviewees from titles and descriptions, for the whole channel at once
+        if not all(self.checkpoints.is_completed(video_id, 'interviewees') for video_id in self.video_ids):
+            self.interviewees = asyncio.create_task(self.identify_interviewees(videos))
+
+        # Longest videos first so that none of them starts last and holds up the end
+        items = sorted((VideoItem(video) for video in videos), key=lambda item: -item.duration_seconds)
+        self.remaining_seconds = {
+            item.video_id: item.duration_seconds for item in items if not self.checkpoints.is_completed(item.video_id, 'tags')
+        }
+        self.started = time.monotonic()
+        return items
+
+    async def identify_interviewees(self, videos):
+        try:
+            _, failed = await update_interviewees(self.session_id, self.supabase, self.channel_id, videos)
+            failed_ids = set(failed)
+            await self.checkpoints.mark([video_id for video_id in self.video_ids if video_id not in failed_ids], 'interviewees', COMPLETED)
+            if failed:
+                # Left for a resumed run to retry
+                await self.checkpoints.mark(failed, 'interviewees', FAILED, "LLM interviewee identification failed")
+            invalidate_reads(self.channel_id, self.video_ids)
+        except Exception as e:
+            error_message = f"Error identifying interviewees for channel ID {self.channel_id}: {str(e)}"
+            logger.error(error_message)
+            await self.checkpoints.mark(self.video_ids, 'interviewees', FAILED, error_message)
+            await self.send(error_message)
+
+    async def fetch_comments(self, item: VideoItem):
+        # Step 5: Comments; a failure is recorded but does not hold back the video's other stages
+        video_id = item.video_id
+        if self.checkpoints.is_completed(video_id, 'comments'):
+            return item
+        try:
+            comments = await asyncio.to_thread(fetch_video_comments, video_id, self.options['num_comments'])
+            await self.supabase.table('comments').upsert(comments).execute_async()
+            await self.checkpoints.mark([video_id], 'comments', COMPLETED)
+            invalidate_reads(video_ids=[video_id])
+            await self.send(f"Saved {len(comments)} comments for video ID: {video_id}")
+        except Exception as e:
+            error_message = f"Error fetching comments for video ID {video_id}: {str(e)}"
+            logger.error(error_message)
+            await self.checkpoints.mark([video_id], 'comments', FAILED, error_message)
+            await self.send(error_message)
+        return item
+
+    async def fetch_transcript(self, item: VideoItem):
+        # Step 6: Transcript, reusing the stored one when a previous run got it
+        video_id = item.video_id
+        if self.checkpoints.is_completed(video_id, 'tags'):
+            logger.info(f"Tags already generated for video ID: {video_id}; skipping")
+            return None
+
+        transcript = None
+        if self.checkpoints.is_completed(video_id, 'transcript'):
+            transcript = await asyncio.to_thread(load_transcript, self.supabase, video_id)
+        if transcript is None:
+            transcript = await transcript_flights.do(video_id, get_transcript, video_id, self.session_id, self.supabase, owner=self.session_id)
+            await self.checkpoints.mark([video_id], 'transcript', COMPLETED)
+
+        if not (transcript and transcript.n_segments):
+            # Nothing to tag
+            await self.checkpoints.mark([video_id], 'tags', COMPLETED)
+            self.finished(video_id)
+            return None
+        # Only the text frames are decompressed; no per-segment dicts are built
+        return TranscribedVideo(video_id, transcript.text(), self.options['num_tags'])
+
+    async def llm_tags(self, item: TranscribedVideo):
+        logger.info(f"Generating tags for video ID: {item.video_id} (llm)")
+        scheduler.charge_llm_tokens(self.session_id, estimate_tag_tokens(item.transcript_text, item.num_tags))
+        tags = await generate_tags(item.transcript_text, item.num_tags)
+        return GeneratedTags(item.video_id, [normalize_tag(tag) for tag in tags])
+
+    def consolidate_video_tags(self, item: GeneratedTags):
+        # Clustering is left to the channel-level pass in finalize_channel
+        final_tags, final_embeddings = consolidate_tags(item.tags, self.options['clustering_strength'], cluster=False)
+        return TaggedVideo(item.video_id, final_tags, final_embeddings)
+
+    def persist(self, item: TaggedVideo):
+        video_id = item.video_id
+        logger.info(f"Storing tags in Supabase for video ID: {video_id}")
+        replace_video_tags(self.supabase, {video_id: item.tags}, datetime.utcnow().isoformat())
+        self.supabase.table('videos').update({
+            'tags': ", ".join(item.tags),
+        }).eq('video_id', video_id).execute()
+        invalidate_reads(self.channel_id, [video_id])
+
+        # Persist the final embeddings so later videos and searches can reuse them
+        try:
+            get_tag_index().add(video_id, self.channel_id, item.tags, item.embeddings)
+        except Exception as e:
+            logger.error(f"Failed to add tags for video ID {video_id} to the tag index: {str(e)}")
+        return item
+
+    async def persisted(self, item: TaggedVideo):
+        await self.checkpoints.mark([item.video_id], 'tags', COMPLETED)
+        self.finished(item.video_id)
+        await self.send(f"Generated and stored {len(item.tags)} tags for video ID: {item.video_id} ({self.progress()})")
+
+    async def finalize_channel(self, items):
+        if self.interviewees is not None:
+            await self.interviewees
+
+        # Step 5b: Fold the new comments into the per-video comment analytics
+        try:
+            updated = await update_comment_summaries(self.session_id, self.supabase, self.video_ids)
+            invalidate_reads(video_ids=[summary['video_id'] for summary in updated])
+        except Exception as e:
+            error_message = f"Error computing comment analytics for channel ID {self.channel_id}: {str(e)}"
+            logger.error(error_message)
+            await self.send(error_message)
+
+        # Step 7: Consolidate tags across the whole channel in one clustering pass
+        try:
+            consolidated = await consolidate_channel_tags(self.session_id, self.supabase, self.channel_id, self.video_ids, self.options['clustering_strength'])
+            invalidate_reads(self.channel_id, list(consolidated))
+        except Exception as e:
+            error_message = f"Error consolidating tags for channel ID {self.channel_id}: {str(e)}"
+            logger.error(error_message)
+            await self.send(error_message)
+        return items
+
+async def process_channel(session_id, supabase: Client, channel_id, snippet, videos, channel_key, channels, checkpoints, transcription_ids, options):
     """
-    Find the most representative tag in a cluster based on average similarity.
+    Run the channel through the stage pipeline: metadata (unless `videos` were
+    already fetched by a previous run), interviewees, comments, comment
+    analytics, transcripts and tags, and the channel-wide tag consolidation.
+    Returns the channel's video IDs.
     """
-    if len(cluster) == 1:
-        return cluster[0]
-    
-    # Calculate similarity within the cluster
-    embeddings = model.encode(cluster)
-    similarity_matrix = cosine_similarity(embeddings)
-    
-    # Find the tag with the highest average similarity to all other tags in the cluster
-    avg_similarity = similarity_matrix.mean(axis=1)
-    most_representative_index = avg_similarity.argmax()
-    return cluster[most_representative_index]
-
-async def process_videos(session_id: str, supabase: Client, video_ids: list, num_videos: int, num_comments: int, num_tags: int, clustering_strength: float):
+    run = ChannelRun(session_id, supabase, channel_id, channel_key, channels, checkpoints, options)
+    logger.info(f"Starting the pipeline for channel ID: {channel_id}")
+    try:
+        await run.pipeline().run([ChannelJob(channel_id, snippet, videos)])
+    finally:
+        if run.interviewees is not None and not run.interviewees.done():
+            run.interviewees.cancel()
+    logger.info(f"Finished the pipeline for channel ID: {channel_id}")
+    return run.video_ids
+
+async def process_videos(session_id: str, supabase: Client, video_ids: list, num_videos: int, num_comments: int, num_tags: int, clustering_strength: float, resume: bool = False, priority: str = 'interactive', tag_mode: str = 'llm'):
     """
     Core function to process videos: fetch channel info, videos, comments, transcribe, and generate tags.
+    Each ID names a video or a channel. Returns the stored channels, keyed by
+    the input ID they were resolved from, or None when the run failed.
+
+    Every video's metadata, comments, transcript and tags stages are checkpointed in
+    videos.processing_status. With resume=True the session's stored channels are
+    reused and only stages that are not yet completed run again.
+
+    Channels are single-flighted on their normalized parameters: a session that
+    asks for a channel another session is already processing attaches to that
+    run's updates and shares its result instead of repeating the work.
     """
     logger.info("Starting process_videos function")
+    options = {
+        'num_videos': int(num_videos),
+        'num_comments': int(num_comments),
+        'num_tags': int(num_tags),
+        'clustering_strength': round(float(clustering_strength), 4),
+        'tag_mode': tag_mode
+    }
+    checkpoints = CheckpointTracker(supabase)
+    session = await asyncio.to_thread(load_session, supabase, session_id) if resume else None
+    channels = (session or {}).get('channels') or {}
+    await asyncio.to_thread(save_session, supabase, session_id, status='running', channels=channels, parameters={'video_ids': video_ids, 'priority': priority, **options})
+    scheduler.register(session_id, priority)
+    memory_governor.begin_session(session_id)
+    profiler.session_started(session_id)
     try:
-        success = await send_update(session_id, "Starting video processing...", supabase)
+        message = "Resuming video processing..." if resume else "Starting video processing..."
+        success = await send_update(session_id, message, supabase)
         if not success:
             logger.error(f"Failed to send initial update for session {session_id}")
         
@@ -316,185 +755,42 @@ async def process_videos(session_id: str, supabase: Client, video_ids: list, num
         for video_id in video_ids:
             logger.info(f"Processing video ID: {video_id}")
             try:
-                # Step 1: Get channel ID from YouTube API
-                logger.debug("Fetching video info from YouTube API")
-                video_info_url = 'https://www.googleapis.com/youtube/v3/videos'
-                params = {
-                    'part': 'snippet',
-                    'id': video_id,
-                    'key': YOUTUBE_API_KEY
-                }
-                response = requests.get(video_info_url, params=params)
-                response.raise_for_status()
-                data = response.json()
-
-                if not data['items']:
-                    logger.warning(f"No data found for video ID: {video_id}")
-                    success = await send_update(session_id, f"No data found for video ID: {video_id}", supabase)
+                # Step 1: Resolve the channel, reusing stored metadata when a previous run completed it
+                snippet = None
+                videos = None
+                resolved = channels.get(video_id) if resume else None
+                if resolved:
+                    channel_id = resolved['channel_id']
+                    await asyncio.to_thread(checkpoints.load, resolved['video_ids'])
+                    if all(checkpoints.is_completed(v, 'metadata') for v in resolved['video_ids']):
+                        videos = [{'video_id': v} for v in resolved['video_ids']]
+                        logger.info(f"Reusing stored metadata for channel ID: {channel_id}")
+                if videos is None:
+                    snippet = await resolve_channel(video_id, session_id, supabase)
+                    if snippet is None:
+                        continue
+                    channel_id = snippet['channelId']
+
+                flight_key = (channel_id, options['num_videos'], options['num_comments'], options['num_tags'], options['clustering_strength'], options['tag_mode'])
+                leader_session_id = channel_flights.owner(flight_key)
+                if leader_session_id is not None:
+                    # Another session is already processing this channel with the same parameters
+                    attach_session(leader_session_id, session_id)
+                    success = await send_update(session_id, f"Channel ID: {channel_id} is already being processed by session {leader_session_id}; following its progress", supabase)
                     if not success:
-                        logger.error(f"Failed to send update for video {video_id}")
-                    continue
-
-                snippet = data['items'][0]['snippet']
-                channel_id = snippet['channelId']
-                channel_title = snippet['channelTitle']
-                channel_url = f"https://www.youtube.com/channel/{channel_id}"
-                channel_description = snippet.get('description', '')
-                logger.info(f"Found channel: {channel_title} (ID: {channel_id})")
-
-                # Step 2: Fetch top videos for the channel
-                logger.debug("Fetching top videos for the channel")
-                search_url = 'https://www.googleapis.com/youtube/v3/search'
-                search_params = {
-                    'part': 'id',
-                    'channelId': channel_id,
-                    'maxResults': num_videos,
-                    'order': 'viewCount',
-                    'type': 'video',
-                    'key': YOUTUBE_API_KEY
-                }
-                search_response = requests.get(search_url, params=search_params)
-                search_response.raise_for_status()
-                search_data = search_response.json()
-                top_video_ids = [item['id']['videoId'] for item in search_data['items']]
-
-                # Step 3: Fetch detailed information for these videos
-                logger.debug("Fetching detailed information for these videos")
-                videos_info_url = 'https://www.googleapis.com/youtube/v3/videos'
-                videos_params = {
-                    'part': 'snippet,statistics,contentDetails',
-                    'id': ','.join(top_video_ids),
-                    'key': YOUTUBE_API_KEY
-                }
-                videos_response = requests.get(videos_info_url, params=videos_params)
-                videos_response.raise_for_status()
-                videos_data = videos_response.json()
-                
-                videos = []
-                for item in videos_data['items']:
-                    snippet = item['snippet']
-                    statistics = item.get('statistics', {})
-                    content_details = item.get('contentDetails', {})
-                    videos.append({
-                        'video_id': item['id'],
-                        'title': snippet['title'],
-                        'description': snippet.get('description', ''),
-                        'duration': content_details.get('duration', 'N/A'),
-                        'view_count': int(statistics.get('viewCount', 0)),
-                        'like_count': int(statistics.get('likeCount', 0)),
-                        'comment_count': int(statistics.get('commentCount', 0)),
-                        'retrieval_date': datetime.utcnow().isoformat()
-                    })
-
-                # Fetch channel statistics
-                logger.debug("Fetching channel statistics")
-                channel_stats_url = 'https://www.googleapis.com/youtube/v3/channels'
-                channel_stats_params = {
-                    'part': 'statistics',
-                    'id': channel_id,
-                    'key': YOUTUBE_API_KEY
-                }
-                channel_stats_response = requests.get(channel_stats_url, params=channel_stats_params)
-                channel_stats_response.raise_for_status()
-                channel_stats_data = channel_stats_response.json()
-                
-                channel_stats = channel_stats_data['items'][0]['statistics']
-                total_videos = int(channel_stats.get('videoCount', 0))
-                subscribers = int(channel_stats.get('subscriberCount', 0))
-
-                # Update the channel information
-                logger.debug("Updating the channel information")
-                supabase.table('channels').upsert({
-                    'channel_id': channel_id,
-                    'channel_name': channel_title,
-                    'link_to_channel': f"https://www.youtube.com/channel/{channel_id}",
-                    'about': snippet.get('description', ''),
-                    'number_of_total_videos': total_videos,
-                    'number_of_retrieved_videos': len(videos),
-                    'ids_of_retrieved_videos': json.dumps(top_video_ids),
-                    'subscribers': subscribers,
-                    'channel_retrieval_date': datetime.utcnow().isoformat()
-                }).execute()
-
-                success = await send_update(session_id, f"Updated channel info for {channel_title}", supabase)
-                if not success:
-                    logger.error(f"Failed to send update for channel {channel_title}")
-
-                supabase.table('videos').upsert(videos).execute()
-                success = await send_update(session_id, f"Saved channel and videos for channel ID: {channel_id}", supabase)
-                if not success:
-                    logger.error(f"Failed to send update for channel {channel_id}")
-
-                # Step 5: Fetch and save comments for each video
-                logger.debug("Fetching and saving comments for each video")
-                comments_url = 'https://www.googleapis.com/youtube/v3/commentThreads'
-                for video in videos:
-                    comments_params = {
-                        'part': 'snippet,replies',
-                        'videoId': video['video_id'],
-                        'maxResults': num_comments,
-                        'order': 'relevance',
-                        'key': YOUTUBE_API_KEY
-                    }
-                    comments_response = requests.get(comments_url, params=comments_params)
-                    comments_response.raise_for_status()
-                    comments_data = comments_response.json()
-                    
-                    comments = []
-                    for item in comments_data['items']:
-                        comment = item['snippet']['topLevelComment']['snippet']
-                        comments.append({
-                            'video_id': video['video_id'],
-                            'comment_id': item['id'],
-                            'comment_author': comment.get('authorDisplayName', ''),
-                            'comment_likes': int(comment.get('likeCount', 0)),
-                            'comment_published_at': comment.get('publishedAt', ''),
-                            'comment_updated_at': comment.get('updatedAt', ''),
-                            'comment_parent_id': '',  # Top-level comment, no parent
-                            'comment_text': comment.get('textOriginal', ''),
-                            'comment_retrieval_date': datetime.utcnow().isoformat()
-                        })
-                        
-                        # Process reply comments
-                        if 'replies' in item:
-                            for reply in item['replies']['comments']:
-                                reply_snippet = reply['snippet']
-                                comments.append({
-                                    'video_id': video['video_id'],
-                                    'comment_id': reply['id'],
-                                    'comment_author': reply_snippet.get('authorDisplayName', ''),
-                                    'comment_likes': int(reply_snippet.get('likeCount', 0)),
-                                    'comment_published_at': reply_snippet.get('publishedAt', ''),
-                                    'comment_updated_at': reply_snippet.get('updatedAt', ''),
-                                    'comment_parent_id': item['id'],  # Parent comment ID
-                                    'comment_text': reply_snippet.get('textOriginal', ''),
-                                    'comment_retrieval_date': datetime.utcnow().isoformat()
-                                })
-
-                        # Break the loop if we've reached the desired number of comments
-                        if len(comments) >= num_comments:
-                            break
-                    
-                    # Truncate comments list if it exceeds num_comments
-                    comments = comments[:num_comments]
-                    
-                    supabase.table('comments').upsert(comments).execute()
-                    success = await send_update(session_id, f"Saved {len(comments)} comments for video ID: {video['video_id']}", supabase)
-                    if not success:
-                        logger.error(f"Failed to send update for video {video['video_id']}")
-
-                # Step 6: Process each video for transcription and tagging
-                logger.info("Starting to process individual videos")
-                for video in videos:
+                        logger.error(f"Failed to send update for session {session_id}")
                     try:
-                        await process_video(video, supabase, transcription_ids, session_id, clustering_strength)
-                    except Exception as e:
-                        error_message = f"Error processing video ID {video['video_id']}: {str(e)}"
-                        logger.error(error_message)
-                        success = await send_update(session_id, error_message, supabase)
-                        if not success:
-                            logger.error(f"Failed to send error update for video {video['video_id']}")
-                logger.info("Finished processing individual videos")
+                        channel_video_ids = await channel_flights.wait(flight_key)
+                    finally:
+                        detach_session(leader_session_id, session_id)
+                    channels[video_id] = {'channel_id': channel_id, 'video_ids': channel_video_ids}
+                    await asyncio.to_thread(save_session, supabase, session_id, channels=channels)
+                else:
+                    await channel_flights.do(
+                        flight_key, process_channel, session_id, supabase, channel_id, snippet, videos,
+                        video_id, channels, checkpoints, transcription_ids, options,
+                        owner=session_id
+                    )
 
             except Exception as e:
                 error_message = f"Error processing video ID {video_id}: {str(e)}"
@@ -506,12 +802,19 @@ async def process_videos(session_id: str, supabase: Client, video_ids: list, num
         # Save transcription IDs if any new ones were added
         save_transcription_ids(transcription_ids)
 
+        await asyncio.to_thread(save_session, supabase, session_id, status='completed')
         success = await send_update(session_id, "Video processing completed.", supabase)
         if not success:
             logger.error(f"Failed to send final update for session {session_id}")
+        return channels
     except Exception as e:
         error_message = f"Error in process_videos: {str(e)}"
         logger.error(error_message)
+        await asyncio.to_thread(save_session, supabase, session_id, status='failed')
         success = await send_update(session_id, error_message, supabase)
         if not success:
             logger.error(f"Failed to send error update for session {session_id}")
+    finally:
+        scheduler.unregister(session_id)
+        memory_governor.end_session(session_id)
+        profiler.session_finished(session_id)
@@ -0,0 +1,121 @@
+# backend/tests/test_adaptive_concurrency.py
+
+import time
+import asyncio
+import threading
+
+import pytest
+
+from adaptive_concurrency import AdaptiveLimiter, LimitedQuery, Slot, is_overload
+from limiter_simulation import simulate, evaluate, parse_args
+
+class StatusError(Exception):
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+def admitted(limiter, count):
+    slots = []
+    for _ in range(count):
+        limiter.acquire()
+        slots.append(Slot())
+    return slots
+
+def test_is_overload():
+    assert is_overload(StatusError(429))
+    assert is_overload(StatusError(503))
+    assert is_overload(TimeoutError())
+    assert not is_overload(StatusError(404))
+    assert not is_overload(ValueError())
+
+def test_overload_cuts_the_limit_once_per_episode():
+    limiter = AdaptiveLimiter('test', initial=8, min=1, max=16)
+    slots = admitted(limiter, 4)
+    for slot in slots:
+        limiter.release(slot, StatusError(429))
+    # All four were admitted before the first cut, so only it counts
+    assert limiter.limit == 4
+    assert limiter.stats['overloads'] == 4
+    assert limiter.stats['decreases'] == 1
+    assert limiter.in_flight == 0
+
+def test_limit_stays_within_bounds():
+    # Back-to-back calls in a test have no meaningful latency to compare
+    limiter = AdaptiveLimiter('test', initial=2, min=2, max=3, latency_tolerance=float('inf'))
+    for _ in range(5):
+        limiter.release(admitted(limiter, 1)[0], StatusError(503))
+    assert limiter.limit == 2
+    for _ in range(50):
+        slots = admitted(limiter, int(limiter.limit))
+        for slot in slots:
+            limiter.release(slot)
+    assert limiter.limit == 3
+
+def test_slow_calls_lower_the_limit():
+    limiter = AdaptiveLimiter('test', initial=10, min=1, max=16, latency_decrease=0.9)
+    slot = admitted(limiter, 1)[0]
+    slot.started -= 0.01
+    limiter.release(slot)
+    slot = admitted(limiter, 1)[0]
+    slot.started -= 0.1
+    limiter.release(slot)
+    assert limiter.stats['slow'] == 1
+    assert limiter.limit == 9
+
+def test_blocking_and_async_callers_share_the_limit():
+    limiter = AdaptiveLimiter('test', initial=1, min=1, max=1)
+    holder = admitted(limiter, 1)[0]
+
+    async def waiter():
+        async with limiter.async_slot():
+            return limiter.in_flight
+
+    async def run():
+        task = asyncio.create_task(waiter())
+        await asyncio.sleep(0.05)
+        assert not task.done()
+        # Released from another thread, as executor callers do
+        threading.Thread(target=limiter.release, args=(holder,)).start()
+        return await asyncio.wait_for(task, 1)
+
+    assert asyncio.run(run()) == 1
+    assert limiter.in_flight == 0
+    assert limiter.stats['waits'] == 1
+
+def test_limit_follows_a_degrading_dependency():
+    args = parse_args(['--capacities', '20,4,20', '--phase-seconds', '3'])
+    phases, limiter = asyncio.run(simulate(args))
+    report, failures = evaluate(phases, args.phase_seconds)
+    assert not failures, report
+    assert report[1]['overload_rate'] < 0.1
+
+class StubQuery:
+    def __init__(self):
+        self.executed = 0
+
+    def eq(self, column, value):
+        return self
+
+    def execute(self):
+        self.executed += 1
+        return self
+
+def test_limited_query_never_blocks_the_event_loop():
+    limiter = AdaptiveLimiter('test', initial=1, min=1, max=1)
+    holder = admitted(limiter, 1)[0]
+    query = StubQuery()
+
+    async def run():
+        # Blocking calls are refused on the loop; the async path waits for the slot
+        with pytest.raises(RuntimeError):
+            LimitedQuery(query, limiter).eq('id', 1).execute()
+        waiting = asyncio.create_task(LimitedQuery(query, limiter).execute_async())
+        await asyncio.sleep(0.05)
+        assert not waiting.done()
+        limiter.release(holder)
+        await asyncio.wait_for(waiting, 1)
+        # On a worker thread the blocking path is fine
+        await asyncio.to_thread(LimitedQuery(query, limiter).execute)
+
+    asyncio.run(run())
+    assert query.executed == 2
+    assert limiter.in_flight == 0
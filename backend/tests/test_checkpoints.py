@@ -0,0 +1,87 @@
+# backend/tests/test_checkpoints.py
+
+import json
+import asyncio
+
+import pytest
+
+pytest.importorskip('supabase')
+
+from checkpoints import CheckpointTracker, claim_session, parse_processing_status, COMPLETED, FAILED, PENDING, STAGES
+
+class StubQuery:
+    def __init__(self, client, table):
+        self.client = client
+        self.table = table
+        self.filters = []
+
+    def upsert(self, rows):
+        self.client.upserts.append((self.table, rows))
+        return self
+
+    def update(self, values):
+        self.values = values
+        return self
+
+    def eq(self, column, value):
+        self.filters.append((column, value))
+        return self
+
+    def is_(self, column, value):
+        self.filters.append((column, None))
+        return self
+
+    def execute(self):
+        if hasattr(self, 'values'):
+            # Compare-and-set on every filter, as PostgREST applies them
+            row = self.client.sessions
+            if all(row.get(column) == value for column, value in self.filters):
+                row.update(self.values)
+                return type('Response', (), {'data': [row]})
+            return type('Response', (), {'data': []})
+        return self
+
+    async def execute_async(self):
+        return self.execute()
+
+class StubSupabase:
+    def __init__(self, sessions=None):
+        self.upserts = []
+        self.sessions = sessions or {}
+
+    def table(self, name):
+        return StubQuery(self, name)
+
+def test_parse_processing_status():
+    assert parse_processing_status(None) == {stage: PENDING for stage in STAGES}
+    assert parse_processing_status('not json')['tags'] == PENDING
+    assert parse_processing_status(json.dumps({'tags': COMPLETED, 'other': FAILED}))['tags'] == COMPLETED
+
+def test_mark_never_mixes_column_sets_in_one_upsert():
+    client = StubSupabase()
+    tracker = CheckpointTracker(client)
+    for stage in STAGES[:-1]:
+        asyncio.run(tracker.mark(['done'], stage, COMPLETED))
+    asyncio.run(tracker.mark(['broken'], 'metadata', FAILED, 'boom'))
+    client.upserts.clear()
+
+    # 'done' completes its last stage and clears its error; 'broken' keeps its own
+    asyncio.run(tracker.mark(['done', 'broken'], 'tags', COMPLETED))
+    assert len(client.upserts) == 2
+    for table, rows in client.upserts:
+        assert table == 'videos'
+        assert len({tuple(row) for row in rows}) == 1
+    rows = {row['video_id']: row for _, batch in client.upserts for row in batch}
+    assert rows['done']['error_message'] is None
+    assert 'error_message' not in rows['broken']
+    assert tracker.is_completed('broken', 'tags')
+    assert tracker.status('broken', 'metadata') == FAILED
+
+def test_only_one_claim_wins():
+    stored = {'session_id': 's', 'status': 'failed', 'updated_at': '2026-10-19T10:00:00'}
+    client = StubSupabase(stored)
+    loaded = dict(stored)
+    assert claim_session(client, loaded)
+    assert stored['status'] == 'running'
+    # A second request that loaded the same row loses
+    assert not claim_session(client, loaded)
@@ -0,0 +1,113 @@
+# backend/tests/test_embedding_cache.py
+
+import zlib
+
+import numpy as np
+import pytest
+
+import embedding_cache
+from embedding_cache import EmbeddingCache
+
+DIM = 8
+
+def fake_encode(texts):
+    """
+    Deterministic stand-in for embeddings.encode: L2-normalized float32, one row per text.
+    """
+    rows = [np.random.default_rng(zlib.crc32(text.encode('utf-8'))).standard_normal(DIM) for text in texts]
+    embeddings = np.asarray(rows, dtype=np.float32).reshape(len(texts), DIM)
+    if len(texts):
+        embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings
+
+@pytest.fixture
+def encoded(monkeypatch):
+    calls = []
+
+    def encode(texts):
+        calls.append(list(texts))
+        return fake_encode(texts)
+
+    monkeypatch.setattr(embedding_cache, 'encode', encode)
+    return calls
+
+def test_only_new_texts_are_encoded(tmp_path, encoded):
+    cache = EmbeddingCache(directory=str(tmp_path), model_name='test')
+    np.testing.assert_allclose(cache.encode(['a', 'b', 'a']), fake_encode(['a', 'b', 'a']))
+    np.testing.assert_allclose(cache.encode(['b', 'c']), fake_encode(['b', 'c']))
+    assert encoded == [['a', 'b'], ['c']]
+    assert cache.metrics()['hits'] == 1
+    assert cache.metrics()['misses'] == 3
+    assert cache.encode([]).shape[0] == 0
+
+def test_rows_persist_and_are_shared(tmp_path, encoded):
+    first = EmbeddingCache(directory=str(tmp_path), model_name='test')
+    first.encode(['a', 'b'])
+    # A second process sees the first one's appends, and the other way round
+    second = EmbeddingCache(directory=str(tmp_path), model_name='test')
+    np.testing.assert_allclose(second.encode(['b', 'a']), fake_encode(['b', 'a']))
+    second.encode(['c'])
+    np.testing.assert_allclose(first.encode(['c']), fake_encode(['c']))
+    assert encoded == [['a', 'b'], ['c']]
+    assert len(first) == len(second) == 3
+
+def test_compaction_starts_a_new_generation(tmp_path, encoded):
+    first = EmbeddingCache(directory=str(tmp_path), model_name='test')
+    second = EmbeddingCache(directory=str(tmp_path), model_name='test')
+    first.encode(['a', 'b'])
+    second.encode(['b', 'c'])
+    generation = first._generation
+    first.compact()
+    assert first._generation == generation + 1
+    assert not (tmp_path / f"keys.{generation}.jsonl").exists()
+    # The other process moves to the new generation on its next call
+    np.testing.assert_allclose(second.encode(['c', 'a', 'b']), fake_encode(['c', 'a', 'b']))
+    assert second._generation == first._generation
+    second.encode(['d'])
+    np.testing.assert_allclose(first.encode(['d']), fake_encode(['d']))
+    assert encoded == [['a', 'b'], ['c'], ['d']]
+
+def test_duplicate_rows_are_compacted_away(tmp_path, encoded, monkeypatch):
+    monkeypatch.setattr(embedding_cache, 'EMBEDDING_CACHE_COMPACT_MIN_ROWS', 4)
+    cache = EmbeddingCache(directory=str(tmp_path), model_name='test')
+    cache.encode(['a', 'b', 'c', 'd'])
+    # Rows written twice, as by two processes that missed the same texts
+    with cache._locked():
+        cache._append(['a', 'b'], fake_encode(['a', 'b']))
+    assert cache.metrics()['rows'] == 6
+    generation = cache._generation
+    cache.encode(['e'])
+    assert cache._generation == generation + 1
+    assert cache.metrics()['rows'] == cache.metrics()['unique'] == 5
+    np.testing.assert_allclose(cache.encode(['a', 'e']), fake_encode(['a', 'e']))
+
+def test_changing_the_model_rebuilds_the_cache(tmp_path, encoded):
+    old = EmbeddingCache(directory=str(tmp_path), model_name='old-model')
+    old.encode(['a', 'b'])
+    new = EmbeddingCache(directory=str(tmp_path), model_name='new-model')
+    assert len(new) == 0
+    assert new._generation == old._generation + 1
+    new.encode(['a'])
+    assert encoded == [['a', 'b'], ['a']]
+
+def test_changing_the_dtype_converts_the_rows(tmp_path, encoded):
+    EmbeddingCache(directory=str(tmp_path), model_name='test').encode(['a', 'b'])
+    half = EmbeddingCache(directory=str(tmp_path), dtype='float16', model_name='test')
+    assert len(half) == 2
+    embeddings = half.encode(['a', 'b'])
+    assert embeddings.dtype == np.float32
+    np.testing.assert_allclose(embeddings, fake_encode(['a', 'b']), atol=1e-3)
+    assert encoded == [['a', 'b']]
+
+def test_appends_after_an_interrupted_write(tmp_path, encoded):
+    cache = EmbeddingCache(directory=str(tmp_path), model_name='test')
+    cache.encode(['a'])
+    # A process died halfway through writing a key line
+    keys_path, _ = cache._files(cache._generation)
+    with open(keys_path, 'a') as file:
+        file.write('"tor')
+    cache.encode(['b', 'c'])
+    reloaded = EmbeddingCache(directory=str(tmp_path), model_name='test')
+    np.testing.assert_allclose(reloaded.encode(['a', 'b', 'c']), fake_encode(['a', 'b', 'c']))
+    assert len(reloaded) == 3
+    assert encoded == [['a'], ['b', 'c']]
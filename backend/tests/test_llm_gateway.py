@@ -0,0 +1,140 @@
+# backend/tests/test_llm_gateway.py
+
+import time
+import socket
+import asyncio
+import threading
+
+import pytest
+
+openai = pytest.importorskip('openai')
+pytest.importorskip('tenacity')
+pytest.importorskip('fastapi')
+uvicorn = pytest.importorskip('uvicorn')
+
+import llm_gateway
+import llm_mock_server
+from llm_gateway import LLMGateway, RateLimiter
+from adaptive_concurrency import AdaptiveLimiter, DEPENDENCY_DEFAULTS
+
+MESSAGES = [{'role': 'user', 'content': 'Tags for: alpha beta gamma'}]
+
+@pytest.fixture(scope='module')
+def mock_url():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(llm_mock_server.app, host='127.0.0.1', port=port, log_level='warning'))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 10
+    while not server.started:
+        if time.monotonic() > deadline or not thread.is_alive():
+            pytest.fail('Mock LLM server did not start')
+        time.sleep(0.01)
+    yield f"http://127.0.0.1:{port}/v1"
+    server.should_exit = True
+    thread.join(timeout=10)
+
+@pytest.fixture
+def mock(mock_url, monkeypatch):
+    """
+    Point the gateway at the mock server, with no latency or failures unless a test sets them.
+    """
+    monkeypatch.setattr(llm_gateway, 'LLM_GATEWAY_MOCK', True)
+    monkeypatch.setattr(llm_gateway, 'LLM_MOCK_URL', mock_url)
+    # Keep the process-wide limit out of it: earlier 429s would have cut it
+    monkeypatch.setattr(llm_gateway, 'dependency_limiter', lambda name: AdaptiveLimiter(name, **DEPENDENCY_DEFAULTS[name]))
+    monkeypatch.setattr(llm_mock_server, 'MOCK_LLM_LATENCY_SECONDS', 0)
+    monkeypatch.setattr(llm_mock_server, 'MOCK_LLM_ERROR_RATE', 0)
+    monkeypatch.setattr(llm_mock_server, 'MOCK_LLM_FAIL_FIRST', 0)
+    monkeypatch.setattr(llm_mock_server, 'MOCK_LLM_RETRY_AFTER', '0')
+    llm_mock_server.stats.update(requests=0, rate_limited=0)
+    return llm_mock_server
+
+def test_chat_returns_the_reply(mock):
+    gateway = LLMGateway()
+    assert asyncio.run(gateway.chat('mock', MESSAGES)) == 'alpha, beta, gamma'
+    assert gateway.stats['requests'] == 1
+    assert gateway.stats['prompt_tokens'] > 0
+
+def test_rate_limited_calls_are_retried(mock):
+    mock.MOCK_LLM_FAIL_FIRST = 2
+    gateway = LLMGateway()
+    assert asyncio.run(gateway.chat('mock', MESSAGES)) == 'alpha, beta, gamma'
+    assert mock.stats == {'requests': 3, 'rate_limited': 2}
+    assert gateway.stats['retries'] == 2
+    assert gateway.stats['errors'] == 2
+
+def test_retry_after_is_honoured(mock, monkeypatch):
+    # Without Retry-After the retry would follow at once
+    monkeypatch.setattr(llm_gateway, '_exponential_wait', lambda retry_state: 0)
+    mock.MOCK_LLM_FAIL_FIRST = 1
+    mock.MOCK_LLM_RETRY_AFTER = '1.5'
+    gateway = LLMGateway()
+    started = time.monotonic()
+    asyncio.run(gateway.chat('mock', MESSAGES))
+    assert time.monotonic() - started >= 1.5
+    assert mock.stats['requests'] == 2
+
+def test_gives_up_after_the_last_attempt(mock, monkeypatch):
+    monkeypatch.setattr(llm_gateway, '_exponential_wait', lambda retry_state: 0)
+    monkeypatch.setattr(llm_gateway, 'LLM_MAX_ATTEMPTS', 3)
+    mock.MOCK_LLM_FAIL_FIRST = 10
+    with pytest.raises(openai.RateLimitError):
+        asyncio.run(LLMGateway().chat('mock', MESSAGES))
+    assert mock.stats['requests'] == 3
+
+def test_slow_calls_time_out_and_are_retried(mock, monkeypatch):
+    monkeypatch.setattr(llm_gateway, '_exponential_wait', lambda retry_state: 0)
+    monkeypatch.setattr(llm_gateway, 'LLM_MAX_ATTEMPTS', 2)
+    mock.MOCK_LLM_LATENCY_SECONDS = 1
+    started = time.monotonic()
+    with pytest.raises((openai.APITimeoutError, asyncio.TimeoutError)):
+        asyncio.run(LLMGateway().chat('mock', MESSAGES, timeout=0.1))
+    assert time.monotonic() - started < 1
+    assert mock.stats['requests'] == 2
+
+def test_requests_per_minute_hold_under_the_limit(mock):
+    # A full minute's worth goes at once, the rest at 4 requests a second
+    gateway = LLMGateway(requests_per_minute=240, tokens_per_minute=10 ** 9)
+    calls = 252
+
+    async def main():
+        started = time.monotonic()
+
+        async def call():
+            await gateway.chat('mock', MESSAGES)
+            return time.monotonic() - started
+
+        return sorted(await asyncio.gather(*(call() for _ in range(calls))))
+
+    finished = asyncio.run(main())
+    assert mock.stats['requests'] == calls
+    for count, elapsed in enumerate(finished, start=1):
+        assert elapsed >= (count - 240) / 4 - 0.05
+    assert finished[-1] >= 2.9
+
+def test_tokens_per_minute_hold_under_the_limit():
+    limiter = RateLimiter(requests_per_minute=10 ** 6, tokens_per_minute=6000)
+
+    async def main():
+        started = time.monotonic()
+        admitted = []
+        for _ in range(63):
+            await limiter.acquire(100)
+            admitted.append(time.monotonic() - started)
+        return admitted
+
+    admitted = asyncio.run(main())
+    # 60 calls use up the bucket; after that it refills 100 tokens a second
+    assert admitted[59] < 0.5
+    for count, elapsed in enumerate(admitted, start=1):
+        assert elapsed >= (count - 60) - 0.05
+    assert admitted[-1] < 4
+
+def test_actual_usage_corrects_the_estimate():
+    limiter = RateLimiter(requests_per_minute=60, tokens_per_minute=1000)
+    asyncio.run(limiter.acquire(500))
+    limiter.adjust(-400)
+    assert limiter._tokens == pytest.approx(900)
@@ -0,0 +1,81 @@
+# backend/tests/test_pipeline.py
+
+import asyncio
+
+import pytest
+
+import pipeline
+from pipeline import Pipeline, Stage
+
+async def split(text):
+    return text.split()
+
+async def upper(word):
+    return word.upper()
+
+def length(word):
+    return len(word)
+
+def test_items_stream_through_every_stage():
+    stages = [
+        Stage('test_split', split, str, str, fan_out=True),
+        Stage('test_upper', upper, str, str, concurrency=2),
+        Stage('test_length', length, str, int, executor='thread'),
+    ]
+    assert sorted(asyncio.run(Pipeline('test', stages).run(['a bb', 'ccc']))) == [1, 2, 3]
+
+def test_after_sees_each_fanned_out_item():
+    seen = []
+
+    async def after(word):
+        seen.append(word)
+
+    stages = [Stage('test_split', split, str, str, fan_out=True, after=after)]
+    assert asyncio.run(Pipeline('test', stages).run(['a b c'])) == ['a', 'b', 'c']
+    assert seen == ['a', 'b', 'c']
+
+def test_failures_go_to_on_error():
+    errors = []
+
+    async def check(word):
+        if word == 'bad':
+            raise ValueError(word)
+        return word
+
+    async def after(word):
+        if word == 'late':
+            raise RuntimeError(word)
+
+    async def on_error(stage, item, error):
+        errors.append((stage, item, type(error)))
+
+    stages = [
+        Stage('test_split', split, str, str, fan_out=True),
+        Stage('test_check', check, str, str, after=after),
+    ]
+    results = asyncio.run(Pipeline('test', stages, on_error=on_error).run(['good bad late']))
+    assert results == ['good']
+    assert sorted(errors) == [('test_check', 'bad', ValueError), ('test_check', 'late', RuntimeError)]
+
+def test_wrong_output_type_fails_the_item():
+    errors = []
+
+    async def on_error(stage, item, error):
+        errors.append(type(error))
+
+    stages = [Stage('test_upper', upper, str, int)]
+    assert asyncio.run(Pipeline('test', stages, on_error=on_error).run(['a'])) == []
+    assert errors == [TypeError]
+
+def test_stage_types_must_connect():
+    with pytest.raises(TypeError):
+        Pipeline('test', [Stage('test_upper', upper, str, str), Stage('test_length', length, int, int, executor='thread')])
+
+def test_pools_grow_with_the_stage_concurrency():
+    small = pipeline._pool(Stage('test_pool', length, str, int, concurrency=1, executor='thread'))
+    assert pipeline._pool(Stage('test_pool', length, str, int, concurrency=1, executor='thread')) is small
+    large = pipeline._pool(Stage('test_pool', length, str, int, concurrency=3, executor='thread'))
+    assert large is not small
+    # A smaller stage keeps using the larger pool
+    assert pipeline._pool(Stage('test_pool', length, str, int, concurrency=2, executor='thread')) is large
+    assert large.submit(length, 'abc').result() == 3
@@ -0,0 +1,113 @@
+# backend/tests/test_read_cache.py
+
+import pytest
+
+pytest.importorskip('fastapi')
+
+import read_cache
+from read_cache import ResponseCache, cached_response, etag_matches, channel_scope, video_scope, CHANNELS_SCOPE
+
+def build(cache, key, body, *scopes):
+    return cache.put(key, body, cache.begin(scopes))
+
+def test_put_and_get():
+    cache = ResponseCache(ttl=60, max_entries=10)
+    assert cache.get('/channels') is None
+    entry = build(cache, '/channels', b'[]', CHANNELS_SCOPE)
+    assert cache.get('/channels') is entry
+    assert entry.etag.startswith('W/"')
+    # The ETag follows the body
+    assert build(cache, '/other', b'[]').etag == entry.etag
+    assert build(cache, '/third', b'[1]').etag != entry.etag
+
+def test_invalidate_drops_only_matching_scopes():
+    cache = ResponseCache(ttl=60, max_entries=10)
+    build(cache, '/channels/a', b'a', channel_scope('a'), CHANNELS_SCOPE)
+    build(cache, '/channels/b', b'b', channel_scope('b'))
+    build(cache, '/videos/v', b'v', video_scope('v'), channel_scope('a'))
+    cache.invalidate(channel_scope('a'))
+    assert cache.get('/channels/a') is None
+    assert cache.get('/videos/v') is None
+    assert cache.get('/channels/b') is not None
+    assert cache.metrics()['entries'] == 1
+
+def test_response_built_during_an_invalidation_is_not_cached():
+    cache = ResponseCache(ttl=60, max_entries=10)
+    pending = cache.begin([channel_scope('a')])
+    unrelated = cache.begin([channel_scope('b')])
+    cache.invalidate(channel_scope('a'))
+    # The caller still gets its response, it is just not kept
+    assert cache.put('/channels/a', b'old', pending).body == b'old'
+    assert cache.get('/channels/a') is None
+    cache.put('/channels/b', b'b', unrelated)
+    assert cache.get('/channels/b') is not None
+
+def test_cancelled_builds_are_forgotten():
+    cache = ResponseCache(ttl=60, max_entries=10)
+    pending = cache.begin([CHANNELS_SCOPE])
+    cache.cancel(pending)
+    assert not cache._building
+
+def test_entries_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(read_cache.time, 'monotonic', lambda: now[0])
+    cache = ResponseCache(ttl=60, max_entries=10)
+    build(cache, '/channels', b'[]', CHANNELS_SCOPE)
+    now[0] += 59
+    assert cache.get('/channels') is not None
+    now[0] += 2
+    assert cache.get('/channels') is None
+
+def test_least_recently_used_entries_are_evicted():
+    cache = ResponseCache(ttl=60, max_entries=2)
+    build(cache, '/a', b'a', video_scope('a'))
+    build(cache, '/b', b'b', video_scope('b'))
+    cache.get('/a')
+    build(cache, '/c', b'c', video_scope('c'))
+    assert cache.get('/b') is None
+    assert cache.get('/a') is not None
+    assert cache.get('/c') is not None
+    # Evicted entries leave no scope behind
+    assert video_scope('b') not in cache._scopes
+
+def test_replacing_an_entry_refiles_its_scopes():
+    cache = ResponseCache(ttl=60, max_entries=10)
+    build(cache, '/v', b'1', video_scope('v'), channel_scope('a'))
+    build(cache, '/v', b'2', video_scope('v'))
+    cache.invalidate(channel_scope('a'))
+    assert cache.get('/v').body == b'2'
+
+def test_if_none_match():
+    etag = 'W/"abc"'
+    assert etag_matches('W/"abc"', etag)
+    assert etag_matches('"abc"', etag)
+    assert etag_matches('"other", W/"abc"', etag)
+    assert etag_matches('*', etag)
+    assert not etag_matches('"other"', etag)
+    assert not etag_matches('', etag)
+    assert not etag_matches(None, etag)
+
+def test_cached_response(monkeypatch):
+    # The test client needs httpx, which the app itself does not
+    pytest.importorskip('httpx')
+    from fastapi import FastAPI, Request
+    from fastapi.testclient import TestClient
+
+    cache = ResponseCache(ttl=60, max_entries=10)
+    monkeypatch.setattr(read_cache, 'response_cache', cache)
+    builds = []
+    app = FastAPI()
+
+    @app.get("/channels")
+    async def channels(request: Request):
+        return await cached_response(request, [CHANNELS_SCOPE], lambda: builds.append(1) or ['a'])
+
+    client = TestClient(app)
+    first = client.get('/channels')
+    assert first.status_code == 200 and first.json() == ['a']
+    etag = first.headers['etag']
+    assert client.get('/channels', headers={'If-None-Match': f'"stale", {etag}'}).status_code == 304
+    assert client.get('/channels', headers={'If-None-Match': etag[2:]}).status_code == 304
+    assert client.get('/channels', headers={'If-None-Match': '"stale"'}).status_code == 200
+    assert len(builds) == 1
+    assert cache.metrics() == {'hits': 3, 'misses': 1, 'not_modified': 2, 'invalidations': 0, 'entries': 1}
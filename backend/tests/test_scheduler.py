@@ -0,0 +1,96 @@
+# backend/tests/test_scheduler.py
+
+import asyncio
+
+import pytest
+
+from scheduler import FairScheduler, BudgetExceeded, classify_priority
+
+async def run_units(scheduler, units, hold=0.01):
+    """
+    Queue (session_id, label, cost) units at once and return the labels in start order.
+    """
+    started = []
+
+    async def unit(label):
+        started.append(label)
+        await asyncio.sleep(hold)
+
+    await asyncio.gather(*(scheduler.run(session_id, unit, label, cost=cost) for session_id, label, cost in units))
+    return started
+
+def test_costliest_unit_first_within_a_session():
+    scheduler = FairScheduler(workers=1)
+    scheduler.register('s', max_concurrent_units=1)
+    started = asyncio.run(run_units(scheduler, [('s', 'short', 1), ('s', 'long', 10), ('s', 'medium', 5), ('s', 'tie', 5)]))
+    # The first unit is granted as soon as it is queued; ties keep queueing order
+    assert started == ['short', 'long', 'medium', 'tie']
+
+def test_small_session_is_not_starved_by_a_bulk_one():
+    scheduler = FairScheduler(workers=1)
+    scheduler.register('bulk', 'bulk', max_concurrent_units=1)
+    scheduler.register('interactive', 'interactive', max_concurrent_units=1)
+    units = [('bulk', f"bulk-{i}", 1) for i in range(20)] + [('interactive', f"interactive-{i}", 1) for i in range(3)]
+    started = asyncio.run(run_units(scheduler, units, hold=0.001))
+    positions = [started.index(f"interactive-{i}") for i in range(3)]
+    assert max(positions) < 6
+
+def test_weights_split_the_workers():
+    scheduler = FairScheduler(workers=1)
+    scheduler.register('bulk', 'bulk', max_concurrent_units=1)
+    scheduler.register('interactive', 'interactive', max_concurrent_units=1)
+    units = [(session_id, f"{session_id}-{i}", 1) for i in range(40) for session_id in ('bulk', 'interactive')]
+    started = asyncio.run(run_units(scheduler, units, hold=0.001))
+    # Interactive sessions weigh four times as much as bulk ones
+    first = started[:25]
+    assert sum(label.startswith('interactive') for label in first) >= 3 * sum(label.startswith('bulk') for label in first)
+
+def test_session_concurrency_cap():
+    scheduler = FairScheduler(workers=4)
+    scheduler.register('s', max_concurrent_units=2)
+    peak = 0
+
+    async def unit():
+        nonlocal peak
+        peak = max(peak, scheduler.stats()['sessions']['s']['running'])
+        await asyncio.sleep(0.01)
+
+    async def main():
+        await asyncio.gather(*(scheduler.run('s', unit) for _ in range(6)))
+
+    asyncio.run(main())
+    assert peak == 2
+    assert scheduler.stats()['running'] == 0
+
+def test_cancelled_queued_unit_frees_nothing():
+    scheduler = FairScheduler(workers=1)
+
+    async def main():
+        blocker = asyncio.Event()
+        first = asyncio.create_task(scheduler.run('s', blocker.wait))
+        queued = asyncio.create_task(scheduler.run('s', asyncio.sleep, 0))
+        await asyncio.sleep(0)
+        queued.cancel()
+        blocker.set()
+        await first
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+
+    asyncio.run(main())
+    assert scheduler.stats()['running'] == 0
+
+def test_llm_token_budget():
+    scheduler = FairScheduler()
+    scheduler.register('s', llm_token_budget=100)
+    scheduler.charge_llm_tokens('s', 60)
+    with pytest.raises(BudgetExceeded):
+        scheduler.charge_llm_tokens('s', 50)
+    # Unknown sessions are not limited
+    scheduler.charge_llm_tokens('other', 10 ** 9)
+
+def test_classify_priority():
+    assert classify_priority(None, 10) == 'interactive'
+    assert classify_priority(None, 10 ** 6) == 'bulk'
+    assert classify_priority('bulk', 1) == 'bulk'
+    with pytest.raises(ValueError):
+        classify_priority('urgent', 1)
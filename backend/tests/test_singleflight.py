@@ -0,0 +1,97 @@
+# backend/tests/test_singleflight.py
+
+import asyncio
+
+import pytest
+
+from singleflight import SingleFlight
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight('test')
+    calls = 0
+
+    async def fetch(value):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return value * 2
+
+    async def main():
+        return await asyncio.gather(*(flight.do('key', fetch, 21) for _ in range(5)))
+
+    assert asyncio.run(main()) == [42] * 5
+    assert calls == 1
+
+def test_nothing_is_cached_after_the_call():
+    flight = SingleFlight('test')
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        return calls
+
+    async def main():
+        return [await flight.do('key', fetch), await flight.do('key', fetch)]
+
+    assert asyncio.run(main()) == [1, 2]
+
+def test_different_keys_run_separately():
+    flight = SingleFlight('test')
+
+    async def main():
+        return await asyncio.gather(flight.do('a', asyncio.sleep, 0.01, 'a'), flight.do('b', asyncio.sleep, 0.01, 'b'))
+
+    assert asyncio.run(main()) == ['a', 'b']
+
+def test_joiners_get_the_exception():
+    flight = SingleFlight('test')
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError('boom')
+
+    async def main():
+        return await asyncio.gather(*(flight.do('key', fail) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert all(isinstance(result, ValueError) for result in results)
+    assert flight.owner('key') is None
+
+def test_owner_and_wait():
+    flight = SingleFlight('test')
+
+    async def main():
+        release = asyncio.Event()
+
+        async def fetch():
+            await release.wait()
+            return 'done'
+
+        task = asyncio.create_task(flight.do('key', fetch, owner='session-1'))
+        await asyncio.sleep(0)
+        assert flight.owner('key') == 'session-1'
+        waiter = asyncio.create_task(flight.wait('key'))
+        release.set()
+        return await task, await waiter
+
+    assert asyncio.run(main()) == ('done', 'done')
+
+def test_cancelling_a_joiner_leaves_the_call_running():
+    flight = SingleFlight('test')
+
+    async def main():
+        async def fetch():
+            await asyncio.sleep(0.02)
+            return 'done'
+
+        owner = asyncio.create_task(flight.do('key', fetch))
+        await asyncio.sleep(0)
+        joiner = asyncio.create_task(flight.do('key', fetch))
+        await asyncio.sleep(0)
+        joiner.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await joiner
+        return await owner
+
+    assert asyncio.run(main()) == 'done'
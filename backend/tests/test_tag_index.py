@@ -0,0 +1,52 @@
+# backend/tests/test_tag_index.py
+
+import numpy as np
+import pytest
+
+pytest.importorskip('sklearn')
+
+import tag_index
+from tag_index import TagIndex
+
+DIM = 4
+
+def unit(*values):
+    vector = np.asarray(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+def vectors(count, offset=0):
+    return np.stack([unit(*np.eye(DIM)[(offset + i) % DIM]) for i in range(count)])
+
+def test_find_videos(tmp_path):
+    index = TagIndex(str(tmp_path))
+    index.add('v1', 'c1', ['a', 'b'], vectors(2))
+    index.add('v2', 'c2', ['c'], vectors(1, offset=2))
+    assert [result['video_id'] for result in index.find_videos(unit(0, 0, 1, 0), k=2)] == ['v2', 'v1']
+    assert index.find_videos(unit(1, 0, 0, 0), k=1)[0]['tag'] == 'a'
+
+def test_adding_a_video_again_replaces_its_rows(tmp_path):
+    index = TagIndex(str(tmp_path))
+    index.add('v1', 'c1', ['a'], vectors(1))
+    index.add('v1', 'c1', ['d'], vectors(1, offset=3))
+    results = index.find_videos(unit(1, 0, 0, 0), k=5)
+    assert [(result['video_id'], result['tag']) for result in results] == [('v1', 'd')]
+
+def test_processes_see_each_others_rows(tmp_path):
+    first = TagIndex(str(tmp_path))
+    second = TagIndex(str(tmp_path))
+    first.add('v1', 'c1', ['a'], vectors(1))
+    second.add('v2', 'c2', ['b'], vectors(1, offset=1))
+    assert {result['video_id'] for result in first.find_videos(unit(1, 1, 0, 0), k=5)} == {'v1', 'v2'}
+    assert len(TagIndex(str(tmp_path))) == 2
+
+def test_appends_after_an_interrupted_write(tmp_path):
+    index = TagIndex(str(tmp_path))
+    index.add('v1', 'c1', ['a'], vectors(1))
+    # A process died halfway through writing an entry line
+    with open(tmp_path / tag_index.ENTRIES_FILE, 'a') as file:
+        file.write('{"tag": "tor')
+    index.add('v2', 'c2', ['b', 'c'], vectors(2, offset=1))
+    reloaded = TagIndex(str(tmp_path))
+    assert reloaded.tags == ['a', 'b', 'c']
+    assert reloaded.video_ids == ['v1', 'v2', 'v2']
+    assert reloaded.find_videos(unit(0, 0, 1, 0), k=1)[0]['tag'] == 'c'
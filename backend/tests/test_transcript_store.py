@@ -0,0 +1,64 @@
+# backend/tests/test_transcript_store.py
+
+import json
+
+import pytest
+
+import transcript_store
+from transcript_store import CompactTranscript, TRANSCRIPT_FORMAT, transcript_from_row
+
+def make_segments(count, length=2.0):
+    # Captions overlap: each one runs into the next
+    return [{'text': f"segment {i} é", 'start': i * length, 'duration': length * 1.5} for i in range(count)]
+
+@pytest.fixture(params=[1, 3, 256])
+def frame_segments(request, monkeypatch):
+    monkeypatch.setattr(transcript_store, 'FRAME_SEGMENTS', request.param)
+    return request.param
+
+def test_round_trip(frame_segments):
+    segments = make_segments(700)
+    transcript = CompactTranscript.from_segments(segments)
+    assert transcript.n_segments == 700
+    assert transcript.text() == ' '.join(segment['text'] for segment in segments)
+    restored = transcript.segments()
+    assert [segment['text'] for segment in restored] == [segment['text'] for segment in segments]
+    assert [segment['start'] for segment in restored] == pytest.approx([segment['start'] for segment in segments])
+    assert transcript.duration == pytest.approx(699 * 2.0 + 3.0)
+
+def test_range_reads(frame_segments):
+    segments = make_segments(50)
+    transcript = CompactTranscript.from_segments(segments)
+    # [10, 20) overlaps segment 4 (8 to 11) through segment 9 (starting at 18)
+    expected = [segment for segment in segments if segment['start'] + segment['duration'] > 10 and segment['start'] < 20]
+    assert [segment['text'] for segment in transcript.segments(10, 20)] == [segment['text'] for segment in expected]
+    assert transcript.text(10, 20) == ' '.join(segment['text'] for segment in expected)
+    assert transcript.text(start_time=99.5) == segments[-1]['text']
+    assert transcript.segments(200, 300) == []
+    assert transcript.text(end_time=0) == ''
+
+def test_empty_transcript():
+    transcript = CompactTranscript.from_segments([])
+    assert transcript.text() == ''
+    assert transcript.segments() == []
+    assert transcript.duration == 0.0
+
+def test_column_round_trip():
+    transcript = CompactTranscript.from_segments(make_segments(10))
+    column = transcript.to_column()
+    assert column.startswith('\\x')
+    assert CompactTranscript.from_column(column).text() == transcript.text()
+    # A Postgres driver hands back the bytes themselves
+    assert CompactTranscript.from_column(memoryview(bytes.fromhex(column[2:]))).text() == transcript.text()
+
+def test_rejects_other_blobs():
+    with pytest.raises(ValueError):
+        CompactTranscript(b'JUNK' + bytes(16))
+
+def test_rows_in_either_format():
+    segments = make_segments(5)
+    compact = {'transcript_format': TRANSCRIPT_FORMAT, 'transcript_blob': CompactTranscript.from_segments(segments).to_column()}
+    legacy = {'transcript': json.dumps(segments)}
+    assert transcript_from_row(compact).text() == transcript_from_row(legacy).text()
+    assert transcript_from_row({'transcript': segments}).n_segments == 5
+    assert transcript_from_row({}) is None
@@ -0,0 +1,79 @@
+# backend/tests/test_youtube_api.py
+
+import pytest
+
+requests = pytest.importorskip('requests')
+
+import youtube_api
+from adaptive_concurrency import dependency_limiter
+from youtube_api import YouTubeKeyPool, NoAvailableKeys, parse_duration
+
+def test_acquire_picks_the_key_with_the_most_quota_left():
+    pool = YouTubeKeyPool(keys=['key-aaaa', 'key-bbbb'], daily_quota=200)
+    first = pool.acquire(100)
+    second = pool.acquire(1)
+    assert first.label != second.label
+    # 100 left on one key and 199 on the other
+    assert pool.acquire(100).label == second.label
+    assert pool.metrics()['remaining_quota'] == 400 - 201
+
+def test_keys_run_out_of_quota():
+    pool = YouTubeKeyPool(keys=['key-aaaa'], daily_quota=150)
+    pool.acquire(100)
+    with pytest.raises(NoAvailableKeys):
+        pool.acquire(100)
+    assert pool.acquire(50).remaining == 0
+
+def test_quota_errors_quarantine_a_key_until_the_reset():
+    pool = YouTubeKeyPool(keys=['key-aaaa', 'key-bbbb'], daily_quota=10000)
+    state = pool.acquire(1)
+    pool.record_error(state, 'quotaExceeded')
+    for _ in range(5):
+        assert pool.acquire(1).label != state.label
+    metrics = pool.metrics()
+    assert metrics['available_keys'] == 1
+    quarantined = next(key for key in metrics['per_key'] if key['key'] == state.label)
+    assert quarantined['remaining'] == 0
+    assert quarantined['quota_exceeded'] == 1
+    # Quarantined until the next midnight Pacific time
+    assert 'T00:00:00-0' in quarantined['quarantined_until']
+
+def test_rate_limits_bench_a_key_briefly():
+    pool = YouTubeKeyPool(keys=['key-aaaa'], daily_quota=10000)
+    state = pool.acquire(1)
+    pool.record_error(state, 'rateLimitExceeded')
+    with pytest.raises(NoAvailableKeys):
+        pool.acquire(1)
+    # Rate limits leave the quota alone
+    assert pool.metrics()['per_key'][0]['remaining'] == 9999
+
+def test_other_errors_only_count():
+    pool = YouTubeKeyPool(keys=['key-aaaa'], daily_quota=10000)
+    state = pool.acquire(1)
+    pool.record_error(state, 'videoNotFound')
+    assert pool.acquire(1) is state
+    assert pool.metrics()['per_key'][0]['errors'] == 1
+
+def test_labels_hide_the_keys():
+    pool = YouTubeKeyPool(keys=['secret-key-1234'], daily_quota=10)
+    assert pool.acquire(1).label == '...1234'
+
+def test_parse_duration():
+    assert parse_duration('PT1H2M3S') == 3723
+    assert parse_duration('P1DT2H') == 93600
+    assert parse_duration('PT') is None
+    assert parse_duration(None) is None
+
+def test_timeouts_count_as_overload(monkeypatch):
+    def hang(url, params, headers, timeout):
+        assert timeout == youtube_api.YOUTUBE_TIMEOUT_SECONDS
+        raise requests.ReadTimeout('read timed out')
+
+    monkeypatch.setattr(youtube_api.requests, 'get', hang)
+    monkeypatch.setattr(youtube_api, 'key_pool', YouTubeKeyPool(keys=['key-aaaa'], daily_quota=10000))
+    limiter = dependency_limiter('googleapis')
+    overloads = limiter.stats['overloads']
+    with pytest.raises(requests.Timeout):
+        youtube_api.youtube_get('search', {'q': 'test'})
+    assert limiter.stats['overloads'] == overloads + 1
+    assert limiter.in_flight == 0
@@ -0,0 +1,32 @@
+# backend/text_processing.py
+
+import re
+import spacy
+
+# Initialize SpaCy model
+nlp = spacy.load("en_core_web_sm")
+
+def normalize_tag(tag):
+    """
+    Normalize a tag string.
+    """
+    tag = tag.strip().lower()
+    # In a raw string `\\s` is a backslash and an `s`, not whitespace, so spaces
+    # are removed along with other special characters. Stored tags and their
+    # index entries were normalized this way; changing it needs a backfill
+    tag = re.sub(r'[^a-z0-9\\s]', '', tag)  # Remove special characters
+    tag = re.sub(r'\\s+', ' ', tag)  # Replace multiple spaces with single space
+    return tag
+
+def detect_names(tags):
+    """
+    Detect names in the tags and separate them from other tags.
+    """
+    names = []
+    non_names = []
+    for tag, doc in zip(tags, nlp.pipe(tags)):
+        if any(ent.label_ == "PERSON" for ent in doc.ents):
+            names.append(tag)
+        else:
+            non_names.append(tag)
+    return names, non_names
@@ -0,0 +1,173 @@
+# backend/transcript_store.py
+
+import json
+import zlib
+import struct
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+TRANSCRIPT_FORMAT = 'ytt1'
+
+# Segments per independently compressed text frame. Smaller frames make time
+# range reads cheaper at a small cost in compression ratio.
+FRAME_SEGMENTS = 256
+
+_MAGIC = b'YTT1'
+_HEADER = struct.Struct('<4sIIII')  # magic, segments, frame size, frames, timing bytes
+
+class CompactTranscript:
+    """
+    Compact transcript: the segment texts as UTF-8 split into zlib frames, plus
+    start, duration and byte-offset arrays compressed separately.
+
+    Only the frames a read needs are decompressed, and no per-segment dicts
+    are built unless segments() is asked for them.
+
+    Blob layout (little-endian):
+        header | zlib(starts f32[n], durations f32[n], offsets u32[n + 1])
+               | frame lengths u32[frames] | frames
+    """
+
+    def __init__(self, blob):
+        magic, self.n_segments, self.frame_segments, n_frames, timing_length = _HEADER.unpack_from(blob)
+        if magic != _MAGIC:
+            raise ValueError("Not a compact transcript blob")
+        self._blob = blob
+        position = _HEADER.size
+        self._timing_bytes = blob[position:position + timing_length]
+        position += timing_length
+        self._frame_lengths = np.frombuffer(blob, dtype='<u4', count=n_frames, offset=position)
+        self._frames_start = position + 4 * n_frames
+        self._frame_offsets = np.concatenate([[0], np.cumsum(self._frame_lengths, dtype=np.int64)])
+        self._timing = None
+
+    @classmethod
+    def from_segments(cls, segments):
+        """
+        Build from YouTubeTranscriptApi-style [{'text', 'start', 'duration'}] segments.
+        """
+        n_segments = len(segments)
+        starts = np.empty(n_segments, dtype='<f4')
+        durations = np.empty(n_segments, dtype='<f4')
+        encoded = []
+        for i, segment in enumerate(segments):
+            starts[i] = segment['start']
+            durations[i] = segment.get('duration', 0)
+            # Each segment keeps a trailing space so whole-text reads are a plain join
+            encoded.append(segment['text'].encode('utf-8') + b' ')
+        offsets = np.zeros(n_segments + 1, dtype='<u4')
+        offsets[1:] = np.cumsum([len(text) for text in encoded])
+
+        frames = [
+            zlib.compress(b''.join(encoded[i:i + FRAME_SEGMENTS]))
+            for i in range(0, n_segments, FRAME_SEGMENTS)
+        ]
+        timing = zlib.compress(starts.tobytes() + durations.tobytes() + offsets.tobytes())
+        header = _HEADER.pack(_MAGIC, n_segments, FRAME_SEGMENTS, len(frames), len(timing))
+        frame_lengths = np.array([len(frame) for frame in frames], dtype='<u4').tobytes()
+        return cls(header + timing + frame_lengths + b''.join(frames))
+
+    @classmethod
+    def from_column(cls, value):
+        # PostgREST returns bytea as hex text; a Postgres driver returns the bytes
+        if isinstance(value, str):
+            return cls(bytes.fromhex(value[2:] if value.startswith('\\x') else value))
+        return cls(bytes(value))
+
+    def to_column(self):
+        # The value PostgREST accepts for a bytea column
+        return '\\x' + self._blob.hex()
+
+    def _load_timing(self):
+        if self._timing is None:
+            raw = zlib.decompress(self._timing_bytes)
+            n = self.n_segments
+            starts = np.frombuffer(raw, dtype='<f4', count=n)
+            durations = np.frombuffer(raw, dtype='<f4', count=n, offset=4 * n)
+            offsets = np.frombuffer(raw, dtype='<u4', count=n + 1, offset=8 * n)
+            self._timing = (starts, durations, offsets)
+        return self._timing
+
+    def _frame_text(self, first_frame, last_frame):
+        start = self._frames_start + int(self._frame_offsets[first_frame])
+        parts = []
+        for frame in range(first_frame, last_frame + 1):
+            end = start + int(self._frame_lengths[frame])
+            parts.append(zlib.decompress(self._blob[start:end]))
+            start = end
+        return b''.join(parts)
+
+    def _segment_range(self, start_time, end_time):
+        starts, durations, _ = self._load_timing()
+        first = 0
+        if start_time is not None:
+            # Segments overlap, so end times are not sorted even though starts are
+            overlapping = np.flatnonzero(starts + durations > start_time)
+            first = int(overlapping[0]) if len(overlapping) else self.n_segments
+        last = self.n_segments if end_time is None else int(np.searchsorted(starts, end_time, side='left'))
+        return first, max(first, last)
+
+    def _texts(self, first, last):
+        if first >= last:
+            return []
+        _, _, offsets = self._load_timing()
+        data = self._frame_text(first // self.frame_segments, (last - 1) // self.frame_segments)
+        base = int(offsets[(first // self.frame_segments) * self.frame_segments])
+        return [
+            data[offsets[i] - base:offsets[i + 1] - base - 1].decode('utf-8')
+            for i in range(first, last)
+        ]
+
+    @property
+    def duration(self):
+        if not self.n_segments:
+            return 0.0
+        starts, durations, _ = self._load_timing()
+        return float(starts[-1] + durations[-1])
+
+    def text(self, start_time=None, end_time=None):
+        """
+        Return the transcript text, optionally only the segments overlapping [start_time, end_time).
+        """
+        if start_time is None and end_time is None:
+            if not self.n_segments:
+                return ''
+            # Whole-transcript reads never touch the timing arrays
+            return self._frame_text(0, len(self._frame_lengths) - 1)[:-1].decode('utf-8')
+        return ' '.join(self._texts(*self._segment_range(start_time, end_time)))
+
+    def segments(self, start_time=None, end_time=None):
+        """
+        Return YouTubeTranscriptApi-style segment dicts overlapping [start_time, end_time).
+        """
+        first, last = self._segment_range(start_time, end_time)
+        starts, durations, _ = self._load_timing()
+        return [
+            {'text': text, 'start': float(starts[i]), 'duration': float(durations[i])}
+            for i, text in zip(range(first, last), self._texts(first, last))
+        ]
+
+def transcript_from_row(row):
+    """
+    Read a `transcripts` row in either the compact or the legacy JSON format.
+    """
+    if row.get('transcript_format') == TRANSCRIPT_FORMAT and row.get('transcript_blob'):
+        return CompactTranscript.from_column(row['transcript_blob'])
+    legacy = row.get('transcript')
+    if legacy:
+        segments = json.loads(legacy) if isinstance(legacy, str) else legacy
+        return CompactTranscript.from_segments(segments)
+    return None
+
+def load_transcript(supabase, video_id):
+    """
+    Load a stored transcript, or None when there is no completed transcript.
+    """
+    rows = supabase.table('transcripts').select('transcript_format, transcript_blob, transcript, status') \
+        .eq('video_id', video_id).execute().data
+    if not rows or rows[0].get('status') != 'completed':
+        return None
+    return transcript_from_row(rows[0])
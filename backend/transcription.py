@@ -0,0 +1,137 @@
+# backend/transcription.py
+
+import os
+import asyncio
+import logging
+import tempfile
+from threading import Lock
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from utils import send_update
+
+logger = logging.getLogger(__name__)
+
+# Speech-to-text fallback for videos without captions. Set to "none" to disable.
+TRANSCRIPTION_BACKEND = os.getenv('TRANSCRIPTION_BACKEND', 'local')
+WHISPER_MODEL = os.getenv('WHISPER_MODEL', 'base')
+WHISPER_COMPUTE_TYPE = os.getenv('WHISPER_COMPUTE_TYPE', 'int8')
+TRANSCRIPTION_WORKERS = int(os.getenv('TRANSCRIPTION_WORKERS', max(1, (os.cpu_count() or 2) // 2)))
+TRANSCRIPTION_CHUNK_SECONDS = int(os.getenv('TRANSCRIPTION_CHUNK_SECONDS', 300))
+
+SAMPLE_RATE = 16000
+
+class TranscriptionBackend:
+    """
+    Interface for speech-to-text engines used when a video has no captions.
+    """
+    name = None
+
+    def transcribe(self, audio_path, progress=None):
+        """
+        Transcribe an audio file into YouTubeTranscriptApi-style
+        [{'text', 'start', 'duration'}] segments. `progress(done, total)` is
+        called from worker threads as chunks finish.
+        """
+        raise NotImplementedError
+
+class LocalWhisperBackend(TranscriptionBackend):
+    """
+    CPU transcription with faster-whisper. Audio is decoded once, cut into
+    fixed-length chunks and the chunks are decoded in parallel on a bounded
+    thread pool shared by every session in the process.
+    """
+    name = 'faster_whisper'
+
+    def __init__(self, model_size=WHISPER_MODEL, compute_type=WHISPER_COMPUTE_TYPE,
+                 workers=TRANSCRIPTION_WORKERS, chunk_seconds=TRANSCRIPTION_CHUNK_SECONDS):
+        from faster_whisper import WhisperModel
+
+        cpu_threads = max(1, (os.cpu_count() or 1) // workers)
+        logger.info(f"Loading faster-whisper model {model_size} ({compute_type}, {workers} workers x {cpu_threads} threads)")
+        # num_workers lets concurrent transcribe() calls run in parallel inside CTranslate2
+        self._model = WhisperModel(model_size, device='cpu', compute_type=compute_type,
+                                   cpu_threads=cpu_threads, num_workers=workers)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='transcription')
+        self.chunk_samples = chunk_seconds * SAMPLE_RATE
+
+    def _transcribe_chunk(self, samples, offset):
+        segments, _ = self._model.transcribe(samples, vad_filter=True, condition_on_previous_text=False)
+        return [
+            {'text': segment.text.strip(), 'start': offset + segment.start, 'duration': segment.end - segment.start}
+            for segment in segments if segment.text.strip()
+        ]
+
+    def transcribe(self, audio_path, progress=None):
+        from faster_whisper import decode_audio
+
+        audio = decode_audio(audio_path, sampling_rate=SAMPLE_RATE)
+        offsets = range(0, len(audio), self.chunk_samples)
+        futures = {
+            self._pool.submit(self._transcribe_chunk, audio[offset:offset + self.chunk_samples], offset / SAMPLE_RATE): index
+            for index, offset in enumerate(offsets)
+        }
+        results = [None] * len(futures)
+        for done, future in enumerate(as_completed(futures), start=1):
+            results[futures[future]] = future.result()
+            if progress is not None:
+                progress(done, len(futures))
+        return [segment for chunk in results for segment in chunk]
+
+TRANSCRIPTION_BACKENDS = {
+    'local': LocalWhisperBackend,
+}
+
+_backend = None
+_backend_lock = Lock()
+
+def get_transcription_backend():
+    """
+    Return the configured transcription backend, or None when it is disabled
+    or its optional dependencies are not installed.
+    """
+    global _backend
+    if _backend is None and TRANSCRIPTION_BACKEND in TRANSCRIPTION_BACKENDS:
+        with _backend_lock:
+            if _backend is None:
+                try:
+                    _backend = TRANSCRIPTION_BACKENDS[TRANSCRIPTION_BACKEND]()
+                except ImportError as e:
+                    logger.error(f"Transcription backend {TRANSCRIPTION_BACKEND} is unavailable: {str(e)}")
+                    return None
+    return _backend
+
+def download_audio(video_id, directory):
+    """
+    Download the best audio-only stream of a video and return its path.
+    """
+    import yt_dlp
+
+    options = {
+        'format': 'bestaudio/best',
+        'outtmpl': os.path.join(directory, '%(id)s.%(ext)s'),
+        'quiet': True,
+        'noprogress': True,
+    }
+    with yt_dlp.YoutubeDL(options) as ydl:
+        info = ydl.extract_info(f"https://www.youtube.com/watch?v={video_id}", download=True)
+        return ydl.prepare_filename(info)
+
+async def transcribe_video(video_id, session_id, supabase, backend):
+    """
+    Download a video's audio and transcribe it locally, reporting chunk
+    progress to the session.
+    """
+    loop = asyncio.get_running_loop()
+
+    def progress(done, total):
+        asyncio.run_coroutine_threadsafe(
+            send_update(session_id, f"Transcribed {done}/{total} audio chunks for video {video_id}", supabase),
+            loop
+        )
+
+    with tempfile.TemporaryDirectory(prefix='ytwebapp-audio-') as directory:
+        audio_path = await asyncio.to_thread(download_audio, video_id, directory)
+        success = await send_update(session_id, f"Downloaded audio for video {video_id}; transcribing locally...", supabase)
+        if not success:
+            logger.error(f"Failed to send update for video {video_id}")
+        return await asyncio.to_thread(backend.transcribe, audio_path, progress)
@@ -1,19 +1,38 @@
 import json
+import asyncio
 import logging
 from supabase import Client
 import datetime
 
 logger = logging.getLogger(__name__)
 
+# Sessions attached to another session's in-flight work also receive its updates
+session_followers = {}
+
+def attach_session(leader_session_id: str, follower_session_id: str):
+    session_followers.setdefault(leader_session_id, set()).add(follower_session_id)
+
+def detach_session(leader_session_id: str, follower_session_id: str):
+    followers = session_followers.get(leader_session_id)
+    if followers:
+        followers.discard(follower_session_id)
+        if not followers:
+            del session_followers[leader_session_id]
+
 async def send_update(session_id: str, message: str, supabase: Client):
     logger.info(f"Attempting to send update for session {session_id}: {message}")
     
     try:
-        result = supabase.table('updates').insert({
-            "session_id": session_id,
-            "message": message,
-            "timestamp": datetime.datetime.utcnow().isoformat()
-        }).execute()
+        timestamp = datetime.datetime.utcnow().isoformat()
+        recipients = [session_id, *session_followers.get(session_id, ())]
+        # The client is synchronous; run the insert on a worker thread so a slow
+        # round trip does not stall every other request and session on the loop
+        result = await asyncio.to_thread(
+            supabase.table('updates').insert([
+                {"session_id": recipient, "message": message, "timestamp": timestamp}
+                for recipient in recipients
+            ]).execute
+        )
         
         # If the result is awaitable, await it
         if hasattr(result, '__await__'):
@@ -23,4 +42,68 @@ async def send_update(session_id: str, message: str, supabase: Client):
         return True
     except Exception as e:
         logger.error(f"Failed to send Supabase update for session {session_id}: {str(e)}")
-        return False
\ No newline at end of file
+        return False
+
+# Supabase caps rows per response and long IN lists overflow the request URL
+SUPABASE_PAGE_SIZE = 1000
+SUPABASE_IN_CHUNK = 100
+
+def chunked(items, size):
+    """
+    Yield successive slices of at most `size` items.
+    """
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def fetch_rows_for_videos(supabase: Client, table: str, columns: str, video_ids, order=('video_id',), filters=None):
+    """
+    Fetch every row of `table` belonging to many videos, chunking the IN list
+    and paging past the response row limit.
+    """
+    rows = []
+    for chunk in chunked(video_ids, SUPABASE_IN_CHUNK):
+        offset = 0
+        while True:
+            query = supabase.table(table).select(columns).in_('video_id', chunk)
+            if filters is not None:
+                query = filters(query)
+            for column in order:
+                query = query.order(column)
+            page = query.range(offset, offset + SUPABASE_PAGE_SIZE - 1).execute().data
+            rows.extend(page)
+            if len(page) < SUPABASE_PAGE_SIZE:
+                break
+            offset += SUPABASE_PAGE_SIZE
+    return rows
+
+def fetch_tags_for_videos(supabase: Client, video_ids, columns='video_id, tag'):
+    """
+    Every tag row of many videos, read along the (video_id, tag) primary key.
+    """
+    return fetch_rows_for_videos(supabase, 'tags', columns, video_ids, order=('video_id', 'tag'))
+
+def fetch_comments_for_videos(supabase: Client, video_ids, columns='*', since=None):
+    """
+    Every comment of many videos, optionally only those retrieved after `since`,
+    read along the (video_id, comment_id) index.
+    """
+    filters = None if since is None else (lambda query: query.gt('comment_retrieval_date', since))
+    return fetch_rows_for_videos(supabase, 'comments', columns, video_ids, order=('video_id', 'comment_id'), filters=filters)
+
+def replace_video_tags(supabase: Client, video_tags, processed_date):
+    """
+    Make `tags` hold exactly the given tags for each video in
+    {video_id: tags}: drop the videos' other tags, then upsert on the
+    (video_id, tag) key so a repeated write never duplicates rows.
+    """
+    video_ids = list(video_tags)
+    rows = [
+        {'video_id': video_id, 'tag': tag, 'processed_date': processed_date}
+        for video_id in video_ids for tag in video_tags[video_id]
+    ]
+    for chunk in chunked(video_ids, SUPABASE_IN_CHUNK):
+        supabase.table('tags').delete().in_('video_id', chunk).execute()
+    for chunk in chunked(rows, SUPABASE_PAGE_SIZE):
+        supabase.table('tags').upsert(chunk, on_conflict='video_id,tag').execute()
+    return len(rows)
@@ -0,0 +1,209 @@
+# backend/youtube_api.py
+
+import os
+import re
+import logging
+from datetime import datetime, timedelta
+from threading import Lock
+from zoneinfo import ZoneInfo
+
+import requests
+
+from youtube_cache import youtube_cache, cache_key, YOUTUBE_CACHED_RESOURCES
+from adaptive_concurrency import dependency_limiter
+
+logger = logging.getLogger(__name__)
+
+YOUTUBE_API_BASE = 'https://www.googleapis.com/youtube/v3'
+
+# Comma-separated keys; YOUTUBE_API_KEY alone still works for a single key
+YOUTUBE_API_KEYS = [
+    key.strip()
+    for key in os.getenv('YOUTUBE_API_KEYS', os.getenv('YOUTUBE_API_KEY', '')).split(',')
+    if key.strip()
+]
+YOUTUBE_DAILY_QUOTA = int(os.getenv('YOUTUBE_DAILY_QUOTA', 10000))
+RATE_LIMIT_BACKOFF_SECONDS = 60
+# Connect and read timeout of each request, so a hung connection frees its thread
+YOUTUBE_TIMEOUT_SECONDS = float(os.getenv('YOUTUBE_TIMEOUT_SECONDS', 30))
+
+# Quota units charged per call of each resource
+QUOTA_COSTS = {
+    'search': 100,
+    'videos': 1,
+    'channels': 1,
+    'commentThreads': 1,
+}
+
+# Daily quotas reset at midnight Pacific time
+QUOTA_TIMEZONE = ZoneInfo('America/Los_Angeles')
+
+QUOTA_REASONS = {'quotaExceeded', 'dailyLimitExceeded'}
+RATE_LIMIT_REASONS = {'rateLimitExceeded', 'userRateLimitExceeded'}
+
+class NoAvailableKeys(Exception):
+    pass
+
+def _quota_day(now=None):
+    return (now or datetime.now(QUOTA_TIMEZONE)).date()
+
+def _next_quota_reset(now=None):
+    now = now or datetime.now(QUOTA_TIMEZONE)
+    return datetime.combine(now.date() + timedelta(days=1), datetime.min.time(), tzinfo=QUOTA_TIMEZONE)
+
+class KeyState:
+    def __init__(self, key, daily_quota):
+        self.key = key
+        self.daily_quota = daily_quota
+        self.quota_day = _quota_day()
+        self.used = 0
+        self.requests = 0
+        self.errors = 0
+        self.quota_exceeded = 0
+        self.quarantined_until = None
+
+    @property
+    def label(self):
+        # Never expose whole keys in logs or metrics
+        return f"...{self.key[-4:]}"
+
+    @property
+    def remaining(self):
+        return self.daily_quota - self.used
+
+class YouTubeKeyPool:
+    """
+    Spreads YouTube Data API calls over several API keys by remaining daily
+    quota. Keys that report quotaExceeded are quarantined until the next
+    quota reset; keys that are rate limited sit out for a minute.
+    """
+
+    def __init__(self, keys=YOUTUBE_API_KEYS, daily_quota=YOUTUBE_DAILY_QUOTA):
+        self._keys = [KeyState(key, daily_quota) for key in keys]
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self._keys)
+
+    def _roll_over(self, now):
+        today = _quota_day(now)
+        for state in self._keys:
+            if state.quota_day != today:
+                state.quota_day = today
+                state.used = 0
+            if state.quarantined_until and state.quarantined_until <= now:
+                logger.info(f"YouTube API key {state.label} released from quarantine")
+                state.quarantined_until = None
+
+    def acquire(self, cost):
+        """
+        Reserve `cost` quota units on the available key with the most quota left.
+        """
+        with self._lock:
+            now = datetime.now(QUOTA_TIMEZONE)
+            self._roll_over(now)
+            available = [state for state in self._keys if state.quarantined_until is None and state.remaining >= cost]
+            if not available:
+                raise NoAvailableKeys(f"All {len(self._keys)} YouTube API keys are quarantined or out of quota")
+            state = max(available, key=lambda s: s.remaining)
+            state.used += cost
+            state.requests += 1
+            return state
+
+    def record_error(self, state, reason):
+        with self._lock:
+            state.errors += 1
+            now = datetime.now(QUOTA_TIMEZONE)
+            if reason in QUOTA_REASONS:
+                state.quota_exceeded += 1
+                state.used = state.daily_quota
+                state.quarantined_until = _next_quota_reset(now)
+                logger.warning(f"YouTube API key {state.label} exceeded its quota; quarantined until {state.quarantined_until.isoformat()}")
+            elif reason in RATE_LIMIT_REASONS:
+                state.quarantined_until = now + timedelta(seconds=RATE_LIMIT_BACKOFF_SECONDS)
+                logger.warning(f"YouTube API key {state.label} rate limited; quarantined for {RATE_LIMIT_BACKOFF_SECONDS}s")
+
+    def metrics(self):
+        with self._lock:
+            self._roll_over(datetime.now(QUOTA_TIMEZONE))
+            return {
+                'keys': len(self._keys),
+                'available_keys': sum(1 for state in self._keys if state.quarantined_until is None),
+                'remaining_quota': sum(max(0, state.remaining) for state in self._keys),
+                'per_key': [
+                    {
+                        'key': state.label,
+                        'used': state.used,
+                        'remaining': max(0, state.remaining),
+                        'requests': state.requests,
+                        'errors': state.errors,
+                        'quota_exceeded': state.quota_exceeded,
+                        'quarantined_until': state.quarantined_until.isoformat() if state.quarantined_until else None,
+                    }
+                    for state in self._keys
+                ]
+            }
+
+def _error_reason(response):
+    try:
+        errors = response.json()['error']['errors']
+        return errors[0].get('reason')
+    except (ValueError, KeyError, IndexError, TypeError):
+        return None
+
+key_pool = YouTubeKeyPool()
+
+def youtube_get(resource, params):
+    """
+    GET a YouTube Data API resource with a key from the pool, moving on to the
+    next key when one turns out to be out of quota or rate limited. Cached
+    resources are revalidated with their stored ETag and served from the
+    cache when unchanged. Calls run under the adaptive googleapis limit, so
+    this blocks; call it off the event loop.
+    """
+    cost = QUOTA_COSTS.get(resource, 1)
+    cache = resource in YOUTUBE_CACHED_RESOURCES
+    key = cache_key(resource, params) if cache else None
+    cached = youtube_cache.get(key) if cache else None
+    headers = {'If-None-Match': cached.etag} if cached is not None else {}
+    for _ in range(max(1, len(key_pool))):
+        state = key_pool.acquire(cost)
+        with dependency_limiter('googleapis').slot() as slot:
+            try:
+                response = requests.get(f"{YOUTUBE_API_BASE}/{resource}", params={**params, 'key': state.key}, headers=headers,
+                                        timeout=YOUTUBE_TIMEOUT_SECONDS)
+            except requests.Timeout:
+                slot.overloaded()
+                raise
+            # Running out of a key's daily quota is not a sign of load
+            if response.status_code in (429, 500, 502, 503, 504) or (response.status_code == 403 and _error_reason(response) in RATE_LIMIT_REASONS):
+                slot.overloaded()
+        if response.status_code == 304 and cached is not None:
+            youtube_cache.hit(cached)
+            return cached.data
+        if response.status_code in (403, 429):
+            reason = _error_reason(response)
+            if reason in QUOTA_REASONS or reason in RATE_LIMIT_REASONS:
+                key_pool.record_error(state, reason)
+                continue
+        if not response.ok:
+            key_pool.record_error(state, _error_reason(response))
+        response.raise_for_status()
+        data = response.json()
+        if cache:
+            youtube_cache.put(key, response.headers.get('ETag') or data.get('etag'), response.content, data, cached is not None)
+        return data
+    raise NoAvailableKeys(f"Every YouTube API key was out of quota or rate limited for {resource}")
+
+ISO_DURATION_PATTERN = re.compile(r'P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+(?:\.\d+)?)S)?)?')
+
+def parse_duration(value):
+    """
+    Seconds in an ISO-8601 duration as contentDetails.duration gives it
+    (e.g. PT1H2M3S, P1DT2H); None when it is missing or malformed.
+    """
+    match = ISO_DURATION_PATTERN.fullmatch(value or '')
+    if match is None or value in ('P', 'PT'):
+        return None
+    weeks, days, hours, minutes, seconds = (float(group or 0) for group in match.groups())
+    return int(((weeks * 7 + days) * 24 + hours) * 3600 + minutes * 60 + seconds)
@@ -0,0 +1,169 @@
+# backend/youtube_cache.py
+
+import os
+import json
+import hashlib
+import logging
+from threading import Lock
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Resources whose responses are kept and revalidated with If-None-Match
+YOUTUBE_CACHED_RESOURCES = ('videos', 'channels', 'commentThreads')
+YOUTUBE_CACHE_MAX_MB = float(os.getenv('YOUTUBE_CACHE_MAX_MB', 64))
+# Optional on-disk store that outlives the process; empty disables it
+YOUTUBE_CACHE_DIR = os.getenv('YOUTUBE_CACHE_DIR', '')
+YOUTUBE_CACHE_DISK_MAX_MB = float(os.getenv('YOUTUBE_CACHE_DISK_MAX_MB', 512))
+
+MB = 1024 * 1024
+
+def cache_key(resource, params):
+    # The API key does not change the response
+    return f"{resource}?{'&'.join(f'{k}={params[k]}' for k in sorted(params) if k != 'key')}"
+
+class CachedResponse:
+    def __init__(self, etag, body, data=None):
+        self.etag = etag
+        self.body = body
+        self._data = data
+
+    @property
+    def data(self):
+        # Entries read back from disk are parsed only when first served
+        if self._data is None:
+            self._data = json.loads(self.body)
+        return self._data
+
+class YouTubeResponseCache:
+    """
+    ETag revalidation cache for YouTube Data API responses: an LRU in memory,
+    bounded by response bytes, over an optional directory on disk. A stored
+    response is revalidated with If-None-Match, and a 304 serves it without
+    downloading or parsing the body again. The API still charges quota for
+    a revalidation. Served data is shared between callers and must not be
+    modified.
+    """
+
+    def __init__(self, max_bytes=YOUTUBE_CACHE_MAX_MB * MB, cache_dir=YOUTUBE_CACHE_DIR, disk_max_bytes=YOUTUBE_CACHE_DISK_MAX_MB * MB):
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.disk_max_bytes = disk_max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = Lock()
+        self.stats = {'lookups': 0, 'hits': 0, 'changed': 0, 'misses': 0, 'disk_hits': 0, 'evictions': 0, 'bytes_saved': 0}
+        self._disk_bytes = 0
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+            self._disk_bytes = sum(entry.stat().st_size for entry in os.scandir(cache_dir) if entry.name.endswith('.json'))
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.json')
+
+    def get(self, key):
+        """
+        The stored response to revalidate for a request, or None.
+        """
+        with self._lock:
+            self.stats['lookups'] += 1
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._path(key), 'r') as file:
+                stored = json.load(file)
+        except (OSError, ValueError):
+            return None
+        entry = CachedResponse(stored['etag'], stored['body'].encode('utf-8'))
+        with self._lock:
+            self.stats['disk_hits'] += 1
+            self._insert(key, entry)
+        return entry
+
+    def hit(self, entry):
+        """
+        Record a 304 for a stored response.
+        """
+        with self._lock:
+            self.stats['hits'] += 1
+            self.stats['bytes_saved'] += len(entry.body)
+
+    def put(self, key, etag, body, data, revalidated):
+        """
+        Store a full response; `revalidated` when it replaces a stale entry.
+        """
+        with self._lock:
+            self.stats['changed' if revalidated else 'misses'] += 1
+            if not etag:
+                return
+            self._insert(key, CachedResponse(etag, body, data))
+        if self.cache_dir:
+            self._write(key, etag, body)
+
+    def _insert(self, key, entry):
+        if len(entry.body) > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= len(previous.body)
+        self._entries[key] = entry
+        self._bytes += len(entry.body)
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted.body)
+            self.stats['evictions'] += 1
+
+    def _write(self, key, etag, body):
+        path = self._path(key)
+        try:
+            previous = os.path.getsize(path) if os.path.exists(path) else 0
+            # Written aside and renamed so readers never see half a file
+            with open(f"{path}.{os.getpid()}.tmp", 'w') as file:
+                json.dump({'key': key, 'etag': etag, 'body': body.decode('utf-8')}, file)
+            os.replace(f"{path}.{os.getpid()}.tmp", path)
+            with self._lock:
+                self._disk_bytes += os.path.getsize(path) - previous
+                over = self._disk_bytes > self.disk_max_bytes
+            if over:
+                self._trim_disk()
+        except OSError as e:
+            logger.warning(f"Could not store YouTube response for {key} on disk: {str(e)}")
+
+    def _trim_disk(self):
+        """
+        Delete the least recently written files until the store is at 90% of its bound.
+        """
+        files = sorted(
+            (entry for entry in os.scandir(self.cache_dir) if entry.name.endswith('.json')),
+            key=lambda entry: entry.stat().st_mtime
+        )
+        total = sum(entry.stat().st_size for entry in files)
+        for entry in files:
+            if total <= 0.9 * self.disk_max_bytes:
+                break
+            try:
+                size = entry.stat().st_size
+                os.remove(entry.path)
+                total -= size
+            except OSError:
+                continue
+        with self._lock:
+            self._disk_bytes = total
+
+    def metrics(self):
+        with self._lock:
+            revalidations = self.stats['hits'] + self.stats['changed']
+            return {
+                **self.stats,
+                'hit_rate': round(self.stats['hits'] / self.stats['lookups'], 4) if self.stats['lookups'] else None,
+                'unchanged_rate': round(self.stats['hits'] / revalidations, 4) if revalidations else None,
+                'entries': len(self._entries),
+                'memory_mb': round(self._bytes / MB, 2),
+                'disk_mb': round(self._disk_bytes / MB, 2) if self.cache_dir else None,
+            }
+
+youtube_cache = YouTubeResponseCache()
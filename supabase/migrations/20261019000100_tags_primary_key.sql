@@ -0,0 +1,27 @@
+-- Make (video_id, tag) the key of `tags` so re-running a video upserts its
+-- tags instead of inserting duplicates.
+
+-- Rows without a key cannot be addressed and are dropped
+DELETE FROM tags WHERE video_id IS NULL OR tag IS NULL;
+
+-- Keep the most recently processed copy of each duplicated (video_id, tag)
+DELETE FROM tags a
+USING tags b
+WHERE a.video_id = b.video_id
+  AND a.tag = b.tag
+  AND (a.processed_date, a.ctid) < (b.processed_date, b.ctid);
+DELETE FROM tags a
+USING tags b
+WHERE a.video_id = b.video_id
+  AND a.tag = b.tag
+  AND a.ctid < b.ctid;
+
+ALTER TABLE tags ALTER COLUMN video_id SET NOT NULL;
+ALTER TABLE tags ALTER COLUMN tag SET NOT NULL;
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'tags_pkey') THEN
+        ALTER TABLE tags ADD CONSTRAINT tags_pkey PRIMARY KEY (video_id, tag);
+    END IF;
+END $$;
@@ -0,0 +1,10 @@
+-- Composite indexes matching how the backend reads each table.
+
+-- All comments of a batch of videos, paged in (video_id, comment_id) order
+CREATE INDEX IF NOT EXISTS comments_video_id_comment_id_idx ON comments (video_id, comment_id);
+
+-- Progress updates of a session in time order
+CREATE INDEX IF NOT EXISTS updates_session_id_timestamp_idx ON updates (session_id, timestamp);
+
+-- Videos carrying a given tag; lookups by video use the primary key
+CREATE INDEX IF NOT EXISTS tags_tag_idx ON tags (tag);
@@ -0,0 +1,17 @@
+-- Video length in seconds, parsed from the ISO-8601 `duration` text, so the
+-- pipeline can order work by it.
+
+ALTER TABLE videos ADD COLUMN IF NOT EXISTS duration_seconds INTEGER;
+
+-- Backfill rows fetched before the column existed. YouTube durations have
+-- no month part, so every M is minutes. 'N/A' and other malformed values
+-- stay NULL
+UPDATE videos
+SET duration_seconds =
+      COALESCE((regexp_match(duration, '(\d+)D'))[1]::INTEGER, 0) * 86400
+    + COALESCE((regexp_match(duration, '(\d+)H'))[1]::INTEGER, 0) * 3600
+    + COALESCE((regexp_match(duration, '(\d+)M'))[1]::INTEGER, 0) * 60
+    + COALESCE((regexp_match(duration, '(\d+)S'))[1]::INTEGER, 0)
+WHERE duration_seconds IS NULL
+  AND duration ~ '^P(\d+D)?(T(\d+H)?(\d+M)?(\d+S)?)?$'
+  AND duration NOT IN ('P', 'PT');
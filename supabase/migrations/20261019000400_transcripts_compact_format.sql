@@ -0,0 +1,16 @@
+-- Columns of the compact transcript format (see backend/transcript_store.py)
+-- and where each transcript came from ('youtube_transcript_api' or a local
+-- speech-to-text backend).
+
+ALTER TABLE transcripts ADD COLUMN IF NOT EXISTS transcript_format TEXT;
+ALTER TABLE transcripts ADD COLUMN IF NOT EXISTS transcript_blob BYTEA;
+ALTER TABLE transcripts ADD COLUMN IF NOT EXISTS source TEXT;
+
+-- Databases that stored the blob as base64 text have it decoded in place
+DO $$
+BEGIN
+    IF (SELECT data_type FROM information_schema.columns
+        WHERE table_name = 'transcripts' AND column_name = 'transcript_blob') = 'text' THEN
+        ALTER TABLE transcripts ALTER COLUMN transcript_blob TYPE BYTEA USING decode(transcript_blob, 'base64');
+    END IF;
+END $$;
@@ -0,0 +1,10 @@
+-- Parameters and resolved channels of each processing run, used to resume
+-- it. A running session refreshes updated_at as a heartbeat.
+
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    parameters JSONB,
+    status TEXT,
+    channels JSONB,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
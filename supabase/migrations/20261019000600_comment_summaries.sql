@@ -0,0 +1,45 @@
+-- Per-video comment analytics, merged incrementally as new comments arrive.
+-- counted_likes maps each counted comment to its like count when last
+-- counted, so the like statistics follow later changes to a comment.
+
+CREATE TABLE IF NOT EXISTS comment_summaries (
+    video_id TEXT PRIMARY KEY,
+    comment_count INTEGER,
+    reply_count INTEGER,
+    like_total BIGINT,
+    like_max INTEGER,
+    like_mean DOUBLE PRECISION,
+    like_histogram JSONB,
+    like_percentiles JSONB,
+    thread_replies JSONB,
+    max_reply_depth INTEGER,
+    avg_replies_per_thread DOUBLE PRECISION,
+    max_replies_per_thread INTEGER,
+    commenter_counts JSONB,
+    top_commenters JSONB,
+    daily_activity JSONB,
+    topics JSONB,
+    counted_likes JSONB,
+    comments_watermark TIMESTAMP,
+    computed_at TIMESTAMP
+);
+
+ALTER TABLE comment_summaries ADD COLUMN IF NOT EXISTS counted_likes JSONB;
+
+-- Summaries that listed the IDs they counted take each comment's current
+-- likes; the statistics are recomputed from them on the next update
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM information_schema.columns
+               WHERE table_name = 'comment_summaries' AND column_name = 'processed_comment_ids') THEN
+        UPDATE comment_summaries s
+        SET counted_likes = (
+            SELECT jsonb_object_agg(c.comment_id, COALESCE(c.comment_likes, 0))
+            FROM comments c
+            WHERE c.video_id = s.video_id
+              AND s.processed_comment_ids ? c.comment_id
+        )
+        WHERE s.counted_likes IS NULL;
+        ALTER TABLE comment_summaries DROP COLUMN processed_comment_ids;
+    END IF;
+END $$;
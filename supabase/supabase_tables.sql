@@ -1,4 +1,6 @@
 -- backend/supabase_tables.sql
+-- Full schema for a new database. Existing databases are brought up to date
+-- with the files in supabase/migrations/, applied in name order.
 
 -- Table: channels
 CREATE TABLE IF NOT EXISTS channels (
@@ -19,6 +21,7 @@ CREATE TABLE IF NOT EXISTS videos (
     title TEXT,
     description TEXT,
     duration TEXT,
+    duration_seconds INTEGER,
     view_count INTEGER,
     like_count INTEGER,
     comment_count INTEGER,
@@ -42,21 +45,32 @@ CREATE TABLE IF NOT EXISTS comments (
     comment_retrieval_date TIMESTAMP
 );
 
+CREATE INDEX IF NOT EXISTS comments_video_id_comment_id_idx ON comments (video_id, comment_id);
+
 -- Table: transcripts
+-- transcript holds legacy JSON segment lists; new rows use transcript_blob,
+-- a compact transcript (see backend/transcript_store.py)
 CREATE TABLE IF NOT EXISTS transcripts (
     video_id TEXT PRIMARY KEY,
     transcript JSONB,
+    transcript_format TEXT,
+    transcript_blob BYTEA,
     retrieval_date TIMESTAMP,
-    status TEXT
+    status TEXT,
+    source TEXT
 );
 
 -- Table: tags
+-- Written with upserts on (video_id, tag)
 CREATE TABLE IF NOT EXISTS tags (
-    video_id TEXT,
-    tag TEXT,
-    processed_date TIMESTAMP
+    video_id TEXT NOT NULL,
+    tag TEXT NOT NULL,
+    processed_date TIMESTAMP,
+    PRIMARY KEY (video_id, tag)
 );
 
+CREATE INDEX IF NOT EXISTS tags_tag_idx ON tags (tag);
+
 -- Table: updates
 CREATE TABLE IF NOT EXISTS updates (
     id SERIAL PRIMARY KEY,
@@ -64,3 +78,42 @@ CREATE TABLE IF NOT EXISTS updates (
     message TEXT,
     timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
+
+CREATE INDEX IF NOT EXISTS updates_session_id_timestamp_idx ON updates (session_id, timestamp);
+
+-- Table: comment_summaries
+-- Per-video comment analytics, merged incrementally as new comments arrive;
+-- counted_likes maps each counted comment to its likes when last counted
+CREATE TABLE IF NOT EXISTS comment_summaries (
+    video_id TEXT PRIMARY KEY,
+    comment_count INTEGER,
+    reply_count INTEGER,
+    like_total BIGINT,
+    like_max INTEGER,
+    like_mean DOUBLE PRECISION,
+    like_histogram JSONB,
+    like_percentiles JSONB,
+    thread_replies JSONB,
+    max_reply_depth INTEGER,
+    avg_replies_per_thread DOUBLE PRECISION,
+    max_replies_per_thread INTEGER,
+    commenter_counts JSONB,
+    top_commenters JSONB,
+    daily_activity JSONB,
+    topics JSONB,
+    counted_likes JSONB,
+    comments_watermark TIMESTAMP,
+    computed_at TIMESTAMP
+);
+
+-- Table: sessions
+-- Parameters and resolved channels of each processing run, used to resume it.
+-- Per-video stage checkpoints live in videos.processing_status as JSON, e.g.
+-- {"metadata": "completed", "comments": "completed", "transcript": "failed", "tags": "pending"}
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    parameters JSONB,
+    status TEXT,
+    channels JSONB,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);